@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django_summernote.admin import SummernoteModelAdmin
+from core.admin_tools import KeysetPaginationMixin
 from .models import About, CollaborateRequest
 
 
@@ -19,10 +20,22 @@ mark_as_read.short_description = "Mark selected requests as read"
 
 
 @admin.register(CollaborateRequest)
-class CollaborateRequestAdmin(admin.ModelAdmin):
+class CollaborateRequestAdmin(KeysetPaginationMixin, admin.ModelAdmin):
     """
-    Lists message and read fields for display in admin
+    Lists message and read fields for display in admin, newest first,
+    paged by ``created_on`` and with a badge counting unread requests
     """
-    list_display = ('name', 'email', 'phone', 'message', 'read',)
+    list_display = ('name', 'email', 'phone', 'message', 'read',
+                    'created_on',)
+    list_filter = ('read',)
     actions = [mark_as_read]
     fields = ['name', 'email', 'phone', 'message', 'read']
+    change_list_template = 'admin/about/collaboraterequest/change_list.html'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'unread_count': CollaborateRequest.objects.filter(
+                read=False).count(),
+        }
+        return super().changelist_view(request, extra_context)
@@ -3,7 +3,11 @@ from django.apps import AppConfig
 
 class AboutConfig(AppConfig):
     """
-    Provides primary key type for about app
+    Provides primary key type for about app and connects its signal
+    handlers
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'about'
+
+    def ready(self):
+        from . import signals  # noqa: F401
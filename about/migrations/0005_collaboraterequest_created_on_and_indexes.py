@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-19 14:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("about", "0004_collaboraterequest_phone"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="collaboraterequest",
+            options={"ordering": ["-created_on"]},
+        ),
+        migrations.AddField(
+            model_name="collaboraterequest",
+            name="created_on",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="about",
+            name="updated_on",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="collaboraterequest",
+            index=models.Index(
+                fields=["read", "created_on"],
+                name="about_collab_read_created_idx",
+            ),
+        ),
+    ]
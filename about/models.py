@@ -1,5 +1,11 @@
+from django.core.cache import cache
 from django.db import models
 from cloudinary.models import CloudinaryField
+from core.metrics import record_cache_lookup
+from core.query_cache import CachedManager
+
+CURRENT_ABOUT_CACHE_KEY = "about:current"
+NO_ABOUT = "no-about"
 
 # Create your models here.
 
@@ -20,18 +26,46 @@ class About(models.Model):
                                          Cloudinary.
         updated_on (DateTimeField): Timestamp indicating when the
                                     entry was last updated.
-        Automatically set to now upon saving.
+        Automatically set to now upon saving. Indexed, as the most
+        recently updated entry is the one shown on the page.
         content (TextField): Detailed 'About Me' content text.
+        objects (CachedManager): Caches query results until the table
+        changes.
+
+    Methods:
+        get_current: Returns the most recently updated entry, cached until
+        an entry is saved or deleted.
     """
 
     title = models.CharField(max_length=200)
     profile_image = CloudinaryField("image", default="placeholder")
-    updated_on = models.DateTimeField(auto_now=True)
+    updated_on = models.DateTimeField(auto_now=True, db_index=True)
     content = models.TextField()
 
+    objects = CachedManager()
+
     def __str__(self):
         return str(self.title)
 
+    @classmethod
+    def get_current(cls):
+        """
+        Get the 'About Me' entry shown on the about page.
+
+        The entry is read from the cache and only loaded from the
+        database after it was invalidated by a save or delete.
+
+        Returns:
+            About: The most recently updated entry, or None if there is
+            none.
+        """
+        about = cache.get(CURRENT_ABOUT_CACHE_KEY)
+        record_cache_lookup("about", about is not None)
+        if about is None:
+            about = cls.objects.order_by("-updated_on").first() or NO_ABOUT
+            cache.set(CURRENT_ABOUT_CACHE_KEY, about, None)
+        return None if about == NO_ABOUT else about
+
 
 class CollaborateRequest(models.Model):
     """
@@ -51,6 +85,14 @@ class CollaborateRequest(models.Model):
         phone (CharField): Optional phone number of the requester.
         read (BooleanField): Status flag indicating whether the request
                              has been read, defaulting to False.
+        created_on (DateTimeField): When the request was received
+                                    (auto-generated).
+
+    Meta:
+        ordering: Newest requests first.
+        indexes: ``(read, created_on)`` serves the unread count and the
+        admin inbox filtered by read status, which pages by
+        ``created_on``.
     """
 
     name = models.CharField(max_length=200)
@@ -58,6 +100,14 @@ class CollaborateRequest(models.Model):
     message = models.TextField()
     phone = models.CharField(max_length=20, blank=True)
     read = models.BooleanField(default=False)
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_on"]
+        indexes = [
+            models.Index(fields=["read", "created_on"],
+                         name="about_collab_read_created_idx"),
+        ]
 
     def __str__(self):
         return f"Collaboration request from {self.name}"
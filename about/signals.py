@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.purge import purge
+from .models import CURRENT_ABOUT_CACHE_KEY, About
+
+
+@receiver(post_save, sender=About)
+@receiver(post_delete, sender=About)
+def invalidate_current_about(sender, **kwargs):
+    """Drop the cached about entry whenever an entry changes."""
+    cache.delete(CURRENT_ABOUT_CACHE_KEY)
+    purge(['about'])
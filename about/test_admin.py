@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from .models import CollaborateRequest
+
+
+class TestCollaborateRequestAdmin(TestCase):
+    """
+    Test case for the keyset-paginated collaboration request inbox.
+    """
+    def setUp(self):
+        self.staff = User.objects.create_superuser(
+            username="staff", password="staffPassword",
+            email="staff@test.com")
+        self.client.force_login(self.staff)
+        for number in range(150):
+            CollaborateRequest.objects.create(
+                name=f"request {number}", email="test@test.com",
+                message="Hello!", read=number % 4 == 0)
+        self.url = reverse("admin:about_collaboraterequest_changelist")
+
+    def test_pages_follow_the_cursor(self):
+        """Every request is listed exactly once across the pages"""
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(
+                self.url, {"cursor": cursor} if cursor else {})
+            cl = response.context["cl"]
+            seen.extend(request.pk for request in cl.result_list)
+            cursor = cl.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 150)
+        self.assertEqual(
+            seen,
+            list(CollaborateRequest.objects.order_by(
+                "-created_on", "-pk").values_list("pk", flat=True)))
+
+    def test_unread_badge_and_filter(self):
+        """The unread count is shown and filtering keeps the cursor"""
+        response = self.client.get(self.url, {"read__exact": "0"})
+        self.assertContains(response, "112 unread")
+        cl = response.context["cl"]
+        self.assertTrue(all(not request.read for request in cl.result_list))
+        self.assertContains(response, "read__exact=0&amp;cursor=")
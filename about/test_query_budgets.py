@@ -0,0 +1,37 @@
+from django.test import TestCase
+from django.urls import reverse
+from core.testing import QueryBudgetMixin
+from . import urls as about_urls
+from .models import About, CollaborateRequest
+
+
+class TestAboutQueryBudgets(QueryBudgetMixin, TestCase):
+    """
+    Declares the maximum number of queries of every route in about.urls.
+    """
+    def populate(self, size):
+        """Grow the About history and the collaboration inbox to size"""
+        while About.objects.count() < size:
+            About.objects.create(title="About Me", content="About content")
+        while CollaborateRequest.objects.count() < size:
+            CollaborateRequest.objects.create(
+                name="test", email="test@test.com", message="Hello!")
+
+    def test_every_route_has_a_budget(self):
+        """Every URL name in about.urls is covered by a budget test"""
+        covered = {name[len('test_'):] for name in dir(self)
+                   if name.startswith('test_')}
+        for pattern in about_urls.urlpatterns:
+            self.assertIn(pattern.name, covered)
+
+    def test_about(self):
+        self.assertQueryBudget(
+            'about', 1, self.populate,
+            lambda: self.client.get(reverse('about')))
+
+    def test_about_collaboration_request(self):
+        self.assertQueryBudget(
+            'about (POST)', 2, self.populate,
+            lambda: self.client.post(reverse('about'), {
+                'name': 'test', 'email': 'test@test.com',
+                'message': 'Hello!'}))
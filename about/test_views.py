@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse
+from core.purge import LocalPurger
 from .models import About
 from .forms import CollaborateForm
 
@@ -37,3 +38,24 @@ class TestAboutView(TestCase):
             b"Collaboration request received!",
             response.content,
         )
+
+    def test_about_entry_is_cached_until_saved(self):
+        """The about entry is read from the cache until an entry changes"""
+        self.client.get(reverse("about"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("about"))
+        self.assertEqual(response.context["about"], self.about_content)
+
+        self.about_content.title = "About Me, updated"
+        self.about_content.save()
+        response = self.client.get(reverse("about"))
+        self.assertIn(b"About Me, updated", response.content)
+
+    def test_about_page_is_tagged_and_purged(self):
+        """The page carries the about key, which is purged on save"""
+        response = self.client.get(reverse("about"))
+        self.assertEqual(response["Surrogate-Key"], "about")
+        LocalPurger.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.about_content.save()
+        self.assertEqual(LocalPurger.batches, [["about"]])
@@ -1,11 +1,16 @@
 from django.shortcuts import render
 from django.contrib import messages
+from core.http_cache import public_cache
+from core.purge import add_surrogate_keys
+from core.throttling import throttle
 from .forms import CollaborateForm
 from .models import About
 
 # Create your views here.
 
 
+@throttle('collaborate', methods=('POST',))
+@public_cache
 def about_me(request):
     """
     Renders the most recent information on the website author
@@ -15,7 +20,8 @@ def about_me(request):
 
     **Context**
     ``about``
-        The most recent instance of :model:`about.About`.
+        The most recent instance of :model:`about.About`, served from the
+        cache.
         ``collaborate_form``
             An instance of :form:`about.CollaborateForm`.
     **Template**
@@ -31,12 +37,13 @@ def about_me(request):
                 'Collaboration request received! '
                 'I endeavour to respond within 2 working days.'
             )
-    about = About.objects.all().order_by('-updated_on').first()
+    about = About.get_current()
     collaborate_form = CollaborateForm()
 
-    return render(
+    response = render(
         request,
         "about/about.html",
         {"about": about,
          "collaborate_form": collaborate_form},
     )
+    return add_surrogate_keys(response, "about")
@@ -1,10 +1,114 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.shortcuts import render
+from django.utils import timezone
 from django_summernote.admin import SummernoteModelAdmin
+from core.admin_tools import (
+    AutocompleteFilter, AutocompleteFilterMixin, EstimatedCountPaginator)
+from . import related
+from .forms import CategoryActionForm
 from .models import Post, Comment, Category, Favorite
+from .signals import notify_posts_changed
+
+
+def set_status(queryset, status):
+    """
+    Set the status of many posts with a single UPDATE.
+
+    ``Post.save()`` is bypassed, so ``updated_on`` is set explicitly and
+    ``posts_changed`` is sent once for the whole batch.
+
+    Returns:
+        int: The number of updated posts.
+    """
+    with transaction.atomic():
+        post_ids = list(queryset.values_list('id', flat=True))
+        updated = Post.objects.filter(id__in=post_ids).update(
+            status=status, updated_on=timezone.now())
+        notify_posts_changed(post_ids)
+    return updated
+
+
+@admin.action(description="Publish selected posts")
+def publish_posts(modeladmin, request, queryset):
+    updated = set_status(queryset, 1)
+    modeladmin.message_user(
+        request, f"{updated} post(s) published.", messages.SUCCESS)
+
+
+@admin.action(description="Unpublish selected posts")
+def unpublish_posts(modeladmin, request, queryset):
+    updated = set_status(queryset, 0)
+    modeladmin.message_user(
+        request, f"{updated} post(s) moved back to draft.", messages.SUCCESS)
+
+
+def change_categories(modeladmin, request, queryset, add):
+    """
+    Add or remove categories on the selected posts.
+
+    Shows an intermediate page to pick the categories, then writes the
+    change with one bulk INSERT or DELETE on the M2M through table. That
+    skips ``m2m_changed``, so the posts are marked for the next related
+    posts refresh here.
+    """
+    verb = "Add" if add else "Remove"
+    form = CategoryActionForm(request.POST if 'apply' in request.POST
+                              else None)
+    if form.is_valid():
+        categories = form.cleaned_data['categories']
+        through = Post.categories.through
+        with transaction.atomic():
+            post_ids = list(queryset.values_list('id', flat=True))
+            if add:
+                through.objects.bulk_create(
+                    [through(post_id=post_id, category_id=category.id)
+                     for post_id in post_ids for category in categories],
+                    ignore_conflicts=True,
+                )
+            else:
+                through.objects.filter(
+                    post_id__in=post_ids, category__in=categories).delete()
+            Post.objects.filter(id__in=post_ids).update(
+                updated_on=timezone.now())
+            related.mark_stale(post_ids)
+            notify_posts_changed(post_ids)
+        names = ", ".join(category.name for category in categories)
+        change = f"Added {names} to" if add else f"Removed {names} from"
+        modeladmin.message_user(
+            request, f"{change} {len(post_ids)} post(s).", messages.SUCCESS)
+        return None
+
+    select_across = request.POST.get('select_across') == '1'
+    return render(request, 'admin/blog/post/change_categories.html', {
+        **modeladmin.admin_site.each_context(request),
+        'title': f"{verb} categories",
+        'opts': modeladmin.model._meta,
+        'form': form,
+        'verb': verb,
+        'action': request.POST['action'],
+        'select_across': select_across,
+        'selected': ([] if select_across else
+                     request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)),
+        'post_count': queryset.count(),
+        'sample': queryset[:20],
+    })
+
+
+@admin.action(description="Add categories to selected posts")
+def add_categories(modeladmin, request, queryset):
+    return change_categories(modeladmin, request, queryset, add=True)
+
+
+@admin.action(description="Remove categories from selected posts")
+def remove_categories(modeladmin, request, queryset):
+    return change_categories(modeladmin, request, queryset, add=False)
 
 
 @admin.register(Post)
-class PostAdmin(SummernoteModelAdmin):
+class PostAdmin(AutocompleteFilterMixin, SummernoteModelAdmin):
     """
     Admin interface configuration for managing the Post model.
 
@@ -18,20 +122,31 @@ class PostAdmin(SummernoteModelAdmin):
         search_fields (list): Defines the fields that should be searchable
         in the admin.
         list_filter (tuple): Determines the filters available in the sidebar
-        of the list view.
+        of the list view. Users who favorited a post are searched with an
+        autocomplete box instead of scanning the favorites table.
+        list_select_related (tuple): Joins the author into the list query.
         prepopulated_fields (dict): Automatically fills the slug field based
         on the post title.
         summernote_fields (tuple): Specifies the fields that will use the
         Summernote widget for rich text editing.
+        show_full_result_count (bool): Disabled, together with
+        ``paginator`` this avoids counting the whole table.
+        actions (list): Bulk publish, unpublish and category changes that
+        run as set-based queries in one transaction.
     """
     list_display = ('title', 'author', 'status',
-                    'created_on', 'featured_image')
+                    'created_on', 'featured_image', 'view_count')
     search_fields = ['title', 'content']
     list_filter = (('author', admin.RelatedOnlyFieldListFilter),
                    'status', 'created_on', 'categories',
-                   ('favorited_by__user', admin.RelatedOnlyFieldListFilter))
+                   ('favorited_by__user', AutocompleteFilter))
+    list_select_related = ('author',)
     prepopulated_fields = {'slug': ('title',)}
     summernote_fields = ('content',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    actions = [publish_posts, unpublish_posts,
+               add_categories, remove_categories]
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -48,9 +163,17 @@ class CommentAdmin(admin.ModelAdmin):
         and approval status.
         list_filter (tuple): Filters to quickly view comments based on
         approval status.
+        list_select_related (tuple): Joins the author, the post and the
+        post's author, which is part of the post's string representation.
+        autocomplete_fields (tuple): Picks the post and author with a
+        search box instead of a select listing every row.
     """
     list_display = ('author', 'body', 'post', 'created_on', 'approved')
     list_filter = ('approved',)
+    list_select_related = ('author', 'post__author')
+    autocomplete_fields = ('post', 'author')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Category)
@@ -69,7 +192,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """
     Admin interface configuration for managing the Favorite model.
 
@@ -81,11 +204,35 @@ class FavoriteAdmin(admin.ModelAdmin):
         list_display (tuple): Columns shown in the favorite list view,
         including the user who favorited a post and the post itself, along
         with a count of how many times a post has been favorited.
-        list_filter (tuple): Filters to quickly view favorites based on the
-        post's title.
+        list_filter (tuple): Filters favorites by post through an
+        autocomplete search box.
+        list_select_related (tuple): Joins the user, the post and the
+        post's author into the list query.
     """
-    list_display = ('user', 'post', 'get_favorite_count')
-    list_filter = ('post__title',)
+    list_display = ('user', 'post', 'favorite_count')
+    list_filter = (('post', AutocompleteFilter),)
+    list_select_related = ('user', 'post__author')
+    autocomplete_fields = ('user', 'post')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        """
+        Annotate every favorite with the favorite count of its post, so the
+        count column needs no query per row.
+        """
+        post_favorites = (Favorite.objects
+                          .filter(post=OuterRef('post'))
+                          .order_by()
+                          .values('post')
+                          .annotate(count=Count('pk'))
+                          .values('count'))
+        return (super().get_queryset(request)
+                .annotate(favorite_count=Subquery(post_favorites)))
+
+    @admin.display(description='Favorite count', ordering='favorite_count')
+    def favorite_count(self, obj):
+        return obj.favorite_count
 
 
 admin.site.register(Comment, CommentAdmin)
@@ -3,7 +3,11 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     """
-    Provides primary key type for blog app
+    Provides primary key type for blog app and connects its signal
+    handlers
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from . import signals  # noqa: F401
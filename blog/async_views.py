@@ -0,0 +1,273 @@
+"""
+Native async versions of the read-heavy blog pages and the like and
+favorite toggles, served instead of the sync views when the site runs on
+ASGI (``ASYNC_VIEWS``, see ``async_urlpatterns``).
+
+The event loop keeps serving other requests while a view waits on the
+database. Django 4.2 runs every ORM call, async or not, on one
+thread-sensitive executor, so independent lookups cannot overlap;
+``fetch_together`` sends them back to back in a single trip to that thread
+instead of one trip each. (Gathering several pending ORM calls also
+deadlocks on asgiref 3.7 behind the sync-only allauth middleware.)
+Templates are rendered in the sync thread too, where the lazy lookups of
+a cached fragment miss are allowed.
+"""
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import URLPattern, path
+from core import events
+from core.http_cache import public_cache
+from core.purge import add_surrogate_keys
+from core.throttling import throttle
+from . import views
+from .models import Category, Favorite, Like, Post
+from .pagination import encode_cursor
+from .signals import post_channel, post_shell_key
+
+
+async def fetch_together(*lookups):
+    """
+    Run independent sync lookups in one trip to Django's sync thread.
+
+    Args:
+        *lookups (callable): Functions called without arguments.
+
+    Returns:
+        list: Their results, in order.
+    """
+    return await sync_to_async(
+        lambda: [lookup() for lookup in lookups])()
+
+
+async def get_user(request):
+    """
+    Load ``request.user`` in the sync thread, where the session and the
+    user may be read from the database, and return it.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def login_required(view):
+    """
+    Async counterpart of Django's ``login_required``, which only wraps
+    sync views before Django 5.0.
+    """
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        user = await get_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapped
+
+
+async def get_post(post_id):
+    try:
+        return await Post.objects.aget(id=post_id)
+    except Post.DoesNotExist:
+        raise Http404("No post matches the given query.")
+
+
+def all_categories():
+    return list(Category.objects.all())
+
+
+@public_cache
+async def post_list(request):
+    """
+    Display a page of published posts, like ``views.PostList``.
+
+    The post count, the categories and the reader's like and favorite ids
+    are looked up together before the page of posts is fetched.
+    """
+    posts = views.listed_posts(Post.objects.filter(status=1))
+    paginator = Paginator(posts, views.PostList.paginate_by)
+    paginator.count, categories, state = await fetch_together(
+        posts.count, all_categories,
+        partial(views.reader_state, request.user))
+    try:
+        page = paginator.page(request.GET.get('page') or 1)
+    except InvalidPage:
+        raise Http404("Invalid page.")
+    page.object_list = [post async for post in page.object_list]
+    context = {
+        'post_list': page.object_list,
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'categories': categories,
+        **state,
+    }
+    if page.has_next():
+        context['next_cursor'] = encode_cursor(page.object_list[-1])
+    response = await sync_to_async(render)(
+        request, 'blog/index.html', context)
+    return add_surrogate_keys(response, 'listing')
+
+
+@public_cache
+async def post_list_by_category(request, category):
+    """
+    Display the published posts of a category, like
+    ``views.post_list_by_category``.
+    """
+    posts = views.listed_posts(
+        Post.objects.filter(categories__name=category, status=1))
+    post_list, categories, state = await fetch_together(
+        partial(list, posts), all_categories,
+        partial(views.reader_state, request.user))
+    response = await sync_to_async(render)(request, 'blog/index.html', {
+        'post_list': post_list,
+        'categories': categories,
+        'category_name': category,
+        **state,
+    })
+    keys = [f'category-{item.pk}' for item in categories
+            if item.name == category]
+    return add_surrogate_keys(response, 'listing', *keys)
+
+
+@public_cache
+async def post_detail(request, slug):
+    """
+    Display a post, like ``views.post_detail``, which still handles the
+    comment form posts.
+
+    When the shared page shell is not cached, its comments, counts and
+    related posts are fetched together before it is rendered.
+    """
+    if request.method == "POST":
+        return await sync_to_async(views.post_detail)(request, slug)
+    # The reader is loaded too, for the template's login links.
+    post, _ = await fetch_together(
+        partial(Post.get_published, slug),
+        lambda: request.user.is_authenticated)
+    if post is None:
+        raise Http404("No post matches the given query.")
+    context = views.shell_context(post)
+    if not await cache.ahas_key(post_shell_key(post.pk)):
+        (context['comments'], context['like_count'],
+         context['favorite_count'],
+         context['related_posts']) = await fetch_together(
+            partial(list, context['comments']),
+            post.likes.count, post.favorited_by.count,
+            partial(list, context['related_posts']))
+    context['comment_form'] = views.CommentForm()
+    context['live_updates'] = True
+    response = await sync_to_async(render)(
+        request, "blog/post_detail.html", context)
+    return add_surrogate_keys(response, f"post-{post.pk}")
+
+
+async def post_events(request, slug):
+    """
+    Stream the live updates of a post's page as server-sent events.
+
+    Sends a ``comment`` event with the rendered comment and the comment
+    count when a comment is approved, and a ``counts`` event with the
+    like and favorite counts when they change (see ``blog.signals``).
+    Only routed on ASGI: a sync worker would hold the whole stream in
+    memory until it ends.
+    """
+    post = await sync_to_async(Post.get_published)(slug)
+    if post is None:
+        raise Http404("No post matches the given query.")
+    response = StreamingHttpResponse(
+        events.stream(post_channel(post.pk)),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keeps nginx style proxies from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@throttle('like')
+@login_required
+async def like_post(request, post_id):
+    """Toggle a user's like on a post, like ``views.like_post``."""
+    post = await get_post(post_id)
+    like, created = await Like.objects.aget_or_create(
+        user=request.user, post=post)
+    if not created:
+        await like.adelete()
+        messages.success(request, "You have unliked the post.")
+    else:
+        messages.success(request, "You have liked the post.")
+    return redirect('blog:post_detail', slug=post.slug)
+
+
+@throttle('like')
+@login_required
+async def unlike_post(request, post_id):
+    """Remove a user's like from a post, like ``views.unlike_post``."""
+    post = await get_post(post_id)
+    await Like.objects.filter(user=request.user, post=post).adelete()
+    messages.success(request, "You have unliked the post.")
+    return redirect('blog:post_detail', slug=post.slug)
+
+
+@throttle('favorite')
+@login_required
+async def favorite_post(request, post_id):
+    """Toggle a user's favorite on a post, like ``views.favorite_post``."""
+    post = await get_post(post_id)
+    favorite, created = await Favorite.objects.aget_or_create(
+        user=request.user, post=post)
+    if created:
+        messages.success(request, "Post added to favorites.")
+    else:
+        await favorite.adelete()
+        messages.success(request, "Post removed from favorites.")
+    return redirect('blog:post_detail', slug=post.slug)
+
+
+@throttle('favorite')
+@login_required
+async def unfavorite_post(request, post_id):
+    """
+    Remove a post from a user's favorites, like
+    ``views.unfavorite_post``.
+    """
+    post = await get_post(post_id)
+    deleted, _ = await Favorite.objects.filter(
+        user=request.user, post=post).adelete()
+    if deleted:
+        messages.success(request, "Post removed from favorites.")
+    else:
+        messages.warning(request, "Post is not in your favorites.")
+    return redirect('blog:post_detail', slug=post.slug)
+
+
+ASYNC_VIEWS = {
+    'home': post_list,
+    'post_list_by_category_all': post_list,
+    'post_list_by_category': post_list_by_category,
+    'post_detail': post_detail,
+    'like_post': like_post,
+    'unlike_post': unlike_post,
+    'favorite_post': favorite_post,
+    'unfavorite_post': unfavorite_post,
+}
+
+
+def async_urlpatterns(patterns):
+    """
+    Return the blog URL patterns with the views that have an async
+    version swapped for it, and the routes served on ASGI only.
+    """
+    return [
+        URLPattern(pattern.pattern, ASYNC_VIEWS[pattern.name],
+                   pattern.default_args, pattern.name)
+        if pattern.name in ASYNC_VIEWS else pattern
+        for pattern in patterns
+    ] + [
+        path('<slug:slug>/events/', post_events, name='post_events'),
+    ]
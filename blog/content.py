@@ -0,0 +1,106 @@
+"""
+The content pipeline, run once when posts, comments and profiles are
+saved instead of on every request.
+
+Post content from the Summernote editor and profile texts are sanitized
+with bleach down to the tags and attributes below, and embedded images
+get ``loading="lazy"``, ``decoding="async"`` and the responsive
+``img-fluid`` class. Comment bodies are plain text, escaped and broken
+into paragraphs. The results are stored in the models' ``*_html``
+fields, which templates output as they are.
+"""
+import html
+import math
+
+import bleach
+from bleach.html5lib_shim import Filter
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+POST_TAGS = bleach.sanitizer.ALLOWED_TAGS | {
+    "br", "div", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5",
+    "h6", "hr", "img", "p", "pre", "s", "span", "sub", "sup", "table",
+    "tbody", "td", "th", "thead", "tr", "u",
+}
+POST_ATTRIBUTES = {
+    "a": ["href", "title", "target", "rel"],
+    "abbr": ["title"],
+    "acronym": ["title"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "td": ["colspan", "rowspan"],
+    "th": ["colspan", "rowspan"],
+}
+PROFILE_TAGS = {"a", "b", "br", "em", "i", "p", "strong", "u"}
+PROFILE_ATTRIBUTES = {"a": ["href", "title"]}
+
+WORDS_PER_MINUTE = 200
+EXCERPT_WORDS = 30
+
+
+class ImageFilter(Filter):
+    """
+    Lazy-loads embedded images and scales them to their container.
+    """
+
+    def __iter__(self):
+        for token in super().__iter__():
+            if (token["type"] in ("StartTag", "EmptyTag")
+                    and token["name"] == "img"):
+                attributes = token["data"]
+                attributes[(None, "loading")] = "lazy"
+                attributes[(None, "decoding")] = "async"
+                attributes[(None, "class")] = "img-fluid"
+            yield token
+
+
+post_cleaner = bleach.Cleaner(
+    tags=POST_TAGS, attributes=POST_ATTRIBUTES, strip=True,
+    filters=[ImageFilter])
+profile_cleaner = bleach.Cleaner(
+    tags=PROFILE_TAGS, attributes=PROFILE_ATTRIBUTES, strip=True)
+
+
+def plain_text(content):
+    """
+    Return the text of some HTML, without tags and entities. Tags are
+    replaced by spaces so the words of adjacent paragraphs stay apart.
+    """
+    return html.unescape(strip_tags(content.replace("<", " <")))
+
+
+def render_post(content):
+    """
+    Return the sanitized HTML of a post's content.
+    """
+    return post_cleaner.clean(content)
+
+
+def reading_time(content):
+    """
+    Return the minutes it takes to read a post's content, at least one.
+    """
+    words = len(plain_text(content).split())
+    return max(1, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def make_excerpt(content):
+    """
+    Return the first words of a post's content as plain text.
+    """
+    return Truncator(" ".join(plain_text(content).split())).words(
+        EXCERPT_WORDS)
+
+
+def render_comment(body):
+    """
+    Return the HTML of a comment's plain text body.
+    """
+    return linebreaks_filter(body, autoescape=True)
+
+
+def render_profile(about):
+    """
+    Return the sanitized HTML of a profile's "About me" text.
+    """
+    return profile_cleaner.clean(about)
@@ -137,3 +137,19 @@ class PostForm(forms.ModelForm):
             "featured_image": "Optional: If you dont add a picture, "
                               "it will take a placeholder image.",
         }
+
+
+class CategoryActionForm(forms.Form):
+    """
+    Intermediate form of the admin actions that add or remove categories
+    on many posts at once.
+
+    Attributes:
+        categories (ModelMultipleChoiceField): The categories to add to or
+        remove from every selected post.
+    """
+
+    categories = forms.ModelMultipleChoiceField(
+        queryset=Category.objects.all(),
+        widget=forms.CheckboxSelectMultiple,
+    )
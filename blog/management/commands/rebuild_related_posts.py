@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_related, refresh_stale_related
+from blog.signals import invalidate_post_shells
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the related posts of every post.
+
+    With ``--stale``, only the posts whose likes, favorites or categories
+    changed since the last run are refreshed; meant to run every ten
+    minutes from the Heroku Scheduler. Without it every list is
+    recomputed, which also picks up newly published and deleted posts;
+    meant to run nightly.
+    """
+    help = "Recompute the related posts of every post."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale', action='store_true',
+            help="Only refresh the posts whose categories or readers "
+                 "changed.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help="Number of posts whose similarities are computed at once.")
+
+    def handle(self, *args, stale, chunk_size, **options):
+        if stale:
+            refreshed, changed = refresh_stale_related()
+            invalidate_post_shells(changed)
+            self.stdout.write(
+                f"Refreshed {refreshed} posts, {len(changed)} lists changed.")
+            return
+        stored = rebuild_related(chunk_size=chunk_size)
+        self.stdout.write(f"Stored {stored} related posts.")
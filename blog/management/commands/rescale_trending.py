@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from blog.trending import rebuild_scores, rescale_scores
+
+
+class Command(BaseCommand):
+    """
+    Brings the trending scores of all posts to the current epoch.
+
+    Posts without new engagement keep the score of the epoch they were
+    last updated in, which ranks them too high once a new epoch starts.
+    Meant to run hourly from the Heroku Scheduler. ``--rebuild``
+    recomputes every score from the likes, favorites and approved
+    comments, e.g. after the half-life or the weights were changed.
+    """
+    help = "Rescale or rebuild the trending scores of posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Recompute every score from its likes, favorites and "
+                 "comments.")
+
+    def handle(self, *args, rebuild, **options):
+        if rebuild:
+            scored = rebuild_scores()
+            self.stdout.write(f"Rebuilt scores, {scored} posts are trending.")
+        else:
+            rescaled = rescale_scores()
+            self.stdout.write(f"Rescaled the scores of {rescaled} posts.")
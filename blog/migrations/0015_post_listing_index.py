@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_like_and_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-created_on', '-id'], name='blog_post_listing_idx'),
+        ),
+    ]
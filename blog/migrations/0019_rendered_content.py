@@ -0,0 +1,59 @@
+# Generated by Django 4.2.9 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+from blog import content
+
+
+def render_existing(apps, schema_editor):
+    """Render the content saved before the pipeline existed."""
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    UserProfile = apps.get_model('blog', 'UserProfile')
+    posts = list(Post.objects.only('content', 'excerpt'))
+    for post in posts:
+        post.content_html = content.render_post(post.content)
+        post.reading_time = content.reading_time(post.content)
+        if not post.excerpt.strip():
+            post.excerpt = content.make_excerpt(post.content)
+    Post.objects.bulk_update(
+        posts, ['content_html', 'reading_time', 'excerpt'], batch_size=500)
+    comments = list(Comment.objects.only('body'))
+    for comment in comments:
+        comment.body_html = content.render_comment(comment.body)
+    Comment.objects.bulk_update(comments, ['body_html'], batch_size=500)
+    profiles = list(UserProfile.objects.only('about'))
+    for profile in profiles:
+        profile.about_html = content.render_profile(profile.about)
+    UserProfile.objects.bulk_update(profiles, ['about_html'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='about_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
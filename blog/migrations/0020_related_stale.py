@@ -0,0 +1,22 @@
+# Generated by Django 4.2.9 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='related_stale',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('related_stale', True)), fields=['id'], name='blog_post_related_stale_idx'),
+        ),
+    ]
@@ -1,10 +1,90 @@
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
+from core.metrics import record_cache_lookup
+from core.query_cache import CachedManager
+from . import content as content_pipeline
 
 STATUS = ((0, "Draft"), (1, "Published"))
+POST_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def post_cache_key(slug):
+    """
+    Return the cache key of a published post looked up by its slug.
+    """
+    return f"post:slug:{slug}"
+
+
+def favorite_ids_cache_key(user_id):
+    """
+    Return the cache key of the ids of the posts a user favorited.
+    """
+    return f"favorites:user:{user_id}"
+
+
+def like_ids_cache_key(user_id):
+    """
+    Return the cache key of the ids of the posts a user liked.
+    """
+    return f"likes:user:{user_id}"
+
+
+def cached_post_ids(model, user, key):
+    """
+    Get the ids of the posts a user has a ``Like`` or ``Favorite`` for.
+
+    The set is cached per user and dropped by ``blog.signals`` when one
+    of the user's rows is added or removed.
+
+    Args:
+        model (Model): ``Like`` or ``Favorite``.
+        user (User): The user, anonymous users have none.
+        key (str): The cache key of the user's set.
+
+    Returns:
+        frozenset: The post ids.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    post_ids = cache.get(key)
+    record_cache_lookup(model._meta.verbose_name_plural, post_ids is not None)
+    if post_ids is None:
+        post_ids = frozenset(model.objects.filter(user=user)
+                             .values_list("post_id", flat=True))
+        cache.set(key, post_ids, POST_CACHE_TIMEOUT)
+    return post_ids
+
+
+def render_on_save(kwargs, source, *rendered):
+    """
+    Return whether a save writes the ``source`` field, adding the fields
+    rendered from it to the save's ``update_fields``.
+    """
+    update_fields = kwargs.get("update_fields")
+    if update_fields is None:
+        return True
+    if source not in update_fields:
+        return False
+    kwargs["update_fields"] = {*update_fields, *rendered}
+    return True
+
+
+def reaction_count(model):
+    """
+    Return a subquery counting the rows of ``model`` for the outer post.
+
+    A subquery per count keeps the post rows from multiplying the way two
+    joined ``Count`` aggregates would.
+    """
+    counts = (model.objects.filter(post=OuterRef("pk")).order_by()
+              .values("post").annotate(count=Count("pk")).values("count"))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
 
 class Category(models.Model):
@@ -13,6 +93,8 @@ class Category(models.Model):
 
     Attributes:
         name (CharField): The name of the category, should be unique.
+        objects (CachedManager): Caches query results until the table
+        changes.
 
     Methods:
         __str__: Returns a string representation of the category.
@@ -20,6 +102,8 @@ class Category(models.Model):
 
     name = models.CharField(max_length=100, unique=True)
 
+    objects = CachedManager()
+
     def __str__(self):
         return self.name
 
@@ -36,18 +120,37 @@ class Post(models.Model):
         featured_image (CloudinaryField): An image field for the post's
         featured image.
         content (TextField): The main content of the blog post.
+        content_html (TextField): The sanitized content, rendered on save
+        (see blog/content.py).
+        reading_time (PositiveSmallIntegerField): Minutes it takes to read
+        the content, counted on save.
         created_on (DateTimeField): The date and time when the post was created
                                     (auto-generated).
         status (IntegerField): The status of the post (e.g., draft, published).
-        excerpt (TextField): A brief excerpt or summary of the post.
+        excerpt (TextField): A brief excerpt or summary of the post, taken
+        from the start of the content on save when left blank.
         updated_on (DateTimeField): The date and time when the post was last
         updated (auto-generated).
         categories (ManyToManyField): A many-to-many relationship to Category
         model representing post categories.
+        trending_score (FloatField): The time-decayed engagement of the
+        post, as of the start of ``trending_epoch`` (see blog/trending.py).
+        trending_epoch (IntegerField): The epoch ``trending_score`` is
+        expressed in.
+        view_count (PositiveIntegerField): How often the post was viewed,
+        counted by a beacon from the page and written in batches (see
+        blog/view_counts.py). Readers without JavaScript are not
+        counted.
+        related_stale (BooleanField): Whether the post's categories or
+        readers changed since its related posts were last refreshed (see
+        blog/related.py).
 
     Meta:
         ordering: The default ordering for blog posts, ordered by 'created_on'
         in descending order.
+        indexes: Lists published posts newest first, also from a cursor,
+        the trending posts and the posts awaiting a related posts
+        refresh.
 
     Methods:
         __str__: Returns a string representation of the blog post.
@@ -55,6 +158,8 @@ class Post(models.Model):
         is_liked_by_user(user): Checks if the post is liked by a specific user.
         get_favorite_count(): Gets the count of users who have marked this post
         as a favorite.
+        get_published(slug): Gets a published post through the object
+        cache.
     """
 
     title = models.CharField(max_length=200, unique=True)
@@ -65,18 +170,74 @@ class Post(models.Model):
     featured_image = CloudinaryField("image", default="placeholder")
     featured_image_alt = models.CharField(max_length=255, blank=True)
     content = models.TextField()
+    content_html = models.TextField(blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False)
     created_on = models.DateTimeField(auto_now_add=True)
     status = models.IntegerField(choices=STATUS, default=0)
     excerpt = models.TextField(blank=True)
     updated_on = models.DateTimeField(auto_now=True)
     categories = models.ManyToManyField(Category, related_name="posts")
+    trending_score = models.FloatField(default=0, editable=False)
+    trending_epoch = models.IntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    related_stale = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ["-created_on"]
+        indexes = [
+            models.Index(fields=["status", "-created_on", "-id"],
+                         name="blog_post_listing_idx"),
+            models.Index(fields=["status", "-trending_score", "-id"],
+                         name="blog_post_trending_idx"),
+            models.Index(fields=["id"], condition=Q(related_stale=True),
+                         name="blog_post_related_stale_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} | written by {self.author}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save that changes the slug can evict the cache
+        # entry stored under the old one.
+        instance._loaded_slug = instance.__dict__.get("slug")
+        return instance
+
+    @classmethod
+    def get_published(cls, slug):
+        """
+        Get a published post by its slug, read through the object cache.
+
+        The cached post carries its categories, its rendered content but
+        not the raw one, and only the username of its author. Entries are
+        evicted by the handlers in ``blog.signals`` when the post, its
+        categories or its author change.
+
+        Args:
+            slug (str): The slug of the post.
+
+        Returns:
+            Post: The post, or None if no published post has this slug.
+        """
+        loaded = []
+
+        def load():
+            loaded.append(slug)
+            fields = [field.name for field in cls._meta.concrete_fields
+                      if field.name != "content"]
+            return (cls.objects.filter(slug=slug, status=1)
+                    .select_related("author")
+                    .only(*fields, "author__username")
+                    .prefetch_related("categories")
+                    .first())
+
+        # Computed once when many requests miss a popular post together.
+        post = cache.get_or_set(post_cache_key(slug), load,
+                                POST_CACHE_TIMEOUT)
+        record_cache_lookup("post", not loaded)
+        return post
+
     def save(self, *args, **kwargs):
         if not self.slug or not self.id or self.slug != slugify(self.title):
             self.slug = original = slugify(self.title)
@@ -87,6 +248,12 @@ class Post(models.Model):
                             .exists()):
                     break
                 self.slug = f"{original}-{x}"
+        if render_on_save(kwargs, "content", "content_html", "reading_time",
+                          "excerpt"):
+            self.content_html = content_pipeline.render_post(self.content)
+            self.reading_time = content_pipeline.reading_time(self.content)
+            if not self.excerpt.strip():
+                self.excerpt = content_pipeline.make_excerpt(self.content)
         super().save(*args, **kwargs)
 
     @property
@@ -132,6 +299,8 @@ class Comment(models.Model):
         author (ForeignKey): A foreign key relation to the User model
                              representing the comment's author.
         body (TextField): The content of the comment.
+        body_html (TextField): The body as escaped paragraphs, rendered
+        on save.
         created_on (DateTimeField): The date and time when the comment
         was created (auto-generated).
         approved (BooleanField): Indicates if the comment has been
@@ -140,6 +309,7 @@ class Comment(models.Model):
     Meta:
         ordering: The default ordering for comments, ordered by
         'created_on' in ascending order.
+        indexes: Finds a post's approved or pending comments.
 
     Methods:
         __str__: Returns a string representation of the comment.
@@ -150,15 +320,32 @@ class Comment(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="comments")
     body = models.TextField()
+    body_html = models.TextField(blank=True, editable=False)
     created_on = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["created_on"]
+        indexes = [
+            models.Index(fields=["post", "approved"],
+                         name="blog_comment_post_approved_idx"),
+        ]
 
     def __str__(self):
         return f"Comment {self.body} by {self.author}"
 
+    def save(self, *args, **kwargs):
+        if render_on_save(kwargs, "body", "body_html"):
+            self.body_html = content_pipeline.render_comment(self.body)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the save that approves a comment can announce it.
+        instance._loaded_approved = instance.__dict__.get("approved")
+        return instance
+
 
 class Like(models.Model):
     """
@@ -171,12 +358,33 @@ class Like(models.Model):
         representing the liked post.
         created (DateTimeField): The date and time when the like was
         created (auto-generated).
+
+    Meta:
+        indexes: Looks up whether a user liked a post.
+
+    Methods:
+        post_ids_for(user): Gets the ids of the posts a user liked,
+        through the cache.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "user"],
+                         name="blog_like_post_user_idx"),
+        ]
+
+    @classmethod
+    def post_ids_for(cls, user):
+        """
+        Get the ids of the posts a user liked, through the cache, so
+        listing pages can mark them without a query per card.
+        """
+        return cached_post_ids(cls, user, like_ids_cache_key(user.pk))
+
 
 class Favorite(models.Model):
     """
@@ -187,6 +395,8 @@ class Favorite(models.Model):
         representing the user who marked the post as a favorite.
         post (ForeignKey): A foreign key relation to the Post model
         representing the favorited post.
+        created_on (DateTimeField): The date and time when the post was
+        marked as a favorite (auto-generated).
 
     Meta:
         unique_together: Ensures that a user can mark a post as a
@@ -196,6 +406,8 @@ class Favorite(models.Model):
         __str__: Returns a string representation of the favorite.
         get_favorite_count(): Gets the count of users who have marked
         the same post as a favorite.
+        post_ids_for(user): Gets the ids of the posts a user favorited,
+        through the cache.
     """
 
     user = models.ForeignKey(
@@ -203,6 +415,7 @@ class Favorite(models.Model):
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name="favorited_by"
     )
+    created_on = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("user", "post")
@@ -210,6 +423,14 @@ class Favorite(models.Model):
     def __str__(self):
         return f"{self.user.username} favorited {self.post.title}"
 
+    @classmethod
+    def post_ids_for(cls, user):
+        """
+        Get the ids of the posts a user marked as favorites, through the
+        cache, so listing pages can mark them without a query per card.
+        """
+        return cached_post_ids(cls, user, favorite_ids_cache_key(user.pk))
+
     def get_favorite_count(self):
         """
         Get the count of users who have marked the same post as a favorite.
@@ -220,6 +441,37 @@ class Favorite(models.Model):
         return Favorite.objects.filter(post=self.post).count()
 
 
+class RelatedPost(models.Model):
+    """
+    A post similar to another post, precomputed by ``blog.related``.
+
+    Attributes:
+        post (ForeignKey): The post the related post is recommended on.
+        related (ForeignKey): The similar post.
+        score (FloatField): How similar the posts are, higher is closer.
+
+    Meta:
+        ordering: The most similar posts come first.
+        indexes: Lists the related posts of a post in order.
+    """
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="related_posts")
+    related = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["-score"]
+        indexes = [
+            models.Index(fields=["post", "-score"],
+                         name="blog_relatedpost_post_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.related_id} is related to {self.post_id}"
+
+
 class UserProfile(models.Model):
     """
     A model representing user profiles.
@@ -236,6 +488,8 @@ class UserProfile(models.Model):
         has a default placeholder image.
         about (TextField): A text field where users can provide information
         about themselves. It is optional and can be left blank.
+        about_html (TextField): The sanitized ``about`` text, rendered on
+        save.
 
     Methods:
         __str__: Returns the username of the associated user,
@@ -247,6 +501,12 @@ class UserProfile(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     profile_image = CloudinaryField("image", default="placeholder")
     about = models.TextField("About me", blank=True)
+    about_html = models.TextField(blank=True, editable=False)
 
     def __str__(self):
         return self.user.username
+
+    def save(self, *args, **kwargs):
+        if render_on_save(kwargs, "about", "about_html"):
+            self.about_html = content_pipeline.render_profile(self.about)
+        super().save(*args, **kwargs)
@@ -0,0 +1,48 @@
+"""
+Keyset cursors for the post listings.
+
+A cursor names the last post a reader has seen by its ``created_on`` and
+``pk``, the listing order. The next batch is the posts that sort after
+it, found through ``blog_post_listing_idx`` no matter how deep the reader
+has scrolled, and unaffected by posts published in the meantime.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+LISTING_ORDER = ("-created_on", "-pk")
+
+
+def encode_cursor(post):
+    """
+    Return the cursor pointing just after a post.
+    """
+    value = f"{post.created_on.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return the ``(created_on, pk)`` of a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_on, pk = (base64.urlsafe_b64decode(padded).decode()
+                          .split("|"))
+        return datetime.fromisoformat(created_on), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as error:
+        raise ValueError("Invalid cursor.") from error
+
+
+def after_cursor(posts, cursor):
+    """
+    Filter a queryset of posts to those listed after a cursor.
+    """
+    created_on, pk = decode_cursor(cursor)
+    return posts.filter(Q(created_on__lt=created_on)
+                        | Q(created_on=created_on, pk__lt=pk))
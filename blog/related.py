@@ -0,0 +1,249 @@
+"""
+Related posts, precomputed for every post.
+
+Two posts are similar when they share categories and readers, the users
+who liked or favorited them. The similarity of two posts is the cosine
+similarity of their category sets times ``CATEGORY_WEIGHT`` plus that of
+their reader sets times ``READER_WEIGHT``. The ``RELATED_POSTS`` most
+similar posts of each post are stored as ``RelatedPost`` rows, which
+``post_detail`` reads with one indexed query.
+
+A like, favorite or category change only changes the sets of one post, so
+only the pairs that include it change. The request that makes the change
+just marks the post with ``mark_stale``, since refreshing costs queries
+that grow with the posts it shares a category or reader with.
+``refresh_stale_related``, run by ``rebuild_related_posts --stale`` every
+few minutes, hands the marked posts to ``refresh_related``. That
+recomputes the list of each post and moves the post up or down in the
+lists of the posts it is similar to; a list whose last entry may have to
+be replaced by a post it does not know about is recomputed as well.
+``rebuild_related``, run by the same command without ``--stale``,
+recomputes every list with sparse matrix products, e.g. nightly so newly
+published and deleted posts are taken into account.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Favorite, Like, Post, RelatedPost
+
+RELATED_POSTS = 4
+CATEGORY_WEIGHT = 0.4
+READER_WEIGHT = 0.6
+
+PostCategory = Post.categories.through
+
+
+def cosine(first, second):
+    if not first or not second:
+        return 0
+    return len(first & second) / math.sqrt(len(first) * len(second))
+
+
+def similarity(first, second):
+    """
+    Return the similarity of two posts from their ``(categories,
+    readers)`` sets.
+    """
+    return (CATEGORY_WEIGHT * cosine(first[0], second[0])
+            + READER_WEIGHT * cosine(first[1], second[1]))
+
+
+def top(scores):
+    """
+    Return the ``(post_id, score)`` pairs of the most similar posts, ties
+    going to the older post.
+    """
+    return heapq.nlargest(RELATED_POSTS, scores.items(),
+                          key=lambda item: (item[1], -item[0]))
+
+
+def features(post_ids):
+    """
+    Return the ``(categories, readers)`` sets of some posts.
+
+    Returns:
+        dict: The sets by post id, empty for posts without either.
+    """
+    sets = defaultdict(lambda: (set(), set()))
+    for post_id, category_id in (PostCategory.objects
+                                 .filter(post_id__in=post_ids)
+                                 .values_list('post_id', 'category_id')):
+        sets[post_id][0].add(category_id)
+    for model in (Like, Favorite):
+        for post_id, user_id in (model.objects.filter(post_id__in=post_ids)
+                                 .values_list('post_id', 'user_id')):
+            sets[post_id][1].add(user_id)
+    return sets
+
+
+def similarities(post_id):
+    """
+    Return the similarity of a post to every post sharing a category or a
+    reader with it.
+
+    Returns:
+        dict: The scores by post id.
+    """
+    mine = features([post_id])[post_id]
+    categories, readers = mine
+    candidates = set(PostCategory.objects.filter(category_id__in=categories)
+                     .values_list('post_id', flat=True))
+    for model in (Like, Favorite):
+        candidates.update(model.objects.filter(user_id__in=readers)
+                          .values_list('post_id', flat=True))
+    candidates.discard(post_id)
+    others = features(candidates)
+    scores = {other: similarity(mine, others[other]) for other in candidates}
+    return {other: score for other, score in scores.items() if score > 0}
+
+
+def replace_lists(lists):
+    """
+    Store the related posts of some posts, replacing their old rows.
+
+    Args:
+        lists (dict): ``(post_id, score)`` pairs by post id.
+    """
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=lists).delete()
+        RelatedPost.objects.bulk_create(
+            RelatedPost(post_id=post_id, related_id=related_id, score=score)
+            for post_id, pairs in lists.items()
+            for related_id, score in pairs)
+
+
+def refresh_related(post_ids):
+    """
+    Update the related posts after the categories or readers of some
+    posts changed.
+
+    Returns:
+        set: The ids of the posts whose related posts changed.
+    """
+    changed = set()
+    for post_id in set(post_ids):
+        scores = similarities(post_id)
+        lists = {post_id: top(scores)}
+        current = defaultdict(dict)
+        rows = RelatedPost.objects.filter(
+            Q(post_id__in=scores)
+            | Q(post_id__in=RelatedPost.objects.filter(related_id=post_id)
+                .values('post_id')))
+        for other, related_id, score in rows.values_list(
+                'post_id', 'related_id', 'score'):
+            current[other][related_id] = score
+        for other in set(scores) | set(current):
+            entries = current[other]
+            score = scores.get(other, 0)
+            old_score = entries.get(post_id)
+            if (old_score is not None and score < old_score
+                    and len(entries) >= RELATED_POSTS):
+                # A post outside the list may now rank above this one.
+                lists[other] = top(similarities(other))
+                continue
+            ranked = {**entries, post_id: score}
+            if not score:
+                del ranked[post_id]
+            ranked = top(ranked)
+            if dict(ranked) != entries:
+                lists[other] = ranked
+        replace_lists(lists)
+        changed.update(lists)
+    return changed
+
+
+def mark_stale(post_ids):
+    """
+    Mark posts whose categories or readers changed for the next refresh.
+    """
+    Post.objects.filter(pk__in=post_ids).update(related_stale=True)
+
+
+def refresh_stale_related(batch_size=100):
+    """
+    Refresh the related posts of the posts marked by ``mark_stale``,
+    ``batch_size`` posts at a time.
+
+    Returns:
+        tuple: The number of refreshed posts and the set of the ids of
+        the posts whose related posts changed.
+    """
+    refreshed = 0
+    changed = set()
+    stale = Post.objects.filter(related_stale=True)
+    while post_ids := list(stale.values_list('pk', flat=True)[:batch_size]):
+        # Unmarked first, so posts marked again meanwhile stay marked.
+        Post.objects.filter(pk__in=post_ids).update(related_stale=False)
+        changed |= refresh_related(post_ids)
+        refreshed += len(post_ids)
+    return refreshed, changed
+
+
+def normalized_rows(pairs, size):
+    """
+    Return a sparse matrix with a row per post and a column per feature,
+    each row scaled to unit length.
+
+    Args:
+        pairs (set): ``(row, feature)`` pairs of the posts' features.
+        size (int): The number of posts.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    columns = {}
+    rows, cols = [], []
+    for row, feature in pairs:
+        rows.append(row)
+        cols.append(columns.setdefault(feature, len(columns)))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(size, len(columns)))
+    lengths = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    lengths[lengths == 0] = 1
+    return sparse.diags(1 / lengths) @ matrix
+
+
+def rebuild_related(chunk_size=500, batch_size=1000):
+    """
+    Recompute the related posts of every post.
+
+    The similarities are the products of the normalized category and
+    reader matrices with their transposes, computed ``chunk_size`` posts
+    at a time so memory stays bounded by the chunk.
+
+    Returns:
+        int: The number of stored related posts.
+    """
+    Post.objects.filter(related_stale=True).update(related_stale=False)
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    index = {post_id: row for row, post_id in enumerate(post_ids)}
+    categories = normalized_rows(
+        {(index[post_id], category_id) for post_id, category_id
+         in PostCategory.objects.values_list('post_id', 'category_id')},
+        len(post_ids))
+    readers = normalized_rows(
+        {(index[post_id], user_id) for model in (Like, Favorite)
+         for post_id, user_id in model.objects.values_list(
+             'post_id', 'user_id')},
+        len(post_ids))
+    related = []
+    for start in range(0, len(post_ids), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        scores = (CATEGORY_WEIGHT * (categories[chunk] @ categories.T)
+                  + READER_WEIGHT * (readers[chunk] @ readers.T)).tocsr()
+        for offset, post_id in enumerate(post_ids[chunk]):
+            row = scores.getrow(offset)
+            pairs = top({post_ids[column]: score for column, score
+                         in zip(row.indices, row.data)
+                         if score > 0 and post_ids[column] != post_id})
+            related += [RelatedPost(post_id=post_id, related_id=related_id,
+                                    score=score)
+                        for related_id, score in pairs]
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(related, batch_size=batch_size)
+    return len(related)
@@ -0,0 +1,243 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+from django.contrib.auth.models import User
+from django.dispatch import Signal, receiver
+from django.template.loader import render_to_string
+from core import events
+from core.purge import purge
+from . import related, trending
+from .models import (
+    Category, Comment, Favorite, Like, Post, RelatedPost,
+    favorite_ids_cache_key, like_ids_cache_key, post_cache_key,
+    reaction_count)
+
+# Sent once per batch, after the transaction commits, when posts are
+# changed with set-based queries that bypass Post.save() and the model
+# signals, e.g. the bulk admin actions. Receivers get ``post_ids``, the ids
+# of the changed posts, and should invalidate anything cached for them.
+posts_changed = Signal()
+
+
+def notify_posts_changed(post_ids):
+    """
+    Send ``posts_changed`` for a batch of posts once the current
+    transaction commits.
+
+    Args:
+        post_ids (list): Ids of the posts that were changed.
+    """
+    post_ids = list(post_ids)
+    transaction.on_commit(
+        lambda: posts_changed.send(sender=Post, post_ids=post_ids))
+
+
+def post_shell_key(post_id):
+    """
+    Return the cache key of the shared shell of a post's detail page.
+    """
+    return make_template_fragment_key('post_shell', [post_id])
+
+
+def invalidate_post_shells(post_ids):
+    """
+    Drop the cached detail page shells of the given posts.
+    """
+    cache.delete_many([post_shell_key(post_id) for post_id in post_ids])
+
+
+def evict_posts(slugs):
+    """
+    Drop the object cache entries of the posts with the given slugs.
+    """
+    cache.delete_many([post_cache_key(slug) for slug in slugs if slug])
+
+
+def forget_posts(posts):
+    """
+    Drop everything cached for some posts and purge their pages.
+
+    Args:
+        posts (QuerySet): The changed posts.
+
+    Returns:
+        list: The ids of the posts.
+    """
+    rows = list(posts.values_list('pk', 'slug'))
+    post_ids = [pk for pk, slug in rows]
+    invalidate_post_shells(post_ids)
+    evict_posts(slug for pk, slug in rows)
+    return post_ids
+
+
+def post_channel(post_id):
+    """
+    Return the name of the event channel of a post's open pages.
+    """
+    return f'post-{post_id}'
+
+
+def publish_comment(comment_id):
+    """
+    Send a newly approved comment, rendered as in the page shell, and the
+    post's approved comment count to the post's open pages.
+    """
+    comment = (Comment.objects.select_related('author', 'post')
+               .filter(pk=comment_id, approved=True).first())
+    if comment is None:
+        return
+    events.publish(post_channel(comment.post_id), 'comment', {
+        'id': comment.pk,
+        'html': render_to_string('blog/includes/comment.html', {
+            'comment': comment, 'post': comment.post, 'shared': True}),
+        'comment_count': Comment.objects.filter(
+            post_id=comment.post_id, approved=True).count(),
+    })
+
+
+def publish_counts(post_id):
+    """
+    Send a post's like and favorite counts to its open pages.
+    """
+    counts = (Post.objects.filter(pk=post_id)
+              .values(likes=reaction_count(Like),
+                      favorites=reaction_count(Favorite))
+              .first())
+    if counts is not None:
+        events.publish(post_channel(post_id), 'counts', counts)
+
+
+def deleted_with_post(kwargs):
+    """
+    Whether a row is deleted along with its post, whose shell, CDN copy
+    and trending score go with it.
+    """
+    origin = kwargs.get('origin')
+    return getattr(origin, 'model', type(origin)) is Post
+
+
+def post_keys(post_ids):
+    return [f'post-{post_id}' for post_id in post_ids]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Also evicts the old slug of a post whose title was changed."""
+    invalidate_post_shells([instance.pk])
+    evict_posts({instance.slug, getattr(instance, '_loaded_slug', None)})
+    instance._loaded_slug = instance.slug
+    purge(post_keys([instance.pk]) + ['listing'])
+
+
+@receiver(post_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def related_post_changed(sender, instance, **kwargs):
+    """
+    Post pages link their related posts by title. Looked up before a
+    deleted post's rows go with it.
+    """
+    invalidate_post_shells(RelatedPost.objects.filter(related=instance)
+                           .values_list('post_id', flat=True))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """
+    Comments are announced to open pages once they are approved, and
+    count towards the trending score while they are.
+    """
+    if deleted_with_post(kwargs):
+        return
+    invalidate_post_shells([instance.post_id])
+    purge(post_keys([instance.post_id]))
+    if kwargs['signal'] is post_save:
+        approved = instance.approved
+        was_approved = getattr(instance, '_loaded_approved', False)
+    else:
+        approved, was_approved = False, instance.approved
+    instance._loaded_approved = approved
+    if approved != was_approved:
+        trending.add_engagement(instance.post_id, 'comment',
+                                instance.created_on, 1 if approved else -1)
+    if approved and not was_approved:
+        transaction.on_commit(partial(publish_comment, instance.pk))
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def post_reaction_changed(sender, instance, **kwargs):
+    """
+    Likes and favorites change the counts in the post's shell and on its
+    open pages, and its trending score. The CDN copy is left to expire
+    instead of being purged on every click.
+    """
+    key = favorite_ids_cache_key if sender is Favorite else like_ids_cache_key
+    cache.delete(key(instance.user_id))
+    if deleted_with_post(kwargs):
+        return
+    invalidate_post_shells([instance.post_id])
+    if kwargs['signal'] is post_delete or kwargs.get('created'):
+        if sender is Favorite:
+            kind, moment = 'favorite', instance.created_on
+        else:
+            kind, moment = 'like', instance.created
+        trending.add_engagement(instance.post_id, kind, moment,
+                                -1 if kwargs['signal'] is post_delete else 1)
+    # Not when the reaction goes with its deleted post or user.
+    origin = kwargs.get('origin')
+    if origin is None or getattr(origin, 'model', type(origin)) is sender:
+        transaction.on_commit(partial(publish_counts, instance.post_id))
+        if kwargs['signal'] is post_delete or kwargs.get('created'):
+            related.mark_stale([instance.post_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """A category is shown on its page, the listings and its posts."""
+    if kwargs.get('created'):
+        return
+    post_ids = forget_posts(instance.posts.all())
+    purge(post_keys(post_ids) + [f'category-{instance.pk}', 'listing'])
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def post_categories_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not reverse and action.startswith('post_'):
+        invalidate_post_shells([instance.pk])
+        evict_posts([instance.slug])
+        post_ids = [instance.pk]
+    elif reverse and action in ('post_add', 'post_remove'):
+        post_ids = forget_posts(Post.objects.filter(pk__in=pk_set))
+    elif reverse and action == 'pre_clear':
+        post_ids = forget_posts(instance.posts.all())
+    else:
+        return
+    purge(post_keys(post_ids) + ['listing'])
+    related.mark_stale(post_ids)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """
+    Cached posts carry their author's username. Saves that cannot change
+    it, such as the last_login update on every login, are skipped.
+    """
+    if created or (update_fields and 'username' not in update_fields):
+        return
+    forget_posts(instance.blog_posts.all())
+
+
+@receiver(posts_changed)
+def bulk_posts_changed(sender, post_ids, **kwargs):
+    forget_posts(Post.objects.filter(pk__in=post_ids))
+    purge(post_keys(post_ids) + ['listing'])
@@ -0,0 +1,137 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.admin_tools import EstimatedCountPaginator
+from core.testing import QueryBudgetMixin
+from .models import Category, Post, RelatedPost
+from .signals import posts_changed
+from .test_query_budgets import BlogDataset
+
+
+class TestAdminChangeLists(QueryBudgetMixin, TestCase):
+    """
+    Test case for the query cost of the blog admin change lists.
+    """
+    def setUp(self):
+        self.data = BlogDataset()
+
+    def check_changelist(self, model, max_queries, query=None):
+        url = reverse(f'admin:blog_{model}_changelist')
+
+        def populate(size):
+            self.data.grow(size)
+            self.client.force_login(self.data.staff)
+
+        self.assertQueryBudget(
+            f'{model} changelist', max_queries, populate,
+            lambda: self.client.get(url, query or {}))
+
+    def test_post_changelist(self):
+        self.check_changelist('post', 5)
+
+    def test_comment_changelist(self):
+        self.check_changelist('comment', 3)
+
+    def test_favorite_changelist(self):
+        self.check_changelist('favorite', 3)
+
+    def test_favorite_changelist_filtered_by_post(self):
+        """The post filter renders the selected post, not every post"""
+        self.data.grow(3)
+        self.client.force_login(self.data.staff)
+        response = self.client.get(
+            reverse('admin:blog_favorite_changelist'),
+            {'post__id__exact': self.data.first.id})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'class="admin-autocomplete')
+        self.assertContains(
+            response, f'<option value="{self.data.first.id}" selected>')
+        self.assertNotContains(response, 'Post 2 |')
+
+    def test_paginator_counts_exactly_without_postgres(self):
+        """Without a planner estimate the paginator falls back to COUNT"""
+        self.data.grow(3)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 3)
+
+    def test_filter_autocomplete_endpoint(self):
+        """The filter's search box is served by the admin autocomplete"""
+        self.data.grow(3)
+        self.client.force_login(self.data.staff)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'blog', 'model_name': 'favorite',
+            'field_name': 'user', 'term': 'read'})
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['reader'])
+
+
+class TestPostBulkActions(TestCase):
+    """
+    Test case for the bulk publish and category admin actions.
+    """
+    def setUp(self):
+        self.data = BlogDataset()
+        self.data.grow(3)
+        self.client.force_login(self.data.staff)
+        self.url = reverse('admin:blog_post_changelist')
+        self.ids = [post.id for post in self.data.posts]
+        self.batches = []
+        posts_changed.connect(self.record_batch)
+        self.addCleanup(posts_changed.disconnect, self.record_batch)
+
+    def record_batch(self, sender, post_ids, **kwargs):
+        self.batches.append(sorted(post_ids))
+
+    def act(self, action, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {
+                'action': action, '_selected_action': self.ids, **extra})
+
+    def test_unpublish_and_publish(self):
+        """Status changes run as one batch and notify once"""
+        self.act('unpublish_posts')
+        self.assertFalse(Post.objects.filter(status=1).exists())
+        self.act('publish_posts')
+        self.assertEqual(Post.objects.filter(status=1).count(), 3)
+        self.assertEqual(self.batches, [sorted(self.ids)] * 2)
+
+    def test_add_and_remove_categories(self):
+        """Categories are changed after the intermediate page is applied"""
+        news = Category.objects.create(name="News")
+        response = self.act('add_categories')
+        self.assertContains(response, 'name="apply"')
+        self.assertEqual(news.posts.count(), 0)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.act('add_categories', apply='1', categories=[news.id])
+        writes = [query['sql'] for query in captured.captured_queries
+                  if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 3)
+        self.assertEqual(news.posts.count(), 3)
+
+        self.act('remove_categories', apply='1', categories=[news.id])
+        self.assertEqual(news.posts.count(), 0)
+        self.assertEqual(len(self.batches), 2)
+
+    def test_category_changes_mark_related_posts_stale(self):
+        """The bulk write bypasses m2m_changed, the action marks the posts"""
+        news = Category.objects.create(name="News")
+        call_command('rebuild_related_posts', stdout=StringIO())
+        before = set(RelatedPost.objects.values_list(
+            'post_id', 'related_id', 'score'))
+        self.act('add_categories', apply='1', categories=[news.id])
+        self.assertEqual(
+            set(Post.objects.filter(related_stale=True)
+                .values_list('pk', flat=True)),
+            set(self.ids))
+        out = StringIO()
+        call_command('rebuild_related_posts', '--stale', stdout=out)
+        self.assertIn("Refreshed 3 posts", out.getvalue())
+        self.assertNotIn(" 0 lists changed", out.getvalue())
+        self.assertNotEqual(set(RelatedPost.objects.values_list(
+            'post_id', 'related_id', 'score')), before)
+        self.assertFalse(Post.objects.filter(related_stale=True).exists())
@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from hwblog import urls as site_urls
+from . import urls as blog_urls
+from . import views
+from .async_views import ASYNC_VIEWS, async_urlpatterns
+from .models import Category, Favorite, Like, Post
+
+urlpatterns = [
+    pattern for pattern in site_urls.urlpatterns
+    if getattr(pattern, 'namespace', None) != 'blog'
+] + [
+    path('', include((async_urlpatterns(blog_urls.urlpatterns), 'blog'),
+                     namespace='blog')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestAsyncViews(TestCase):
+    """
+    Test case for the async views served on ASGI.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.category = Category.objects.create(name="Hardware")
+        self.post = Post.objects.create(
+            title="Post", author=self.reader, content="Content", status=1)
+        self.post.categories.add(self.category)
+        Like.objects.create(user=self.reader, post=self.post)
+
+    def test_async_urlpatterns_swap_views(self):
+        names = {pattern.name: pattern.callback
+                 for pattern in async_urlpatterns(blog_urls.urlpatterns)}
+        for name, view in ASYNC_VIEWS.items():
+            self.assertIs(names[name], view)
+        self.assertNotIn(names['favorite_list'], ASYNC_VIEWS.values())
+
+    async def test_listings(self):
+        for url in ('/', '/category/all/', '/category/Hardware/'):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.context['post_list'][0].like_count, 1)
+                self.assertIn('listing', response['Surrogate-Key'])
+                self.assertIn('public', response['Cache-Control'])
+        response = await self.async_client.get('/', {'page': 5})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_post_detail(self):
+        url = f'/{self.post.slug}/'
+        for _ in range(2):
+            response = await self.async_client.get(url)
+            self.assertContains(response, "Content")
+            self.assertContains(response, 'class="like-count">1<')
+            self.assertContains(response, 'data-events-url')
+        self.assertEqual(response['Surrogate-Key'], f'post-{self.post.pk}')
+        response = await self.async_client.get('/missing/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_shell_counts_are_lazy_values(self):
+        context = views.shell_context(self.post)
+        with self.assertNumQueries(0):
+            views.shell_context(self.post)
+        with self.assertNumQueries(1):
+            self.assertEqual(str(context['like_count']), '1')
+            self.assertEqual(context['like_count'], 1)
+        self.assertFalse(callable(context['favorite_count']))
+
+    async def test_toggles_require_login(self):
+        response = await self.async_client.get(f'/like_post/{self.post.pk}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/login/', response['Location'])
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestAsyncToggles(TestCase):
+    """
+    Test case for the async like and favorite toggles.
+    """
+    def setUp(self):
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.reader, content="Content", status=1)
+        self.async_client.force_login(self.reader)
+
+    async def test_like_toggle(self):
+        url = f'/like_post/{self.post.pk}/'
+        response = await self.async_client.get(url)
+        self.assertRedirects(response, f'/{self.post.slug}/',
+                             fetch_redirect_response=False)
+        self.assertEqual(await Like.objects.acount(), 1)
+        await self.async_client.get(url)
+        self.assertEqual(await Like.objects.acount(), 0)
+        await self.async_client.get(url)
+        await self.async_client.get(f'/unlike_post/{self.post.pk}/')
+        self.assertEqual(await Like.objects.acount(), 0)
+
+    async def test_favorite_toggle(self):
+        await self.async_client.get(f'/favorite_post/{self.post.pk}/')
+        self.assertEqual(await Favorite.objects.acount(), 1)
+        await self.async_client.get(f'/unfavorite_post/{self.post.pk}/')
+        self.assertEqual(await Favorite.objects.acount(), 0)
+        response = await self.async_client.get('/favorite_post/999/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Comment, Post
+
+
+class TestCommentFragments(TestCase):
+    """
+    Test case for the comment endpoints that answer with fragments.
+    """
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="author", password="authorPassword")
+        self.other = User.objects.create_user(
+            username="other", password="otherPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.author, content="Content", status=1)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.author, body="Approved",
+            approved=True)
+        self.client.force_login(self.author)
+
+    def url(self, name, *args):
+        return reverse(f'blog:{name}', args=[self.post.slug, *args])
+
+    def test_create_returns_the_pending_comment(self):
+        response = self.client.post(self.url('ajax_comment_create'),
+                                    {'body': 'Fresh comment'})
+        self.assertEqual(response.status_code, 201)
+        reply = response.json()
+        comment = Comment.objects.get(pk=reply['id'])
+        self.assertEqual(comment.author, self.author)
+        self.assertFalse(comment.approved)
+        self.assertIn('Fresh comment', reply['html'])
+        self.assertIn('Your comment is awaiting approval', reply['html'])
+        self.assertEqual(reply['comment_count'], 1)
+
+    def test_create_rejects_invalid_forms(self):
+        response = self.client.post(self.url('ajax_comment_create'),
+                                    {'body': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('body', response.json()['errors'])
+
+    def test_edit_returns_the_comment(self):
+        response = self.client.post(
+            self.url('ajax_comment_edit', self.comment.id),
+            {'body': 'Edited comment'})
+        self.assertEqual(response.json()['id'], self.comment.id)
+        self.assertIn('Edited comment', response.json()['html'])
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.body, 'Edited comment')
+
+    def test_delete_returns_the_count(self):
+        response = self.client.post(
+            self.url('ajax_comment_delete', self.comment.id))
+        self.assertEqual(response.json(),
+                         {'id': self.comment.id, 'comment_count': 0})
+        self.assertFalse(Comment.objects.exists())
+
+    def test_only_author_and_staff_change_comments(self):
+        self.client.force_login(self.other)
+        for name in ('ajax_comment_edit', 'ajax_comment_delete'):
+            with self.subTest(name=name):
+                response = self.client.post(
+                    self.url(name, self.comment.id), {'body': 'Hijacked'})
+                self.assertEqual(response.status_code, 403)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.body, 'Approved')
+
+    def test_anonymous_and_get_requests_are_refused(self):
+        self.assertEqual(
+            self.client.get(self.url('ajax_comment_create')).status_code,
+            405)
+        self.client.logout()
+        response = self.client.post(self.url('ajax_comment_create'),
+                                    {'body': 'Anonymous'})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('error', response.json())
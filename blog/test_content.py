@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Comment, Post, UserProfile
+
+
+class TestContentPipeline(TestCase):
+    """
+    Test case for the content rendered when posts, comments and profiles
+    are saved.
+    """
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="author", password="authorPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.author, status=1,
+            content='<p onclick="steal()">Hello <b>world</b></p>'
+                    '<script>alert(1)</script>'
+                    '<img src="https://example.com/a.png" alt="A">'
+                    '<a href="javascript:alert(1)">link</a>')
+
+    def test_post_content_is_sanitized(self):
+        html = self.post.content_html
+        self.assertIn("<p>Hello <b>world</b></p>", html)
+        self.assertNotIn("<script", html)
+        self.assertNotIn("onclick", html)
+        self.assertNotIn("javascript:", html)
+        self.assertIn('<img src="https://example.com/a.png" alt="A" '
+                      'loading="lazy" decoding="async" class="img-fluid">',
+                      html)
+
+    def test_reading_time_and_excerpt(self):
+        self.assertEqual(self.post.reading_time, 1)
+        self.assertEqual(self.post.excerpt, "Hello world alert(1) link")
+        self.post.content = "<p>word</p>" * 450
+        self.post.save()
+        self.assertEqual(self.post.reading_time, 3)
+        self.assertEqual(self.post.excerpt, "Hello world alert(1) link")
+        self.post.excerpt = ""
+        self.post.save(update_fields=["content", "excerpt"])
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.excerpt, " ".join(["word"] * 30) + "…")
+
+    def test_partial_saves_keep_the_rendered_content(self):
+        Post.objects.filter(pk=self.post.pk).update(content_html="kept")
+        self.post.status = 0
+        self.post.save(update_fields=["status"])
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).content_html, "kept")
+
+    def test_comment_body_is_escaped(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, approved=True,
+            body="<b>Bold</b>\n\nSecond")
+        self.assertEqual(comment.body_html,
+                         "<p>&lt;b&gt;Bold&lt;/b&gt;</p>\n\n<p>Second</p>")
+        response = self.client.get(
+            reverse('blog:post_detail', args=[self.post.slug]))
+        self.assertContains(response, comment.body_html, html=False)
+        self.assertContains(response, self.post.content_html)
+        self.assertContains(response, "1 min read")
+
+    def test_profile_about_is_sanitized(self):
+        profile = UserProfile.objects.create(
+            user=self.author,
+            about='<i>Hi</i><img src="x" onerror="steal()">')
+        self.assertEqual(profile.about_html, "<i>Hi</i>")
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(reverse('blog:profile')),
+                            "<i>Hi</i>")
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Favorite, Post
+from .views import FAVORITES_PER_PAGE
+
+
+class TestFavorites(TestCase):
+    """
+    Test case for the paginated favorites list and the cached favorite ids.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.posts = [
+            Post.objects.create(title=f"Post {number}", author=self.reader,
+                                content="Content", status=1)
+            for number in range(FAVORITES_PER_PAGE + 3)]
+        for post in self.posts:
+            Favorite.objects.create(user=self.reader, post=post)
+        self.client.force_login(self.reader)
+
+    def test_favorites_are_paginated_newest_first(self):
+        response = self.client.get(reverse('blog:favorite_list'))
+        favorites = response.context['favorites']
+        self.assertEqual(len(favorites), FAVORITES_PER_PAGE)
+        self.assertEqual(favorites[0].post, self.posts[-1])
+        self.assertContains(response, "?page=2")
+        response = self.client.get(
+            reverse('blog:favorite_list'), {'page': 2})
+        self.assertEqual(len(response.context['favorites']), 3)
+
+    def test_favorite_ids_are_cached_until_favorites_change(self):
+        expected = {post.id for post in self.posts}
+        self.assertEqual(Favorite.post_ids_for(self.reader), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(Favorite.post_ids_for(self.reader), expected)
+        Favorite.objects.filter(post=self.posts[0]).delete()
+        self.assertNotIn(self.posts[0].id,
+                         Favorite.post_ids_for(self.reader))
+
+    def test_listing_marks_favorited_posts(self):
+        Favorite.objects.filter(post=self.posts[-1]).delete()
+        response = self.client.get(reverse('blog:home'))
+        self.assertContains(response, 'title="In your favorites"', count=5)
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Category, Favorite, Like, Post
+
+
+class TestListingCards(TestCase):
+    """
+    Test case for the like and favorite state shown on listing cards.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.other = User.objects.create_user(
+            username="other", password="otherPassword")
+        self.category = Category.objects.create(name="Hardware")
+        self.posts = [
+            Post.objects.create(title=f"Post {number}", author=self.reader,
+                                content="Content", status=1)
+            for number in range(3)]
+        for post in self.posts:
+            post.categories.add(self.category)
+        Like.objects.create(user=self.reader, post=self.posts[0])
+        Like.objects.create(user=self.other, post=self.posts[0])
+        Favorite.objects.create(user=self.other, post=self.posts[0])
+        Favorite.objects.create(user=self.reader, post=self.posts[1])
+        self.client.force_login(self.reader)
+
+    def test_cards_show_counts_and_reader_state(self):
+        for url in (reverse('blog:home'),
+                    reverse('blog:post_list_by_category',
+                            args=[self.category.name])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                counts = {post.pk: (post.like_count, post.favorite_count)
+                          for post in response.context['post_list']}
+                self.assertEqual(counts[self.posts[0].pk], (2, 1))
+                self.assertEqual(counts[self.posts[1].pk], (0, 1))
+                self.assertEqual(counts[self.posts[2].pk], (0, 0))
+                self.assertContains(
+                    response, 'title="You liked this post"', count=1)
+                self.assertContains(
+                    response, 'title="In your favorites"', count=1)
+
+    def test_liked_ids_are_cached_until_likes_change(self):
+        self.assertEqual(Like.post_ids_for(self.reader),
+                         {self.posts[0].pk})
+        with self.assertNumQueries(0):
+            Like.post_ids_for(self.reader)
+        Like.objects.create(user=self.reader, post=self.posts[2])
+        self.assertEqual(Like.post_ids_for(self.reader),
+                         {self.posts[0].pk, self.posts[2].pk})
+
+    def test_anonymous_cards_show_counts_only(self):
+        self.client.logout()
+        response = self.client.get(reverse('blog:home'))
+        self.assertNotContains(response, 'title="You liked this post"')
+        self.assertContains(response, 'class="like-count">2<')
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+from core.events import broadcaster
+from .models import Comment, Like, Post
+from .signals import post_channel
+
+
+class TestLiveUpdates(TestCase):
+    """
+    Test case for the live update events of a post's open pages.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.reader, content="Content", status=1)
+        self.channel = post_channel(self.post.pk)
+
+    def published(self, action):
+        """Run an action and return the (channel, message) it published."""
+        with mock.patch.object(broadcaster, 'deliver') as deliver:
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+        return [call.args for call in deliver.call_args_list]
+
+    def test_approving_a_comment_publishes_it(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, body="Pending")
+        self.assertEqual(self.published(comment.save), [])
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.approved = True
+        [(channel, message)] = self.published(comment.save)
+        self.assertEqual(channel, self.channel)
+        self.assertEqual(message['event'], 'comment')
+        self.assertEqual(message['data']['id'], comment.pk)
+        self.assertEqual(message['data']['comment_count'], 1)
+        self.assertIn('comment-block', message['data']['html'])
+        self.assertEqual(self.published(comment.save), [])
+
+    def test_likes_publish_counts(self):
+        def like():
+            Like.objects.create(user=self.reader, post=self.post)
+
+        [(channel, message)] = self.published(like)
+        self.assertEqual(channel, self.channel)
+        self.assertEqual(message, {'event': 'counts',
+                                   'data': {'likes': 1, 'favorites': 0}})
+
+    def test_deleting_a_post_does_not_publish_counts(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        self.assertEqual(self.published(self.post.delete), [])
+
+    def test_stream_is_not_routed_on_wsgi(self):
+        url = reverse('blog:post_detail', args=[self.post.slug])
+        self.assertNotContains(self.client.get(url), 'data-events-url')
+        with self.assertRaises(NoReverseMatch):
+            reverse('blog:post_events', args=[self.post.slug])
+        self.assertEqual(
+            self.client.get(f'/{self.post.slug}/events/').status_code, 404)
+
+    @override_settings(EVENTS_KEEPALIVE=0.01, EVENTS_STREAM_MAX_AGE=0.1,
+                       ROOT_URLCONF='blog.test_async_views')
+    async def test_stream_sends_events(self):
+        response = await self.async_client.get(
+            reverse('blog:post_events', args=[self.post.slug]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry: '))
+        broadcaster.deliver(self.channel, {'event': 'counts', 'data': {}})
+        received = [chunk async for chunk in chunks]
+        self.assertIn(b'event: counts\ndata: {}\n\n', received)
+
+    @override_settings(ROOT_URLCONF='blog.test_async_views')
+    async def test_stream_of_unknown_post_is_not_found(self):
+        response = await self.async_client.get(
+            reverse('blog:post_events', args=['missing']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from .models import Category, Post, post_cache_key
+
+
+class TestPostObjectCache(TestCase):
+    """
+    Test case for the read-through cache of published posts by slug.
+    """
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="author", password="authorPassword")
+        self.category = Category.objects.create(name="Hardware")
+        self.post = Post.objects.create(
+            title="First post", author=self.author, content="Content",
+            status=1)
+        self.post.categories.add(self.category)
+
+    def test_hit_needs_no_queries(self):
+        """A cached post comes with its author name and categories"""
+        Post.get_published("first-post")
+        with self.assertNumQueries(0):
+            post = Post.get_published("first-post")
+            self.assertEqual(str(post.author), "author")
+            self.assertEqual(list(post.categories.all()), [self.category])
+
+    def test_author_password_is_not_cached(self):
+        Post.get_published("first-post")
+        cached = cache.get(post_cache_key("first-post"))
+        self.assertNotIn("password", cached.author.__dict__)
+
+    def test_drafts_are_not_returned(self):
+        Post.objects.create(title="Draft", author=self.author, status=0)
+        self.assertIsNone(Post.get_published("draft"))
+
+    def test_slug_change_evicts_the_old_key(self):
+        """Retitling a post loaded from the database drops both keys"""
+        Post.get_published("first-post")
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = "Renamed post"
+        post.save()
+        self.assertIsNone(cache.get(post_cache_key("first-post")))
+        self.assertIsNone(Post.get_published("first-post"))
+        self.assertEqual(Post.get_published("renamed-post"), post)
+
+    def test_category_changes_evict_the_post(self):
+        changes = [
+            lambda: self.post.categories.add(
+                Category.objects.create(name="Coding")),
+            lambda: self.category.posts.remove(self.post),
+            lambda: Category.objects.get(name="Coding").delete(),
+        ]
+        for change in changes:
+            Post.get_published("first-post")
+            change()
+            self.assertIsNone(cache.get(post_cache_key("first-post")))
+
+    def test_delete_and_author_rename_evict_the_post(self):
+        Post.get_published("first-post")
+        self.author.username = "renamed"
+        self.author.save()
+        self.assertEqual(str(Post.get_published("first-post").author),
+                         "renamed")
+        self.post.delete()
+        self.assertIsNone(Post.get_published("first-post"))
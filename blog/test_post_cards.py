@@ -0,0 +1,72 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from .models import Like, Post
+from .pagination import decode_cursor, encode_cursor
+from .views import PostList
+
+
+class TestPostCards(TestCase):
+    """
+    Test case for the card batches of the infinite scroll.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.size = PostList.paginate_by
+        now = timezone.now()
+        self.posts = []
+        for number in range(self.size * 2 + 1):
+            post = Post.objects.create(
+                title=f"Post {number}", author=self.reader,
+                content="Content", status=1)
+            # Pairs of posts share a creation time, ordered by pk
+            Post.objects.filter(pk=post.pk).update(
+                created_on=now - timedelta(minutes=number // 2))
+            self.posts.append(post)
+        self.listed = sorted(
+            Post.objects.all(), key=lambda post: (post.created_on, post.pk),
+            reverse=True)
+        self.url = reverse('blog:post_cards')
+
+    def test_cursor_round_trip(self):
+        post = self.listed[0]
+        self.assertEqual(decode_cursor(encode_cursor(post)),
+                         (post.created_on, post.pk))
+
+    def test_batches_continue_from_the_home_page(self):
+        response = self.client.get(reverse('blog:home'))
+        cursor = response.context['next_cursor']
+        self.assertContains(response, 'id="cardsSentinel"')
+        seen = [post.pk for post in response.context['post_list']]
+        while cursor:
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            batch = response.json()
+            seen += [post.pk for post in response.context['post_list']]
+            self.assertIn('class="card-title"', batch['html'])
+            cursor = batch['next']
+        self.assertEqual(seen, [post.pk for post in self.listed])
+
+    def test_last_page_has_no_cursor(self):
+        response = self.client.get(reverse('blog:home'), {'page': 3})
+        self.assertNotIn('next_cursor', response.context)
+        self.assertNotContains(response, 'id="cardsSentinel"')
+
+    def test_invalid_cursor(self):
+        for cursor in ('nonsense', 'bm9uc2Vuc2U', encode_cursor(
+                Post(created_on=timezone.now(), pk=1))[:-3]):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_cards_show_reader_state(self):
+        Like.objects.create(user=self.reader, post=self.listed[0])
+        self.client.force_login(self.reader)
+        html = self.client.get(self.url).json()['html']
+        self.assertEqual(html.count('title="You liked this post"'), 1)
+        self.assertEqual(html.count('class="like-count">1<'), 1)
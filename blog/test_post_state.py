@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Category, Comment, Favorite, Like, Post
+from .signals import post_shell_key
+
+
+class TestPostState(TestCase):
+    """
+    Test case for the cached post page shell and the per-reader state.
+    """
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_superuser(
+            username="staff", password="staffPassword",
+            email="staff@test.com")
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.staff, content="Content", status=1)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.reader, body="Approved comment",
+            approved=True)
+        self.detail_url = reverse('blog:post_detail', args=[self.post.slug])
+        self.state_url = reverse('blog:post_state', args=[self.post.slug])
+
+    def test_shell_is_shared_between_readers(self):
+        """The shell is rendered once and reused for other readers"""
+        self.client.force_login(self.reader)
+        self.client.get(self.detail_url)
+        self.assertIsNotNone(cache.get(post_shell_key(self.post.pk)))
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertContains(response, "Approved comment")
+        self.assertContains(response, 'data-author-id="%d" hidden'
+                            % self.reader.pk)
+        self.assertNotContains(response, "Your comment is awaiting")
+
+    def test_shell_is_invalidated(self):
+        """Comments, likes and category changes render a new shell"""
+        changes = [
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, body="New"),
+            lambda: self.comment.delete(),
+            lambda: Like.objects.create(post=self.post, user=self.reader),
+            lambda: Favorite.objects.create(
+                post=self.post, user=self.reader),
+            lambda: self.post.categories.add(
+                Category.objects.create(name="Hardware")),
+            lambda: Category.objects.filter(name="Hardware").first().save(),
+            lambda: self.post.save(),
+        ]
+        for change in changes:
+            self.client.get(self.detail_url)
+            change()
+            self.assertIsNone(cache.get(post_shell_key(self.post.pk)))
+
+    def test_reader_state(self):
+        """A reader gets their flags and their own pending comment"""
+        Like.objects.create(post=self.post, user=self.reader)
+        Comment.objects.create(
+            post=self.post, author=self.reader, body="Mine, pending")
+        Comment.objects.create(
+            post=self.post, author=self.staff, body="Staff, pending")
+        self.client.force_login(self.reader)
+        state = self.client.get(self.state_url).json()
+        self.assertEqual(state['user_id'], self.reader.pk)
+        self.assertTrue(state['liked'])
+        self.assertFalse(state['favorited'])
+        self.assertFalse(state['is_staff'])
+        self.assertIn("Mine, pending", state['pending_html'])
+        self.assertIn("Your comment is awaiting", state['pending_html'])
+        self.assertNotIn("Staff, pending", state['pending_html'])
+
+    def test_staff_state_has_every_pending_comment(self):
+        """Staff see all pending comments with an approve button"""
+        Comment.objects.create(
+            post=self.post, author=self.reader, body="Reader, pending")
+        self.client.force_login(self.staff)
+        state = self.client.get(self.state_url).json()
+        self.assertTrue(state['is_staff'])
+        self.assertIn("Reader, pending", state['pending_html'])
+        self.assertIn("Approve", state['pending_html'])
+
+    def test_state_without_pending_comments_is_one_query(self):
+        """Without pending comments the state costs a single query"""
+        self.client.force_login(self.reader)
+        self.client.get(self.state_url)
+        with self.assertNumQueries(2):
+            state = self.client.get(self.state_url).json()
+        self.assertEqual(state['pending_html'], "")
+
+    def test_anonymous_state(self):
+        """Anonymous readers get no state"""
+        self.assertEqual(self.client.get(self.state_url).json(),
+                         {"authenticated": False})
@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from core.purge import LocalPurger
+from .models import Category, Comment, Like, Post
+
+
+class TestSurrogateKeys(TestCase):
+    """
+    Test case for the surrogate keys of blog pages and their purging.
+    """
+    def setUp(self):
+        LocalPurger.reset()
+        self.user = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.category = Category.objects.create(name="Hardware")
+        self.post = Post.objects.create(
+            title="Post", author=self.user, content="Content", status=1)
+        self.post.categories.add(self.category)
+
+    def purged(self, change):
+        """Run a change and return the keys purged after its commit."""
+        LocalPurger.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        return [key for batch in LocalPurger.batches for key in batch]
+
+    def test_pages_carry_their_keys(self):
+        """Listing, category and post pages are tagged"""
+        response = self.client.get(reverse('blog:home'))
+        self.assertEqual(response['Surrogate-Key'], 'listing')
+        response = self.client.get(
+            reverse('blog:post_list_by_category', args=["Hardware"]))
+        self.assertEqual(response['Surrogate-Key'],
+                         f'listing category-{self.category.pk}')
+        response = self.client.get(
+            reverse('blog:post_detail', args=[self.post.slug]))
+        self.assertEqual(response['Cache-Tag'], f'post-{self.post.pk}')
+
+    def test_post_edit_purges_post_and_listings(self):
+        self.post.content = "Edited"
+        self.assertEqual(self.purged(self.post.save),
+                         ['listing', f'post-{self.post.pk}'])
+
+    def test_comment_approval_purges_the_post(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, body="Comment")
+        comment.approved = True
+        self.assertEqual(self.purged(comment.save),
+                         [f'post-{self.post.pk}'])
+
+    def test_category_rename_purges_its_pages_and_posts(self):
+        self.category.name = "Hardware news"
+        self.assertEqual(
+            self.purged(self.category.save),
+            [f'category-{self.category.pk}', 'listing',
+             f'post-{self.post.pk}'])
+
+    def test_likes_are_not_purged(self):
+        self.assertEqual(self.purged(
+            lambda: Like.objects.create(post=self.post, user=self.user)), [])
@@ -0,0 +1,258 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.testing import QueryBudgetMixin
+from . import urls as blog_urls
+from .async_views import async_urlpatterns
+from .models import Post, Comment, Like, Category, Favorite, UserProfile
+
+
+class BlogDataset:
+    """
+    Builds blog data that can be grown to several sizes within one test.
+
+    Every size step adds published posts in two categories, comments on
+    the first post, and likes and favorites of the reader, so a view that
+    runs a query per row shows a growing query count.
+    """
+    def __init__(self):
+        self.staff = User.objects.create_superuser(
+            username="staff", password="staffPassword",
+            email="staff@test.com")
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        UserProfile.objects.create(user=self.staff)
+        UserProfile.objects.create(user=self.reader)
+        self.category = Category.objects.create(name="Hardware")
+        self.posts = []
+        self.created = 0
+
+    def new_post(self, title=None):
+        self.created += 1
+        post = Post.objects.create(
+            title=title or f"Extra post {self.created}",
+            author=self.staff, content="Post content", status=1)
+        post.categories.add(
+            self.category,
+            Category.objects.get_or_create(name=f"Topic {self.created}")[0])
+        return post
+
+    def new_comment(self, approved=True):
+        return Comment.objects.create(
+            post=self.posts[0], author=self.reader, body="A comment",
+            approved=approved)
+
+    def grow(self, size):
+        while len(self.posts) < size:
+            post = self.new_post(f"Post {len(self.posts)}")
+            self.posts.append(post)
+            Like.objects.create(user=self.reader, post=post)
+            Favorite.objects.create(user=self.reader, post=post)
+            self.new_comment()
+            self.new_comment(approved=False)
+
+    @property
+    def first(self):
+        return self.posts[0]
+
+
+class TestBlogQueryBudgets(QueryBudgetMixin, TestCase):
+    """
+    Declares the maximum number of queries of every route in blog.urls.
+
+    Each check grows the data through ``query_budget_sizes`` and fails if
+    a view exceeds its budget or its query count grows with the data.
+    Budgets are measured with a cold cache.
+    """
+    def setUp(self):
+        self.data = BlogDataset()
+
+    def check(self, name, max_queries, args=lambda data: [], user=None,
+              method='get', form=None, on_commit=False):
+        """
+        Check the query budget of one named route.
+
+        Args:
+            name (str): URL name in the ``blog`` namespace.
+            max_queries (int): The route's query budget.
+            args (callable): Returns the URL arguments for the grown data.
+            user (str): "staff" or "reader" to log in, None for anonymous.
+            method (str): "get" or "post".
+            form (dict): POST data.
+            on_commit (bool): Also count the queries of the callbacks run
+                after the transaction commits, which TestCase skips.
+        """
+        target = {}
+
+        def populate(size):
+            self.data.grow(size)
+            cache.clear()
+            target['url'] = reverse(f'blog:{name}', args=args(self.data))
+            if user:
+                self.client.force_login(getattr(self.data, user))
+
+        def request():
+            if not on_commit:
+                return getattr(self.client, method)(target['url'], form or {})
+            with self.captureOnCommitCallbacks(execute=True):
+                return getattr(self.client, method)(target['url'], form or {})
+
+        self.assertQueryBudget(name, max_queries, populate, request)
+
+    def test_every_route_has_a_budget(self):
+        """Every URL name in blog.urls, on WSGI or ASGI, has a budget"""
+        covered = {name[len('test_'):] for name in dir(self)
+                   if name.startswith('test_')}
+        for pattern in async_urlpatterns(blog_urls.urlpatterns):
+            self.assertIn(pattern.name, covered)
+
+    def test_home(self):
+        self.check('home', 4)
+
+    def test_home_for_reader(self):
+        """The reader's like and favorite ids cost a query each, once"""
+        self.check('home', 7, user='reader')
+
+    def test_post_list_by_category_all(self):
+        self.check('post_list_by_category_all', 4)
+
+    def test_post_list_by_category(self):
+        self.check('post_list_by_category', 3,
+                   args=lambda data: [data.category.name])
+
+    def test_post_detail(self):
+        self.check('post_detail', 7, args=lambda data: [data.first.slug],
+                   user='staff')
+
+    def test_post_state(self):
+        self.check('post_state', 3, args=lambda data: [data.first.slug],
+                   user='reader')
+
+    def test_post_view(self):
+        self.check('post_view', 2, args=lambda data: [data.first.slug],
+                   method='post')
+
+    @override_settings(ROOT_URLCONF='blog.test_async_views')
+    def test_post_events(self):
+        self.check('post_events', 2, args=lambda data: [data.first.slug])
+
+    def test_favorite_list(self):
+        self.check('favorite_list', 3, user='reader')
+
+    def test_post_cards(self):
+        self.check('post_cards', 4)
+
+    def test_trending(self):
+        self.check('trending', 4)
+
+    def test_profile(self):
+        self.check('profile', 2, user='reader')
+
+    def test_edit_profile(self):
+        self.check('edit_profile', 2, user='reader')
+
+    def test_not_logged_in(self):
+        self.check('not_logged_in', 0)
+
+    def test_post_create(self):
+        self.check('post_create', 2, user='staff')
+
+    def test_post_edit(self):
+        self.check('post_edit', 4, args=lambda data: [data.first.id],
+                   user='staff')
+
+    def test_post_delete_confirm(self):
+        self.check('post_delete_confirm', 2,
+                   args=lambda data: [data.first.id], user='staff')
+
+    def test_post_delete(self):
+        self.check('post_delete', 9,
+                   args=lambda data: [data.new_post().id], user='staff',
+                   method='post')
+
+    def test_post_delete_with_reactions(self):
+        """Rows going with a deleted post do not update it one by one"""
+        def reacted_post(data):
+            post = data.new_post()
+            for number in range(len(data.posts)):
+                user = User.objects.create_user(
+                    username=f"reader{data.created}-{number}")
+                Like.objects.create(user=user, post=post)
+                Favorite.objects.create(user=user, post=post)
+                Comment.objects.create(post=post, author=user,
+                                       body="A comment", approved=True)
+            return [post.id]
+
+        self.check('post_delete', 12, args=reacted_post, user='staff',
+                   method='post')
+
+    def test_post_delete_success(self):
+        self.check('post_delete_success', 1, user='staff')
+
+    def test_comment_edit(self):
+        self.check('comment_edit', 3,
+                   args=lambda data: [data.first.slug, data.new_comment().id],
+                   user='reader', method='post', form={'body': 'Edited'})
+
+    def test_comment_delete(self):
+        self.check('comment_delete', 4,
+                   args=lambda data: [data.first.slug, data.new_comment().id],
+                   user='reader')
+
+    def test_ajax_comment_create(self):
+        self.check('ajax_comment_create', 5,
+                   args=lambda data: [data.first.slug],
+                   user='reader', method='post', form={'body': 'New'})
+
+    def test_ajax_comment_edit(self):
+        self.check('ajax_comment_edit', 3,
+                   args=lambda data: [data.first.slug, data.new_comment().id],
+                   user='reader', method='post', form={'body': 'Edited'})
+
+    def test_ajax_comment_delete(self):
+        self.check('ajax_comment_delete', 5,
+                   args=lambda data: [data.first.slug, data.new_comment().id],
+                   user='reader', method='post')
+
+    def test_approve_comment(self):
+        self.check('approve_comment', 4,
+                   args=lambda data: [data.first.slug,
+                                      data.new_comment(False).id],
+                   user='staff', method='post')
+
+    def test_like_post(self):
+        self.check('like_post', 8, args=lambda data: [data.new_post().id],
+                   user='reader')
+
+    def test_unlike_post(self):
+        self.check('unlike_post', 6,
+                   args=lambda data: [data.posts[-1].id], user='reader')
+
+    def test_favorite_post(self):
+        self.check('favorite_post', 8,
+                   args=lambda data: [data.new_post().id], user='reader')
+
+    def test_unfavorite_post(self):
+        self.check('unfavorite_post', 6,
+                   args=lambda data: [data.posts[-1].id], user='reader')
+
+    def test_like_post_after_commit(self):
+        """Related posts are refreshed later, not after the commit"""
+        self.check('like_post', 9, args=lambda data: [data.new_post().id],
+                   user='reader', on_commit=True)
+
+    def test_unlike_post_after_commit(self):
+        self.check('unlike_post', 7,
+                   args=lambda data: [data.posts[-1].id], user='reader',
+                   on_commit=True)
+
+    def test_favorite_post_after_commit(self):
+        self.check('favorite_post', 9,
+                   args=lambda data: [data.new_post().id], user='reader',
+                   on_commit=True)
+
+    def test_unfavorite_post_after_commit(self):
+        self.check('unfavorite_post', 7,
+                   args=lambda data: [data.posts[-1].id], user='reader',
+                   on_commit=True)
@@ -0,0 +1,132 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from . import related
+from .models import Category, Favorite, Like, Post, RelatedPost
+
+
+class TestRelatedPosts(TestCase):
+    """
+    Test case for the precomputed related posts.
+    """
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="author", password="authorPassword")
+        self.readers = [
+            User.objects.create_user(username=f"reader{number}",
+                                     password="readerPassword")
+            for number in range(3)]
+        self.hardware = Category.objects.create(name="Hardware")
+        self.software = Category.objects.create(name="Software")
+        self.posts = [
+            Post.objects.create(title=f"Post {number}", author=self.author,
+                                content="Content", status=1)
+            for number in range(7)]
+
+    def categorize(self, post, *categories):
+        post.categories.add(*categories)
+        related.refresh_stale_related()
+
+    def like(self, reader, *posts):
+        for post in posts:
+            Like.objects.create(user=reader, post=post)
+        related.refresh_stale_related()
+
+    def stored(self):
+        return {(row.post_id, row.related_id): row.score
+                for row in RelatedPost.objects.all()}
+
+    def assertMatchesRebuild(self):
+        incremental = self.stored()
+        related.rebuild_related(chunk_size=3)
+        rebuilt = self.stored()
+        self.assertEqual(set(incremental), set(rebuilt))
+        for pair, score in rebuilt.items():
+            self.assertAlmostEqual(incremental[pair], score)
+
+    def test_similarity_combines_categories_and_readers(self):
+        first, second, third = self.posts[:3]
+        self.categorize(first, self.hardware)
+        self.categorize(second, self.hardware, self.software)
+        self.categorize(third, self.software)
+        self.like(self.readers[0], first, third)
+        scores = related.similarities(first.pk)
+        self.assertAlmostEqual(scores[second.pk],
+                               related.CATEGORY_WEIGHT / 2 ** 0.5)
+        self.assertAlmostEqual(scores[third.pk], related.READER_WEIGHT)
+        self.assertEqual(
+            [row.related_id for row in first.related_posts.all()],
+            [third.pk, second.pk])
+
+    def test_incremental_updates_match_a_rebuild(self):
+        for post in self.posts[:5]:
+            self.categorize(post, self.hardware)
+        self.assertMatchesRebuild()
+        self.like(self.readers[0], *self.posts[4:])
+        self.like(self.readers[1], self.posts[5], self.posts[0])
+        self.assertMatchesRebuild()
+        Favorite.objects.create(user=self.readers[2], post=self.posts[6])
+        Favorite.objects.create(user=self.readers[2], post=self.posts[1])
+        related.refresh_stale_related()
+        self.assertMatchesRebuild()
+        Like.objects.filter(post=self.posts[5]).delete()
+        self.posts[4].categories.clear()
+        related.refresh_stale_related()
+        self.assertMatchesRebuild()
+        self.hardware.posts.remove(self.posts[0])
+        related.refresh_stale_related()
+        self.assertMatchesRebuild()
+
+    def test_changes_mark_posts_for_the_next_refresh(self):
+        first, second = self.posts[:2]
+        self.categorize(first, self.hardware)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.categories.add(self.hardware)
+            Like.objects.create(user=self.readers[0], post=first)
+        self.assertFalse(first.related_posts.exists())
+        self.assertEqual(
+            set(Post.objects.filter(related_stale=True)
+                .values_list('pk', flat=True)),
+            {first.pk, second.pk})
+        out = StringIO()
+        call_command('rebuild_related_posts', '--stale', stdout=out)
+        self.assertIn("Refreshed 2 posts, 2 lists changed", out.getvalue())
+        self.assertEqual(
+            [row.related_id for row in first.related_posts.all()],
+            [second.pk])
+        self.assertFalse(Post.objects.filter(related_stale=True).exists())
+
+    def test_lists_are_limited(self):
+        for post in self.posts:
+            self.categorize(post, self.hardware)
+        for post in self.posts:
+            self.assertEqual(post.related_posts.count(),
+                             related.RELATED_POSTS)
+
+    def test_rebuild_command(self):
+        for post in self.posts[:2]:
+            post.categories.add(self.hardware)
+        out = StringIO()
+        call_command('rebuild_related_posts', stdout=out)
+        self.assertIn("Stored 2 related posts", out.getvalue())
+
+    def test_post_page_links_published_related_posts(self):
+        first, second, draft = self.posts[:3]
+        Post.objects.filter(pk=draft.pk).update(status=0)
+        for post in (first, second, draft):
+            self.categorize(post, self.hardware)
+        url = reverse('blog:post_detail', args=[first.slug])
+        response = self.client.get(url)
+        self.assertContains(
+            response, reverse('blog:post_detail', args=[second.slug]))
+        self.assertNotContains(
+            response, reverse('blog:post_detail', args=[draft.slug]))
+        second.title = "Renamed"
+        second.save()
+        self.assertContains(self.client.get(url), "Renamed")
+        second.delete()
+        self.assertNotContains(self.client.get(url), "Related posts")
@@ -0,0 +1,133 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from . import trending
+from .models import Comment, Favorite, Like, Post
+
+
+class TestTrendingScores(TestCase):
+    """
+    Test case for the incrementally maintained trending scores.
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.other = User.objects.create_user(
+            username="other", password="otherPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.reader, content="Content", status=1)
+        self.quiet = Post.objects.create(
+            title="Quiet", author=self.reader, content="Content", status=1)
+
+    def score(self, post=None):
+        return Post.objects.get(pk=(post or self.post).pk).trending_score
+
+    def rebuilt_score(self, post=None):
+        trending.rebuild_scores()
+        return self.score(post)
+
+    def test_engagement_adds_weighted_scores(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        like = self.score()
+        self.assertGreaterEqual(like, 1)
+        self.assertLessEqual(like, 2)
+        Favorite.objects.create(user=self.reader, post=self.post)
+        Comment.objects.create(post=self.post, author=self.other,
+                               body="Comment", approved=True)
+        self.assertAlmostEqual(self.score() / like, 6, places=3)
+        self.assertAlmostEqual(self.score(), self.rebuilt_score())
+        self.assertEqual(self.score(self.quiet), 0)
+
+    def test_removing_engagement_subtracts_it(self):
+        Like.objects.create(user=self.other, post=self.post)
+        Like.objects.create(user=self.reader, post=self.post)
+        favorite = Favorite.objects.create(user=self.reader, post=self.post)
+        Like.objects.filter(user=self.reader).delete()
+        favorite.delete()
+        self.assertAlmostEqual(self.score(), self.rebuilt_score())
+        # The like goes with its user
+        self.other.delete()
+        self.assertEqual(self.score(), 0)
+
+    def test_only_approved_comments_count(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.other, body="Comment")
+        self.assertEqual(self.score(), 0)
+        comment.approved = True
+        comment.save()
+        approved = self.score()
+        self.assertGreater(approved, 0)
+        comment.save()
+        self.assertEqual(self.score(), approved)
+        comment.approved = False
+        comment.save()
+        self.assertEqual(self.score(), 0)
+        comment.approved = True
+        comment.save()
+        Comment.objects.get(pk=comment.pk).delete()
+        self.assertEqual(self.score(), 0)
+
+    def test_older_engagement_counts_less(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Like.objects.create(user=self.reader, post=self.quiet)
+        half_life = trending.half_life()
+        Like.objects.filter(post=self.quiet).update(
+            created=timezone.now() - half_life)
+        self.assertAlmostEqual(self.rebuilt_score(self.quiet) * 2,
+                               self.score())
+
+    def test_rescale_brings_scores_to_the_current_epoch(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Like.objects.create(user=self.reader, post=self.quiet)
+        later = timezone.now() + trending.half_life() * 3
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            Like.objects.create(user=self.other, post=self.post)
+            self.assertEqual(trending.rescale_scores(), 1)
+        quiet = Post.objects.get(pk=self.quiet.pk)
+        self.assertEqual(quiet.trending_epoch, trending.epoch_of(later))
+        self.assertAlmostEqual(
+            quiet.trending_score,
+            trending.engagement_score(
+                1, Like.objects.get(post=self.quiet).created,
+                quiet.trending_epoch))
+        self.assertGreater(self.score(), quiet.trending_score)
+
+    def test_rescale_forgets_decayed_scores(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        later = timezone.now() + trending.half_life() * 12
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            out = StringIO()
+            call_command('rescale_trending', stdout=out)
+        self.assertIn("Rescaled the scores of 2 posts", out.getvalue())
+        self.assertEqual(self.score(), 0)
+
+    def test_rebuild_command(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Post.objects.update(trending_score=0)
+        out = StringIO()
+        call_command('rescale_trending', '--rebuild', stdout=out)
+        self.assertIn("1 posts are trending", out.getvalue())
+        self.assertGreater(self.score(), 0)
+
+    def test_trending_lists_posts_by_score(self):
+        draft = Post.objects.create(
+            title="Draft", author=self.reader, content="Content")
+        for post in (self.quiet, draft):
+            Like.objects.create(user=self.reader, post=post)
+        Like.objects.create(user=self.reader, post=self.post)
+        Favorite.objects.create(user=self.reader, post=self.post)
+        response = self.client.get(reverse('blog:trending'))
+        self.assertEqual([post.pk for post in response.context['post_list']],
+                         [self.post.pk, self.quiet.pk])
+        self.assertIn('listing', response['Surrogate-Key'])
+        Like.objects.all().delete()
+        Favorite.objects.all().delete()
+        cache.clear()
+        response = self.client.get(reverse('blog:trending'))
+        self.assertContains(response, "No posts are trending right now.")
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from .models import Post
+from .view_counts import add_views, post_views
+
+
+class TestViewCounts(TestCase):
+    """
+    Test case for the buffered view counts of posts.
+    """
+    def setUp(self):
+        cache.clear()
+        post_views.buffer.drain()
+        author = User.objects.create_user(
+            username="author", password="authorPassword")
+        self.posts = [
+            Post.objects.create(title=f"Post {number}", author=author,
+                                content="Content", status=1)
+            for number in range(3)]
+
+    def view_counts(self):
+        return [post.view_count for post in
+                Post.objects.order_by('pk').only('view_count')]
+
+    def test_views_are_added_in_one_update(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(view_count=5)
+        with self.assertNumQueries(1):
+            add_views({str(self.posts[0].pk): 2, self.posts[2].pk: 1})
+        self.assertEqual(self.view_counts(), [7, 0, 1])
+
+    def test_post_views_are_buffered(self):
+        url = reverse('blog:post_view', args=[self.posts[1].slug])
+        for _ in range(3):
+            self.assertEqual(self.client.post(url).status_code, 204)
+        self.assertEqual(self.view_counts(), [0, 0, 0])
+        self.assertEqual(post_views.flush(), 1)
+        self.assertEqual(self.view_counts(), [0, 3, 0])
+
+    def test_views_are_counted_by_the_beacon_only(self):
+        post = self.posts[1]
+        self.client.get(reverse('blog:post_detail', args=[post.slug]))
+        self.assertEqual(
+            self.client.get(reverse('blog:post_view', args=[post.slug]))
+            .status_code, 405)
+        self.assertEqual(post_views.flush(), 0)
@@ -0,0 +1,130 @@
+"""
+Trending scores of posts, decayed exponentially with time.
+
+Every like, favorite and approved comment adds its weight from
+``TRENDING_WEIGHTS`` to the score of its post, halved for every
+``TRENDING_HALF_LIFE_HOURS`` that passed since it was made. Instead of
+decaying every score continuously, time is cut into epochs one half-life
+long and a score is stored as its value at the start of an epoch, in
+``Post.trending_score`` next to the number of that epoch in
+``Post.trending_epoch``. Engagement made during the epoch is worth up to
+twice its weight and older scores keep their relative order, so posts
+can be ranked by the indexed column alone.
+
+Scores change with a single ``UPDATE`` when engagement is added or
+removed, which also brings the score to the current epoch. The scores of
+posts without new engagement are halved once per epoch by
+``rescale_scores``, run from the ``rescale_trending`` management command
+at least hourly, which also resets scores that have decayed below
+``FORGOTTEN_BELOW``. ``rebuild_scores`` recomputes every score from its
+rows, after ``TRENDING_HALF_LIFE_HOURS`` or the weights were changed.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Power
+from django.utils import timezone
+
+from .models import Comment, Favorite, Like, Post
+
+ORIGIN = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+FORGOTTEN_BELOW = 0.01
+
+
+def half_life():
+    return timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def epoch_of(moment):
+    """
+    Return the number of the epoch a moment falls into.
+    """
+    return (moment - ORIGIN) // half_life()
+
+
+def engagement_score(weight, moment, epoch):
+    """
+    Return the score of engagement made at a moment, as of the start of
+    an epoch.
+    """
+    return weight * 2 ** ((moment - ORIGIN) / half_life() - epoch)
+
+
+def score_in_epoch(epoch):
+    """
+    Return an expression of a post's stored score as of the start of an
+    epoch.
+    """
+    return F('trending_score') * Power(
+        Value(2.0), F('trending_epoch') - epoch, output_field=FloatField())
+
+
+def add_engagement(post_id, kind, moment, sign=1):
+    """
+    Add engagement to the score of a post, or remove it with ``sign=-1``.
+
+    Args:
+        post_id (int): The id of the post.
+        kind (str): "like", "favorite" or "comment", a key of
+        ``TRENDING_WEIGHTS``.
+        moment (datetime): When the engagement was made, so removing it
+        subtracts what adding it added.
+        sign (int): 1 to add, -1 to remove.
+    """
+    epoch = epoch_of(timezone.now())
+    change = sign * engagement_score(
+        settings.TRENDING_WEIGHTS[kind], moment, epoch)
+    # Rounding can leave a score just below zero once everything was
+    # removed again.
+    Post.objects.filter(pk=post_id).update(
+        trending_score=Greatest(score_in_epoch(epoch) + change, Value(0.0)),
+        trending_epoch=epoch)
+
+
+def rescale_scores():
+    """
+    Bring the scores of all posts to the current epoch.
+
+    Returns:
+        int: The number of rescaled posts.
+    """
+    epoch = epoch_of(timezone.now())
+    rescaled = (Post.objects.filter(trending_epoch__lt=epoch)
+                .update(trending_score=score_in_epoch(epoch),
+                        trending_epoch=epoch))
+    (Post.objects.filter(trending_score__gt=0,
+                         trending_score__lt=FORGOTTEN_BELOW)
+     .update(trending_score=0))
+    return rescaled
+
+
+def rebuild_scores(batch_size=500):
+    """
+    Recompute the scores of all posts from their likes, favorites and
+    approved comments.
+
+    Returns:
+        int: The number of posts with a score.
+    """
+    epoch = epoch_of(timezone.now())
+    scores = defaultdict(float)
+    engagement = (
+        ('like', Like.objects.values_list('post_id', 'created')),
+        ('favorite', Favorite.objects.values_list('post_id', 'created_on')),
+        ('comment', Comment.objects.filter(approved=True)
+         .values_list('post_id', 'created_on')),
+    )
+    for kind, rows in engagement:
+        weight = settings.TRENDING_WEIGHTS[kind]
+        for post_id, moment in rows.iterator():
+            scores[post_id] += engagement_score(weight, moment, epoch)
+    posts = list(Post.objects.only('pk'))
+    for post in posts:
+        score = scores.get(post.pk, 0)
+        post.trending_score = score if score >= FORGOTTEN_BELOW else 0
+        post.trending_epoch = epoch
+    Post.objects.bulk_update(posts, ['trending_score', 'trending_epoch'],
+                             batch_size=batch_size)
+    return sum(1 for post in posts if post.trending_score)
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
+from .async_views import async_urlpatterns
 from .views import PostDeleteConfirm, PostDelete, PostDeleteSuccess
 
 urlpatterns = [
     path('', views.PostList.as_view(), name='home'),
     path('favorites/', views.favorite_list, name='favorite_list'),
+    path('cards/', views.post_cards, name='post_cards'),
+    path('trending/', views.trending, name='trending'),
     path('profile/', views.profile_view, name='profile'),
     path('edit_profile/', views.edit_profile, name='edit_profile'),
     path('not_logged_in/', views.not_logged_in, name='not_logged_in'),
@@ -17,10 +21,18 @@ urlpatterns = [
     path('post/delete/success', PostDeleteSuccess.as_view(),
          name='post_delete_success'),
     path('<slug:slug>/', views.post_detail, name='post_detail'),
+    path('<slug:slug>/state/', views.post_state, name='post_state'),
+    path('<slug:slug>/view/', views.post_view, name='post_view'),
     path('<slug:slug>/edit_comment/<int:comment_id>',
          views.comment_edit, name='comment_edit'),
     path('<slug:slug>/delete_comment/<int:comment_id>',
          views.comment_delete, name='comment_delete'),
+    path('<slug:slug>/comments/', views.ajax_comment_create,
+         name='ajax_comment_create'),
+    path('<slug:slug>/comments/<int:comment_id>/edit/',
+         views.ajax_comment_edit, name='ajax_comment_edit'),
+    path('<slug:slug>/comments/<int:comment_id>/delete/',
+         views.ajax_comment_delete, name='ajax_comment_delete'),
     path('<slug:slug>/approve_comment/<int:comment_id>/',
          views.approve_comment, name='approve_comment'),
     path('like_post/<int:post_id>/', views.like_post, name='like_post'),
@@ -34,3 +46,6 @@ urlpatterns = [
     path('unfavorite_post/<int:post_id>/', views.unfavorite_post,
          name='unfavorite_post'),
 ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns(urlpatterns)
@@ -0,0 +1,32 @@
+"""
+View counts of posts, buffered by ``core.counters``.
+
+Every loaded post page sends a beacon to ``post_view``, which counts the
+view in ``post_views`` instead of updating the post. The page itself may
+come from the CDN, so it is not counted where it is rendered. The
+buffered views are added to ``Post.view_count`` with one ``UPDATE`` per
+batch.
+"""
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from core.counters import BufferedCounter
+from .models import Post
+
+
+def add_views(deltas):
+    """
+    Add the buffered views of many posts in a single ``UPDATE``.
+
+    Args:
+        deltas (dict): The number of new views by post id.
+    """
+    deltas = {int(post_id): views for post_id, views in deltas.items()}
+    added = Case(
+        *[When(pk=post_id, then=Value(views))
+          for post_id, views in deltas.items()],
+        default=Value(0), output_field=PositiveIntegerField())
+    Post.objects.filter(pk__in=deltas).update(
+        view_count=F('view_count') + added)
+
+
+post_views = BufferedCounter('post-views', add_views)
@@ -1,3 +1,6 @@
+from functools import wraps
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import generic
@@ -5,10 +8,57 @@ from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.generic import DeleteView, DetailView, TemplateView
-from django.db.models import Q
+from django.db.models import Exists, OuterRef
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.core.exceptions import PermissionDenied
-from .models import Post, Comment, Like, Category, Favorite, UserProfile
+from django.core.paginator import Paginator
+from django.contrib.auth.views import redirect_to_login
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from core.http_cache import public_cache
+from core.purge import add_surrogate_keys
+from core.throttling import throttle
+from .models import (
+    Post, Comment, Like, Category, Favorite, UserProfile, reaction_count)
 from .forms import CommentForm, UserForm, UserProfileForm, PostForm
+from .pagination import LISTING_ORDER, after_cursor, encode_cursor
+from .view_counts import post_views
+
+FAVORITES_PER_PAGE = 12
+
+
+def listed_posts(posts):
+    """
+    Prepare a queryset of posts for the listing cards.
+
+    Loads the author and categories, and annotates each post with its
+    ``like_count`` and ``favorite_count`` in the same query, so a page
+    costs the same number of queries whatever its size. The content is
+    not loaded, cards show the excerpt.
+    """
+    return (posts.select_related('author')
+            .defer('content', 'content_html')
+            .prefetch_related('categories')
+            .annotate(like_count=reaction_count(Like),
+                      favorite_count=reaction_count(Favorite))
+            .order_by(*LISTING_ORDER))
+
+
+def reader_state(user):
+    """
+    Return the context that marks the posts a reader liked or favorited.
+
+    Both id sets are cached per user, so marking the cards of a page takes
+    no query per card, and none at all once the sets are cached.
+    """
+    return {
+        'liked_ids': Like.post_ids_for(user),
+        'favorite_ids': Favorite.post_ids_for(user),
+    }
 
 
 class UserPermissionMixin:
@@ -31,6 +81,7 @@ class UserPermissionMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
+@method_decorator(public_cache, name='dispatch')
 class PostList(generic.ListView):
     """
     Display a list of all published posts.
@@ -38,55 +89,110 @@ class PostList(generic.ListView):
     Extends the generic ListView to show all posts with a status of
     'published'. Includes pagination set to 6 posts per page and provides
     a list of all categories to the context for category-based filtering
-    in the template.
+    in the template. Cards show their like and favorite counts, and
+    whether the reader liked or favorited the post.
     """
-    queryset = Post.objects.filter(status=1)
+    queryset = listed_posts(Post.objects.filter(status=1))
     template_name = "blog/index.html"
     paginate_by = 6
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
+        context.update(reader_state(self.request.user))
+        page = context['page_obj']
+        if page.has_next():
+            context['next_cursor'] = encode_cursor(
+                list(page.object_list)[-1])
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        return add_surrogate_keys(response, 'listing')
+
+
+@public_cache
+def post_cards(request):
+    """
+    Return the next batch of listing cards after a cursor, for the
+    infinite scroll of ``js/infinite_scroll.js``.
+
+    Only the cards are rendered, not the page around them. The batch is
+    found by its keyset cursor (see ``blog.pagination``), with one extra
+    post fetched to tell whether another batch follows.
+
+    **Response**
+    ``html``, the rendered cards, and ``next``, the cursor of the
+    following batch or null after the last one. A malformed ``cursor``
+    gets a 400.
+    """
+    posts = listed_posts(Post.objects.filter(status=1))
+    if request.GET.get('cursor'):
+        try:
+            posts = after_cursor(posts, request.GET['cursor'])
+        except ValueError:
+            return JsonResponse({'error': "Invalid cursor."}, status=400)
+    size = PostList.paginate_by
+    batch = list(posts[:size + 1])
+    more = len(batch) > size
+    batch = batch[:size]
+    html = render_to_string('blog/post_cards.html', {
+        'post_list': batch,
+        **reader_state(request.user),
+    }, request=request)
+    response = JsonResponse({
+        'html': html,
+        'next': encode_cursor(batch[-1]) if more else None,
+    })
+    return add_surrogate_keys(response, 'listing')
 
-def post_detail(request, slug):
+
+@public_cache
+def trending(request):
+    """
+    Display the published posts with the highest trending score.
+
+    The posts are read in score order through ``blog_post_trending_idx``
+    (see ``blog.trending`` for how the scores are kept up to date).
     """
-    Display a detailed view of a single post, including its comments
-    and like status.
+    posts = (listed_posts(Post.objects.filter(status=1, trending_score__gt=0))
+             .order_by('-trending_score', '-pk')[:PostList.paginate_by])
+    response = render(request, 'blog/index.html', {
+        'post_list': posts,
+        'categories': Category.objects.all(),
+        'trending': True,
+        **reader_state(request.user),
+    })
+    return add_surrogate_keys(response, 'listing')
 
-    Fetches a post by its slug and status, lists all approved comments
-    associated with it, or unapproved comments made by the current user.
-    Also checks whether the current user has liked or favorited the post.
-    Handles posting of new comments and redirects back to the post detail
-    page on successful comment submission.
+
+@throttle('comment', methods=('POST',))
+@public_cache
+def post_detail(request, slug):
     """
-    post = get_object_or_404(Post, slug=slug, status=1)
+    Display a detailed view of a single post, including its comments.
+
+    The post is read through the object cache (see
+    ``Post.get_published``). It, its approved comments and its like and
+    favorite counts form a page shell that is cached for every reader
+    alike (see ``blog.signals`` for its invalidation). The reader's own
+    like and favorite state, their pending comments and their comment
+    buttons are filled in by ``js/post_state.js`` from
+    :view:`blog.views.post_state`. The same script counts the view
+    through :view:`blog.views.post_view`, so pages served by the CDN are
+    counted too. Handles posting of new comments and redirects back to
+    the post detail page on successful comment submission.
+    """
+    post = Post.get_published(slug)
+    if post is None:
+        raise Http404("No post matches the given query.")
     user_is_auth = request.user.is_authenticated
+    if request.method == "POST" and not user_is_auth:
+        return redirect_to_login(request.get_full_path())
     user_is_privileged = user_is_auth and (
         request.user.is_superuser or request.user.is_staff
     )
 
-    if user_is_privileged:
-        comments = post.comments.order_by("-created_on")
-    elif user_is_auth:
-        comments = post.comments.filter(
-            Q(approved=True) |
-            (Q(approved=False) & Q(author=request.user))
-        ).order_by("-created_on")
-    else:
-        comments = post.comments.filter(approved=True).order_by("-created_on")
-
-    comment_count = comments.count()
-    liked_by_user = (
-        post.likes.filter(user=request.user).exists()
-        if user_is_auth else False
-    )
-    favorited_by_user = (
-        post.favorited_by.filter(user=request.user).exists()
-        if user_is_auth else False
-    )
-
     if request.method == "POST":
         if "comment_id" in request.POST:
             comment_id = request.POST.get("comment_id")
@@ -111,14 +217,115 @@ def post_detail(request, slug):
     else:
         comment_form = CommentForm()
 
-    return render(request, "blog/post_detail.html", {
-        "post": post,
-        "comments": comments,
-        "comment_count": comment_count,
+    response = render(request, "blog/post_detail.html", {
+        **shell_context(post),
         "comment_form": comment_form,
-        "liked_by_user": liked_by_user,
-        "favorited_by_user": favorited_by_user,
+        "live_updates": settings.ASYNC_VIEWS,
     })
+    return add_surrogate_keys(response, f"post-{post.pk}")
+
+
+def approved_comments(post):
+    return (post.comments.filter(approved=True)
+            .select_related("author").order_by("-created_on"))
+
+
+def related_posts(post):
+    """
+    Return the published posts precomputed as related to a post (see
+    ``blog.related``), most similar first.
+    """
+    return (post.related_posts.filter(related__status=1)
+            .select_related("related")
+            .only("related__title", "related__slug"))
+
+
+def shell_context(post):
+    """
+    Return the context of a post's cached page shell.
+
+    The comments, counts and related posts are lazy, so they are only
+    queried when the shell has to be rendered again, and at most once.
+    """
+    return {
+        "post": post,
+        "comments": approved_comments(post),
+        "like_count": SimpleLazyObject(post.likes.count),
+        "favorite_count": SimpleLazyObject(post.favorited_by.count),
+        "related_posts": related_posts(post),
+    }
+
+
+@never_cache
+def post_state(request, slug):
+    """
+    Return the current reader's state of a post as JSON.
+
+    The like and favorite flags, and whether the reader has comments
+    awaiting approval, come from one query on the indexed like, favorite
+    and comment tables. The pending comments (every unapproved comment
+    for staff) are only fetched when there are any.
+
+    **Response**
+    ``authenticated``, ``user_id``, ``is_staff``, ``liked``,
+    ``favorited`` and ``pending_html``, the rendered pending comments.
+    Anonymous readers get ``{"authenticated": false}``.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"authenticated": False})
+    user = request.user
+    is_staff = user.is_superuser or user.is_staff
+    pending = Comment.objects.filter(post=OuterRef("pk"), approved=False)
+    if not is_staff:
+        pending = pending.filter(author=user)
+    state = get_object_or_404(
+        Post.objects.filter(slug=slug, status=1).annotate(
+            liked=Exists(Like.objects.filter(post=OuterRef("pk"), user=user)),
+            favorited=Exists(
+                Favorite.objects.filter(post=OuterRef("pk"), user=user)),
+            has_pending=Exists(pending),
+        ).only("pk", "slug"))
+
+    pending_html = ""
+    if state.has_pending:
+        comments = (state.comments.filter(approved=False)
+                    .select_related("author").order_by("-created_on"))
+        if not is_staff:
+            comments = comments.filter(author=user)
+        pending_html = render_to_string(
+            "blog/includes/pending_comments.html",
+            {"post": state, "comments": comments}, request=request)
+    return JsonResponse({
+        "authenticated": True,
+        "user_id": user.id,
+        "is_staff": is_staff,
+        "liked": state.liked,
+        "favorited": state.favorited,
+        "pending_html": pending_html,
+    })
+
+
+@throttle('view')
+@csrf_exempt
+@require_POST
+@never_cache
+def post_view(request, slug):
+    """
+    Count a view of a post in the buffered ``post_views`` counter.
+
+    Sent as a beacon by every loaded post page, including the pages the
+    CDN serves without reaching Django. Exempt from CSRF, as anonymous
+    readers of a cached page have no token; the ``view`` rate limit
+    bounds how far a client can inflate the count.
+
+    **Response**
+    204 No Content.
+    """
+    post = Post.get_published(slug)
+    if post is None:
+        raise Http404("No post matches the given query.")
+    post_views.increment(post.pk)
+    return HttpResponse(status=204)
 
 
 @login_required
@@ -131,7 +338,7 @@ def comment_edit(request, slug, comment_id):
     comment and redirects to the post detail page.
     """
     comment = get_object_or_404(Comment, id=comment_id, post__slug=slug)
-    if not (request.user == comment.author
+    if not (request.user.id == comment.author_id
             or request.user.is_staff or request.user.is_superuser):
         raise PermissionDenied
 
@@ -160,9 +367,9 @@ def comment_delete(request, slug, comment_id):
     page after successful deletion.
     """
     comment = get_object_or_404(Comment, id=comment_id, post__slug=slug)
-    if request.user.is_authenticated and (request.user.is_staff
-                                          or request.user.is_superuser
-                                          or request.user == comment.author):
+    if request.user.is_authenticated and (
+            request.user.is_staff or request.user.is_superuser
+            or request.user.id == comment.author_id):
         comment.delete()
         messages.success(request, "Comment has been deleted.")
     else:
@@ -171,6 +378,112 @@ def comment_delete(request, slug, comment_id):
     return redirect('blog:post_detail', slug=slug)
 
 
+def json_login_required(view):
+    """
+    Answer anonymous requests to a JSON endpoint with a 403 instead of a
+    redirect to the login page.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Please log in."}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def can_change_comment(user, comment):
+    return (user.id == comment.author_id
+            or user.is_staff or user.is_superuser)
+
+
+def comment_fragment(request, comment, post):
+    """
+    Render one comment as the current reader sees it, with their buttons.
+    """
+    return render_to_string("blog/includes/comment.html",
+                            {"comment": comment, "post": post},
+                            request=request)
+
+
+def approved_count(post_id):
+    return Comment.objects.filter(post_id=post_id, approved=True).count()
+
+
+@throttle('comment')
+@json_login_required
+@require_POST
+def ajax_comment_create(request, slug):
+    """
+    Create a comment from ``js/comments.js`` and return it as a fragment.
+
+    **Response**
+    ``id``, ``html``, the rendered comment awaiting approval, and
+    ``comment_count``, the number of approved comments. Invalid forms get
+    a 400 with the form ``errors``.
+    """
+    post = Post.get_published(slug)
+    if post is None:
+        raise Http404("No post matches the given query.")
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.post = post
+    comment.author = request.user
+    comment.save()
+    return JsonResponse({
+        "id": comment.id,
+        "html": comment_fragment(request, comment, post),
+        "comment_count": approved_count(post.id),
+    }, status=201)
+
+
+@json_login_required
+@require_POST
+def ajax_comment_edit(request, slug, comment_id):
+    """
+    Edit a comment from ``js/comments.js`` and return it as a fragment.
+
+    **Response**
+    ``id`` and ``html``, the rendered comment. Invalid forms get a 400
+    with the form ``errors``.
+    """
+    comment = get_object_or_404(
+        Comment.objects.select_related("author", "post"),
+        id=comment_id, post__slug=slug)
+    if not can_change_comment(request.user, comment):
+        raise PermissionDenied
+    form = CommentForm(request.POST, instance=comment)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    form.save()
+    return JsonResponse({
+        "id": comment.id,
+        "html": comment_fragment(request, comment, comment.post),
+    })
+
+
+@json_login_required
+@require_POST
+def ajax_comment_delete(request, slug, comment_id):
+    """
+    Delete a comment from ``js/comments.js``.
+
+    **Response**
+    ``id`` of the deleted comment and ``comment_count``, the number of
+    approved comments left.
+    """
+    comment = get_object_or_404(Comment, id=comment_id, post__slug=slug)
+    if not can_change_comment(request.user, comment):
+        raise PermissionDenied
+    comment.delete()
+    return JsonResponse({
+        "id": comment_id,
+        "comment_count": approved_count(comment.post_id),
+    })
+
+
+@throttle('like')
 @login_required
 def like_post(request, post_id):
     """
@@ -190,6 +503,7 @@ def like_post(request, post_id):
     return redirect('blog:post_detail', slug=post.slug)
 
 
+@throttle('like')
 @login_required
 def unlike_post(request, post_id):
     """
@@ -208,22 +522,30 @@ def unlike_post(request, post_id):
     return redirect('blog:post_detail', slug=post.slug)
 
 
+@public_cache
 def post_list_by_category(request, category):
     """
     Display a list of posts filtered by a specific category.
 
     Filters the posts by category name and status. Provides a list of
-    all categories to the context for display in the template.
+    all categories to the context for display in the template. The
+    response is tagged with the key of the category, found in that list.
     """
-    posts = Post.objects.filter(categories__name=category, status=1)
-    categories = Category.objects.all()
-    return render(request, 'blog/index.html', {
+    posts = listed_posts(
+        Post.objects.filter(categories__name=category, status=1))
+    categories = list(Category.objects.all())
+    response = render(request, 'blog/index.html', {
         'post_list': posts,
         'categories': categories,
-        'category_name': category
+        'category_name': category,
+        **reader_state(request.user),
     })
+    keys = [f'category-{item.pk}' for item in categories
+            if item.name == category]
+    return add_surrogate_keys(response, 'listing', *keys)
 
 
+@throttle('favorite')
 @login_required
 def favorite_post(request, post_id):
     """
@@ -245,6 +567,7 @@ def favorite_post(request, post_id):
     return redirect('blog:post_detail', slug=post.slug)
 
 
+@throttle('favorite')
 @login_required
 def unfavorite_post(request, post_id):
     """
@@ -272,13 +595,23 @@ def unfavorite_post(request, post_id):
 @login_required
 def favorite_list(request):
     """
-    Displays a list of the logged-in user's favorite posts.
-
-    Fetches all favorite relations for the current user and renders
-    them in a template.
-    """
-    favorites = Favorite.objects.filter(user=request.user)
-    return render(request, 'blog/favorite_list.html', {'favorites': favorites})
+    Displays a page of the logged-in user's favorite posts.
+
+    Fetches one page of favorite relations for the current user, newest
+    first, joined with the fields of their posts the template shows, and
+    renders them in a template.
+    """
+    favorites = (Favorite.objects.filter(user=request.user)
+                 .select_related('post')
+                 .only('post__title', 'post__slug', 'post__featured_image')
+                 .order_by('-pk'))
+    page_obj = Paginator(favorites, FAVORITES_PER_PAGE).get_page(
+        request.GET.get('page'))
+    return render(request, 'blog/favorite_list.html', {
+        'favorites': page_obj.object_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+    })
 
 
 @login_required
@@ -0,0 +1,43 @@
+from django.contrib import admin
+from django.utils.html import format_html
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for the slow-query log.
+
+    Lists the slowest query shapes first and shows the captured EXPLAIN
+    plan on the detail page so missing indexes can be spotted.
+
+    Attributes:
+        list_display (tuple): Normalized SQL, route, call count, average
+        and maximum duration, and when the query was last seen.
+        search_fields (list): Allows searching the SQL and route.
+        readonly_fields (tuple): Every field, the log is written by
+        ``core.slow_queries`` only.
+    """
+    list_display = ('short_sql', 'route', 'calls', 'average_ms', 'max_ms',
+                    'last_seen')
+    list_filter = ('route',)
+    search_fields = ['normalized_sql', 'route']
+    readonly_fields = ('fingerprint', 'normalized_sql', 'example_sql',
+                       'route', 'calls', 'total_ms', 'max_ms',
+                       'formatted_plan', 'first_seen', 'last_seen')
+    exclude = ('plan',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+
+    @admin.display(description='Average ms')
+    def average_ms(self, obj):
+        return round(obj.average_ms, 1)
+
+    @admin.display(description='Plan')
+    def formatted_plan(self, obj):
+        return format_html('<pre>{}</pre>', obj.plan or 'No plan captured.')
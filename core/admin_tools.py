@@ -0,0 +1,217 @@
+"""
+Admin building blocks that keep change lists fast on large tables.
+
+``EstimatedCountPaginator`` reads PostgreSQL's planner estimate instead of
+running ``COUNT(*)`` over an unfiltered table, ``KeysetPaginationMixin``
+pages through a table by a timestamp cursor instead of an OFFSET, and
+``AutocompleteFilter`` replaces list filters that would otherwise load
+every related object into the sidebar with a search box backed by the
+admin autocomplete view.
+"""
+from datetime import datetime
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Return PostgreSQL's estimate of the number of rows in a model's table.
+
+    Args:
+        model (Model): The model whose table is counted.
+        using (str): Database alias.
+
+    Returns:
+        int: The estimate, or None when it is unavailable (other database
+        backends, or a table that has never been analyzed).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate for unfiltered querysets
+    of tables larger than ``threshold`` rows.
+
+    Use together with ``show_full_result_count = False`` on the admin class
+    so the change list never runs an exact ``COUNT(*)`` over the table.
+
+    Attributes:
+        threshold (int): Below this estimate an exact count is cheap enough
+        and is used instead.
+    """
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    List filter for a foreign key that searches the related objects through
+    the admin autocomplete view instead of listing all of them.
+
+    The related model's admin must define ``search_fields``, and the model
+    admin using the filter must include ``AutocompleteFilterMixin`` so the
+    select2 scripts are loaded.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin,
+                         field_path)
+        self.source_model = field.model
+        self.remote_model = field.remote_field.model
+        self.field_name = field.name
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def selected_object(self):
+        if not self.lookup_val:
+            return None
+        return (self.remote_model._default_manager
+                .filter(pk=self.lookup_val).first())
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.selected_object(),
+            'autocomplete_url': reverse('admin:autocomplete'),
+            'app_label': self.source_model._meta.app_label,
+            'model_name': self.source_model._meta.model_name,
+            'field_name': self.field_name,
+            'query_template': changelist.get_query_string(
+                {self.lookup_kwarg: '__value__'}),
+            'clear_query': changelist.get_query_string(
+                remove=[self.lookup_kwarg]),
+        }
+
+
+class AutocompleteFilterMixin:
+    """
+    Adds the select2 media used by ``AutocompleteFilter`` to a model admin.
+    """
+
+    @property
+    def media(self):
+        return (super().media
+                + AutocompleteSelect(None, self.admin_site).media
+                + forms.Media(js=['core/js/autocomplete_filter.js']))
+
+
+CURSOR_VAR = 'cursor'
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list that shows the rows after a ``(timestamp, pk)`` cursor,
+    newest first, instead of an OFFSET page.
+
+    Attributes:
+        next_cursor (str): Cursor of the next page, or None on the last
+        page.
+        is_first_page (bool): True when no cursor was given.
+    """
+
+    def get_results(self, request):
+        field = self.model_admin.keyset_field
+        per_page = self.list_per_page
+        queryset = self.queryset.order_by(f'-{field}', '-pk')
+        cursor = decode_cursor(getattr(request, 'keyset_cursor', None))
+        if cursor:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, 'pk__lt': pk}))
+        rows = list(queryset[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+
+        self.result_list = rows
+        self.result_count = len(rows)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = has_next or cursor is not None
+        self.is_first_page = cursor is None
+        self.next_cursor = (encode_cursor(rows[-1], field)
+                            if has_next else None)
+        self.paginator = None
+
+
+def encode_cursor(obj, field):
+    return f'{getattr(obj, field).isoformat()}_{obj.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor produced by ``encode_cursor``.
+
+    Returns:
+        tuple: ``(timestamp, pk)``, or None if the cursor is missing or
+        malformed, which shows the first page.
+    """
+    if not cursor:
+        return None
+    value, _, pk = cursor.rpartition('_')
+    try:
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError:
+        return None
+
+
+class KeysetPaginationMixin:
+    """
+    Pages a model admin's change list by ``keyset_field`` (newest first)
+    so that late pages cost the same as the first one.
+
+    Column sorting is disabled because the keyset fixes the order. Use a
+    template that renders ``cl.next_cursor`` in its pagination block, such
+    as ``admin/keyset_change_list.html``.
+
+    Attributes:
+        keyset_field (str): An indexed timestamp field to page by.
+    """
+    keyset_field = 'created_on'
+    sortable_by = ()
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        request.GET = request.GET.copy()
+        request.keyset_cursor = request.GET.pop(CURSOR_VAR, [None])[-1]
+        return super().changelist_view(request, extra_context)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    """
+    Provides primary key type for core app and registers the many-to-many
+    tables of models using the query cache
+    """
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from .query_cache import register_m2m_tables
+        register_m2m_tables()
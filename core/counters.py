@@ -0,0 +1,175 @@
+"""
+Counters that buffer increments and write them in batches.
+
+A ``BufferedCounter`` adds increments to a buffer instead of the database
+and hands the accumulated deltas to its ``flush`` function once
+``COUNTER_FLUSH_INTERVAL`` seconds have passed since its last flush or
+``COUNTER_FLUSH_SIZE`` keys are waiting, so a popular row is written once
+per batch instead of once per hit. Counts in the database are eventually
+consistent.
+
+The buffer is named in ``COUNTER_BACKEND``. ``LocalBuffer`` keeps the
+deltas in process memory; they are flushed when the process exits, from
+``atexit`` and gunicorn's ``worker_exit`` hook, so a restart loses no
+counts unless the worker is killed. ``RedisBuffer`` keeps them in a Redis
+hash on ``REDIS_URL`` that every worker adds to, and any worker can
+flush, so they also survive a worker that dies.
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+counters = []
+
+
+class LocalBuffer:
+    """
+    Keeps the deltas of a counter in the memory of this process.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._deltas = {}
+
+    def add(self, key, amount):
+        """
+        Add to the delta of a key.
+
+        Returns:
+            int: The number of keys waiting to be flushed.
+        """
+        with self._lock:
+            self._deltas[key] = self._deltas.get(key, 0) + amount
+            return len(self._deltas)
+
+    def drain(self):
+        """
+        Return the waiting deltas and start over from none.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        return deltas
+
+
+class RedisBuffer:
+    """
+    Keeps the deltas of a counter in a Redis hash on ``REDIS_URL``, shared
+    by every process.
+    """
+    prefix = 'hwblog:counters:'
+
+    def __init__(self, name):
+        import redis
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+        self.key = self.prefix + name
+
+    def add(self, key, amount):
+        pipeline = self.client.pipeline()
+        pipeline.hincrby(self.key, key, amount)
+        pipeline.hlen(self.key)
+        return pipeline.execute()[1]
+
+    def drain(self):
+        """
+        Move the hash aside under a name of its own, so increments made
+        meanwhile start a new one, and return its deltas.
+        """
+        import redis
+        draining = f'{self.key}:draining:{uuid.uuid4().hex}'
+        try:
+            self.client.rename(self.key, draining)
+        except redis.ResponseError:
+            # No deltas, or another process drained them first.
+            return {}
+        pipeline = self.client.pipeline()
+        pipeline.hgetall(draining)
+        pipeline.delete(draining)
+        deltas = pipeline.execute()[0]
+        return {key.decode(): int(delta) for key, delta in deltas.items()}
+
+
+class BufferedCounter:
+    """
+    Counts increments per key and writes them in batches.
+
+    Args:
+        name (str): Names the counter's buffer, unique per counter.
+        flush (callable): Writes a dict of deltas by key. Keys come back
+        as strings from a shared buffer.
+    """
+
+    def __init__(self, name, flush):
+        self.name = name
+        self.flush_deltas = flush
+        self._buffer = None
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+        counters.append(self)
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            self._buffer = import_string(settings.COUNTER_BACKEND)(self.name)
+        return self._buffer
+
+    def increment(self, key, amount=1):
+        """
+        Count a hit on a key, flushing the buffer when a batch is due.
+        """
+        waiting = self.buffer.add(key, amount)
+        if (waiting >= settings.COUNTER_FLUSH_SIZE
+                or time.monotonic() - self._last_flush
+                >= settings.COUNTER_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the waiting deltas. Deltas that could not be written are
+        put back into the buffer for the next flush.
+
+        Returns:
+            int: The number of keys written.
+        """
+        # One flush per process at a time, requests arriving meanwhile
+        # just add to the buffer.
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._last_flush = time.monotonic()
+            deltas = self.buffer.drain()
+            if not deltas:
+                return 0
+            try:
+                self.flush_deltas(deltas)
+            except Exception:
+                logger.exception("Could not flush the %s counter", self.name)
+                for key, delta in deltas.items():
+                    self.buffer.add(key, delta)
+                return 0
+            return len(deltas)
+        finally:
+            self._flush_lock.release()
+
+
+def flush_all():
+    """
+    Flush every counter of this process, e.g. before it exits.
+    """
+    for counter in counters:
+        if counter._buffer is not None:
+            counter.flush()
+
+
+@atexit.register
+def flush_at_exit():
+    # The test database is gone by the time a test run exits.
+    if settings.COUNTER_FLUSH_AT_EXIT:
+        flush_all()
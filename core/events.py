@@ -0,0 +1,202 @@
+"""
+Server-sent events that push live updates to open pages.
+
+Code that changes content calls ``publish`` with a channel, e.g.
+``"post-12"``, an event name and JSON-serialisable data, normally from a
+``transaction.on_commit`` callback. The backend named in
+``EVENTS_BACKEND`` hands the event to the ``broadcaster`` of every web
+process, which puts it on the queue of each open stream of the channel.
+``stream`` turns such a queue into the body of a ``text/event-stream``
+response.
+
+``LocalBackend`` only reaches the current process, which is all a single
+development server or test run needs. ``RedisBackend`` relays events
+through Redis pub/sub so a stream sees events published by any worker.
+
+Streams are meant for the ASGI deployment, where an open stream costs a
+suspended coroutine instead of a worker. Django 4.2 does not notice a
+client leaving a stream, so every stream ends after
+``EVENTS_STREAM_MAX_AGE`` seconds and the browser's ``EventSource``
+reconnects.
+"""
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RETRY_MS = 3000
+
+
+class Broadcaster:
+    """
+    Hands published events to the streams of this process.
+
+    Streams run on an event loop while events are published from request
+    threads, so events are put on the queues with
+    ``call_soon_threadsafe``. A stream whose queue is full misses events
+    instead of holding up the others.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        """
+        Return a new queue that receives the events of a channel. Must be
+        called on the event loop that reads the queue.
+        """
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, {})[queue] = \
+                asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            queues = self._subscribers.get(channel, {})
+            queues.pop(queue, None)
+            if not queues:
+                self._subscribers.pop(channel, None)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, {}))
+
+    def deliver(self, channel, message):
+        """
+        Put a message on the queue of every stream of a channel.
+
+        Args:
+            channel (str): The channel name.
+            message (dict): ``event`` and ``data`` of the event.
+        """
+        with self._lock:
+            targets = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # The loop of an abandoned stream has been closed.
+                self.unsubscribe(channel, queue)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+broadcaster = Broadcaster()
+
+
+class LocalBackend:
+    """
+    Delivers events to the streams of the current process only.
+    """
+
+    def publish(self, channel, message):
+        broadcaster.deliver(channel, message)
+
+    def listen(self):
+        """Nothing to relay, every event is published in this process."""
+
+
+class RedisBackend:
+    """
+    Relays events between processes with Redis pub/sub on ``REDIS_URL``.
+
+    Each process starts one listener thread, the first time a stream
+    opens, that delivers the events of every channel to its broadcaster.
+    """
+    prefix = 'hwblog:events:'
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def publish(self, channel, message):
+        try:
+            self.client.publish(self.prefix + channel, json.dumps(message))
+        except Exception:
+            logger.warning("Could not publish to %s", channel, exc_info=True)
+
+    def listen(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._relay, name='events-relay', daemon=True)
+                self._listener.start()
+
+    def _relay(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self.prefix + '*')
+        for item in pubsub.listen():
+            channel = item['channel'].decode()[len(self.prefix):]
+            broadcaster.deliver(channel, json.loads(item['data']))
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    """
+    Return the backend named in ``EVENTS_BACKEND``, one per process.
+    """
+    return _load_backend(settings.EVENTS_BACKEND)
+
+
+def publish(channel, event, data):
+    """
+    Send an event to every open stream of a channel.
+
+    Args:
+        channel (str): The channel name.
+        event (str): The event name, the ``event:`` field of the stream.
+        data: JSON-serialisable data of the event.
+    """
+    get_backend().publish(channel, {'event': event, 'data': data})
+
+
+def format_event(message):
+    """
+    Encode a message as one ``text/event-stream`` event.
+    """
+    return (f"event: {message['event']}\n"
+            f"data: {json.dumps(message['data'])}\n\n")
+
+
+async def stream(channel):
+    """
+    Yield the encoded events of a channel, with a comment line every
+    ``EVENTS_KEEPALIVE`` seconds to keep proxies from closing the
+    connection, until ``EVENTS_STREAM_MAX_AGE`` seconds have passed.
+    """
+    get_backend().listen()
+    queue = broadcaster.subscribe(channel)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_STREAM_MAX_AGE
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), min(settings.EVENTS_KEEPALIVE, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(message)
+    finally:
+        broadcaster.unsubscribe(channel, queue)
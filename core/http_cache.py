@@ -0,0 +1,101 @@
+"""
+Shared-cache friendly responses for anonymous visitors.
+
+Views decorated with ``public_cache`` are marked as cacheable when they
+answer an anonymous GET. ``AnonymousCacheMiddleware`` (placed before
+``SessionMiddleware`` so it sees the final headers) then removes the
+``Vary: Cookie`` header the session middleware added and sends
+``Cache-Control: public`` instead, as long as the request carried none of
+the site's cookies and the response sets none. Every other response of a
+marked view is sent with ``Cache-Control: private`` so a shared cache
+never stores a personalised page.
+
+The CDN in front of the site must bypass its cache for requests that
+carry the session, CSRF or messages cookie, otherwise a logged-in visitor
+could be served the anonymous page.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+MESSAGES_COOKIE = 'messages'
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def public_cache(view):
+    """
+    Mark a view's anonymous GET responses as cacheable by shared caches for
+    ``PUBLIC_CACHE_MAX_AGE`` seconds.
+
+    The view must not issue a CSRF token or flash messages to anonymous
+    visitors; forms they can submit use ``static/js/csrf.js`` to fetch a
+    token when they are sent. Works on sync and async views.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            response.public_max_age = settings.PUBLIC_CACHE_MAX_AGE
+            return response
+    else:
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            response.public_max_age = settings.PUBLIC_CACHE_MAX_AGE
+            return response
+    return wrapped
+
+
+def has_site_cookies(request):
+    """
+    Return True if the request carries a cookie that can personalise a
+    page.
+    """
+    names = (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME,
+             MESSAGES_COOKIE)
+    return any(name in request.COOKIES for name in names)
+
+
+class AnonymousCacheMiddleware:
+    """
+    Makes the anonymous responses of ``public_cache`` views storable by
+    shared caches.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(
+            request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        max_age = getattr(response, 'public_max_age', None)
+        if max_age is None:
+            return response
+        if (request.method in CACHEABLE_METHODS
+                and response.status_code == 200
+                and not response.cookies
+                and not has_site_cookies(request)):
+            vary = [header.strip() for header
+                    in response.get('Vary', '').split(',')
+                    if header.strip() and header.strip().lower() != 'cookie']
+            if vary:
+                response['Vary'] = ', '.join(vary)
+            elif response.has_header('Vary'):
+                del response['Vary']
+            patch_cache_control(response, public=True, max_age=max_age)
+        else:
+            patch_cache_control(response, private=True)
+        return response
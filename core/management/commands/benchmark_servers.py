@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MODES = {
+    'sync': {},
+    'async': {'ASGI': '1'},
+}
+
+
+def fetch(url):
+    """
+    Request a URL and return its latency in seconds, or None on failure.
+    """
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=30) as response:
+            response.read()
+    except (HTTPError, URLError, OSError):
+        return None
+    return time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    """
+    Compares the throughput of the sync WSGI and the async ASGI deployment.
+
+    Starts gunicorn once per mode with the same number of workers, the
+    second time with ``ASGI`` set so it runs uvicorn workers and the async
+    views, and sends the same requests to both. Run it against a database
+    with realistic data; both servers use the current environment.
+    """
+    help = "Benchmark sync (WSGI) against async (ASGI) workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help="Gunicorn workers in both modes.")
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help="Requests sent to each server.")
+        parser.add_argument(
+            '--concurrency', type=int, default=20,
+            help="Requests in flight at once.")
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Path to request, may be repeated. Defaults to /.")
+        parser.add_argument(
+            '--port', type=int, default=8765,
+            help="Local port the servers listen on.")
+
+    def handle(self, *args, workers, requests, concurrency, paths, port,
+               **options):
+        base = f'http://localhost:{port}'
+        urls = list(islice(cycle(base + path for path in paths or ['/']),
+                           requests))
+        self.stdout.write(
+            f"{requests} requests, {concurrency} concurrent, "
+            f"{workers} workers")
+        for mode, extra_env in MODES.items():
+            env = {key: value for key, value in os.environ.items()
+                   if key != 'ASGI'}
+            env.update(extra_env)
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                 '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+                cwd=settings.BASE_DIR, env=env)
+            try:
+                self.wait_until_up(base + '/')
+                fetch(urls[0])
+                start = time.perf_counter()
+                with ThreadPoolExecutor(concurrency) as pool:
+                    latencies = list(pool.map(fetch, urls))
+                elapsed = time.perf_counter() - start
+            finally:
+                server.terminate()
+                server.wait()
+            self.report(mode, latencies, elapsed)
+
+    def wait_until_up(self, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                urlopen(url, timeout=5).close()
+                return
+            except HTTPError as error:
+                raise CommandError(f"{url} answered {error.code}.")
+            except (URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError(f"The server did not answer {url} in time.")
+
+    def report(self, mode, latencies, elapsed):
+        ok = [latency for latency in latencies if latency is not None]
+        if not ok:
+            self.stdout.write(f"{mode:>5}: every request failed")
+            return
+        self.stdout.write(
+            f"{mode:>5}: {len(ok) / elapsed:8.1f} req/s  "
+            f"p50 {percentile(ok, .5) * 1000:7.1f} ms  "
+            f"p95 {percentile(ok, .95) * 1000:7.1f} ms  "
+            f"errors {len(latencies) - len(ok)}")
@@ -0,0 +1,45 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    Deletes expired database sessions in batches.
+
+    Unlike ``clearsessions``, which removes every expired row in one
+    statement, each batch is a short DELETE by primary key so the session
+    table is never locked for long. Meant to run from the Heroku Scheduler.
+    """
+    help = "Delete expired sessions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of sessions deleted per statement.")
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to wait between batches.")
+
+    def handle(self, *args, batch_size, pause, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        if not hasattr(engine.SessionStore, 'get_model_class'):
+            self.stdout.write(
+                f"{settings.SESSION_ENGINE} does not store sessions in the "
+                "database, nothing to prune.")
+            return
+        model = engine.SessionStore.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)
+                        [:batch_size])
+            if not keys:
+                break
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
+        self.stdout.write(f"Deleted {deleted} expired sessions.")
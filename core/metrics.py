@@ -0,0 +1,174 @@
+"""
+Prometheus metrics for the whole site.
+
+When gunicorn runs several worker processes each worker keeps its own
+counters. Setting ``PROMETHEUS_MULTIPROC_DIR`` (done for us in
+``gunicorn.conf.py``) makes ``prometheus_client`` write every sample to a
+memory-mapped file in that directory, and the ``/metrics`` view merges the
+files of all workers when it is scraped.
+
+Routes are labelled with the resolved URL name (``blog:post_detail``,
+``about``) instead of the raw path so the number of series stays bounded
+no matter how many posts exist.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+UNRESOLVED_ROUTE = '<unresolved>'
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+REQUESTS = Counter(
+    'hwblog_http_requests_total',
+    'Requests handled, by route, method and status code.',
+    ['route', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'hwblog_http_request_duration_seconds',
+    'Time spent producing a response, by route.',
+    ['route'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'hwblog_db_queries_per_request',
+    'Number of database queries run while handling a request, by route.',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_TIME = Histogram(
+    'hwblog_db_query_duration_seconds',
+    'Total database time spent per request, by route.',
+    ['route'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+CACHE_LOOKUPS = Counter(
+    'hwblog_cache_lookups_total',
+    'Cache lookups, by cache name and result (hit or miss).',
+    ['cache', 'result'],
+)
+THROTTLED = Counter(
+    'hwblog_throttled_requests_total',
+    'Requests rejected by the rate limiter, by scope.',
+    ['scope'],
+)
+
+
+def record_cache_lookup(cache_name, hit):
+    """
+    Count a cache lookup so hit ratios can be graphed per cache.
+
+    Args:
+        cache_name (str): A short, fixed name for the cache, e.g. "about".
+        hit (bool): True if the value was found in the cache.
+    """
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def route_name(request):
+    """
+    Return the URL name the request resolved to, used as the route label.
+
+    Args:
+        request (HttpRequest): The request being measured.
+
+    Returns:
+        str: The namespaced view name, or ``<unresolved>`` when no URL
+        pattern matched.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.view_name:
+        return UNRESOLVED_ROUTE
+    return match.view_name
+
+
+def render_latest():
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        tuple: The encoded metrics and their content type.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts queries and the time they take.
+
+    Attributes:
+        count (int): Number of queries executed.
+        duration (float): Total time spent in the database, in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records request count, latency, status and database usage per route.
+
+    Should be the first entry in ``MIDDLEWARE`` so the latency covers the
+    rest of the middleware stack as well as the view.
+
+    Under ASGI the ORM runs in Django's sync thread, out of reach of an
+    execute wrapper installed on the event loop, so async requests only
+    record the request and latency metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, elapsed, queries=None):
+        route = route_name(request)
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        REQUESTS.labels(route, method, str(response.status_code)).inc()
+        LATENCY.labels(route).observe(elapsed)
+        if queries is not None:
+            DB_QUERIES.labels(route).observe(queries.count)
+            DB_TIME.labels(route).observe(queries.duration)
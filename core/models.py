@@ -0,0 +1,57 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """
+    A database query that took longer than ``SLOW_QUERY_THRESHOLD_MS``.
+
+    Queries are grouped by the fingerprint of their normalized SQL, so a
+    query that is slow for many different parameter values is stored once
+    with running totals.
+
+    Attributes:
+        fingerprint (CharField): SHA-1 of the normalized SQL, unique.
+        normalized_sql (TextField): The SQL with literals and parameters
+        replaced by placeholders.
+        example_sql (TextField): The slowest captured statement, with its
+        parameters.
+        route (CharField): URL name of the request that ran the slowest
+        statement.
+        calls (PositiveIntegerField): How often the query was slow.
+        total_ms (FloatField): Summed duration of all slow calls.
+        max_ms (FloatField): Duration of the slowest call.
+        plan (TextField): EXPLAIN output captured for the slowest call.
+        first_seen (DateTimeField): When the query was first recorded.
+        last_seen (DateTimeField): When the query was last recorded.
+
+    Meta:
+        ordering: The slowest queries come first.
+    """
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    example_sql = models.TextField()
+    route = models.CharField(max_length=200, blank=True)
+    calls = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    plan = models.TextField(blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-max_ms"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return f"{self.normalized_sql[:80]} ({self.max_ms:.0f} ms)"
+
+    @property
+    def average_ms(self):
+        """
+        Average duration of the recorded slow calls.
+
+        Returns:
+            float: The mean duration in milliseconds.
+        """
+        return self.total_ms / self.calls if self.calls else 0
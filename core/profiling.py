@@ -0,0 +1,145 @@
+"""
+Opt-in request profiling for live traffic.
+
+``ProfilingMiddleware`` runs a sample of requests under ``cProfile`` and
+writes one ``.prof`` file per profiled request to ``PROFILING_DIR``. Staff
+members can also ask for a profile of a single request by sending an
+``X-Profile: 1`` header or adding ``?profile=1`` to the URL. Only the most
+recent ``PROFILING_MAX_FILES`` profiles are kept.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .metrics import route_name
+
+PROFILE_SUFFIX = '.prof'
+
+
+def profile_dir():
+    """
+    Return the directory profiles are written to, creating it if needed.
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    return settings.PROFILING_DIR
+
+
+def list_profiles():
+    """
+    List the stored profiles, newest first.
+
+    Returns:
+        list: Dicts with the ``name``, ``size`` and ``created`` timestamp of
+        every profile file.
+    """
+    directory = profile_dir()
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            profiles.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'created': datetime.fromtimestamp(
+                    stat.st_mtime, tz=timezone.utc),
+            })
+    profiles.sort(key=lambda profile: profile['created'], reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """
+    Resolve a profile name from a URL to a file inside ``PROFILING_DIR``.
+
+    Args:
+        name (str): The file name of the profile.
+
+    Returns:
+        str: The absolute path, or None if no such profile exists.
+    """
+    if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+def top_functions(path, sort='cumulative', limit=40):
+    """
+    Format the most expensive functions of a stored profile.
+
+    Args:
+        path (str): Path of the ``.prof`` file.
+        sort (str): A ``pstats`` sort key such as "cumulative" or "tottime".
+        limit (int): Number of functions to include.
+
+    Returns:
+        str: The ``pstats`` report as text.
+    """
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def rotate_profiles(keep):
+    """
+    Delete the oldest profiles so that at most ``keep`` remain.
+    """
+    for profile in list_profiles()[keep:]:
+        try:
+            os.remove(os.path.join(profile_dir(), profile['name']))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a sampled fraction of requests, or any staff request that asks
+    for it, and stores the result in a rotating directory.
+
+    Must come after ``AuthenticationMiddleware`` so staff requests can be
+    recognised. The middleware removes itself unless ``PROFILING_ENABLED``
+    is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if (request.headers.get('X-Profile') == '1'
+                or request.GET.get('profile') == '1'):
+            return request.user.is_authenticated and request.user.is_staff
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+
+        route = route_name(request).replace(':', '.')
+        route = re.sub(r'[^\w.-]', '', route)
+        name = (f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}-'
+                f'{route}-{elapsed_ms}ms{PROFILE_SUFFIX}')
+        profiler.dump_stats(os.path.join(profile_dir(), name))
+        rotate_profiles(settings.PROFILING_MAX_FILES)
+        response['X-Profile-Id'] = name
+        return response
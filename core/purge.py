@@ -0,0 +1,149 @@
+"""
+Surrogate keys on responses and targeted purging of CDN caches.
+
+Views tag their responses with ``add_surrogate_keys``. The keys are sent
+both as ``Surrogate-Key`` (space separated, read by Fastly and Varnish) and
+as ``Cache-Tag`` (comma separated, read by Cloudflare). When content
+changes, model signal handlers call ``purge`` with the keys of the pages
+that show it. The keys of one transaction are collected and sent to the
+purger configured in ``CACHE_PURGER`` as one batch after it commits.
+
+Key scheme: ``post-<id>`` for a post page, ``category-<id>`` for a
+category page, ``listing`` for every post listing and ``about`` for the
+about page.
+"""
+import json
+import logging
+import threading
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_batch = threading.local()
+
+
+def add_surrogate_keys(response, *keys):
+    """
+    Tag a response with surrogate keys, keeping keys added earlier.
+
+    Args:
+        response (HttpResponse): The response to tag.
+        *keys (str): The keys, e.g. ``"post-12"``.
+
+    Returns:
+        HttpResponse: The same response.
+    """
+    existing = response.get('Surrogate-Key', '').split()
+    keys = list(dict.fromkeys(existing + list(keys)))
+    response['Surrogate-Key'] = ' '.join(keys)
+    response['Cache-Tag'] = ','.join(keys)
+    return response
+
+
+class LoggingPurger:
+    """
+    Purger that only logs the keys it is asked to purge. Used when no CDN
+    is configured.
+    """
+
+    def purge(self, keys):
+        logger.info("Purge surrogate keys: %s", ' '.join(keys))
+
+
+class LocalPurger:
+    """
+    Stand-in purger for tests that records every batch it receives.
+
+    Attributes:
+        batches (list): The purged batches, each a sorted list of keys.
+    """
+    batches = []
+
+    def purge(self, keys):
+        LocalPurger.batches.append(list(keys))
+
+    @classmethod
+    def reset(cls):
+        """Forget the recorded batches and any keys still pending."""
+        cls.batches.clear()
+        _batch.current = None
+
+
+class FastlyPurger:
+    """
+    Purges keys from a Fastly service with the batch purge API.
+
+    Needs ``FASTLY_SERVICE_ID`` and ``FASTLY_API_TOKEN``.
+    """
+    url = 'https://api.fastly.com/service/{service}/purge'
+    max_keys = 256
+
+    def purge(self, keys):
+        for start in range(0, len(keys), self.max_keys):
+            request = Request(
+                self.url.format(service=settings.FASTLY_SERVICE_ID),
+                data=json.dumps(
+                    {'surrogate_keys': keys[start:start + self.max_keys]}
+                ).encode(),
+                headers={'Fastly-Key': settings.FASTLY_API_TOKEN,
+                         'Content-Type': 'application/json'},
+                method='POST')
+            try:
+                urlopen(request, timeout=5).close()
+            except OSError:
+                logger.warning("Could not purge %s", keys, exc_info=True)
+
+
+def get_purger():
+    """
+    Return an instance of the purger class named in ``CACHE_PURGER``.
+    """
+    return import_string(settings.CACHE_PURGER)()
+
+
+class Batch:
+    """
+    The keys purged within one transaction, sent when it commits.
+    """
+
+    def __init__(self):
+        self.keys = set()
+
+    def __call__(self):
+        if self.keys:
+            get_purger().purge(sorted(self.keys))
+
+    def is_pending(self):
+        """
+        Return True while the batch's commit callback waits to run. Django
+        drops it when its transaction or savepoint is rolled back.
+        """
+        connection = transaction.get_connection()
+        return any(callback is self
+                   for _, callback, *_ in connection.run_on_commit)
+
+
+def purge(keys):
+    """
+    Purge surrogate keys once the current transaction commits.
+
+    Keys purged within the same transaction are sent as one batch by a
+    single commit callback. Outside a transaction they are purged right
+    away. A batch rolled back with its transaction is dropped; keys added
+    inside a savepoint that was rolled back while its batch lives on
+    still go out with it, which only purges a little more than needed.
+
+    Args:
+        keys (iterable): The surrogate keys to purge.
+    """
+    batch = getattr(_batch, 'current', None)
+    if batch is None or not batch.is_pending():
+        batch = _batch.current = Batch()
+        batch.keys.update(keys)
+        transaction.on_commit(batch)
+    else:
+        batch.keys.update(keys)
@@ -0,0 +1,221 @@
+"""
+Opt-in caching of ORM query results with per-table invalidation.
+
+A model opts in by using ``CachedManager`` as its default manager. Reads
+through its querysets are then cached under a key made of the SQL, its
+parameters and the current *generation* of every table the SQL mentions.
+Any write to one of those tables through the ORM (``save()``,
+``delete()``, ``update()``, ``bulk_create()``, ``bulk_update()`` and M2M
+changes) replaces the table's generation, so every entry that read it is
+never looked up again and expires on its own.
+
+Only queries whose tables all belong to opted-in models are cached, and
+the cache is bypassed inside transactions so uncommitted rows are never
+stored. Writes inside a transaction replace the generation again after
+commit. ``QUERY_CACHE_ENABLED`` turns the layer off.
+"""
+import hashlib
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+from django.db.models.query import (
+    FlatValuesListIterable,
+    ModelIterable,
+    ValuesIterable,
+    ValuesListIterable,
+)
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from .metrics import record_cache_lookup
+
+CACHEABLE_ITERABLES = (ModelIterable, ValuesIterable, ValuesListIterable,
+                       FlatValuesListIterable)
+
+_cached_tables = set()
+_all_tables = []
+
+
+def generation_key(table):
+    return f"qc:gen:{table}"
+
+
+def table_generations(tables):
+    """
+    Return the current generation of each table, creating missing ones.
+
+    Args:
+        tables (list): Database table names.
+
+    Returns:
+        list: One generation token per table, in the same order.
+    """
+    keys = [generation_key(table) for table in tables]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate_tables(tables):
+    """
+    Give tables a new generation, now and again when the current
+    transaction commits.
+    """
+    def bump():
+        cache.set_many(
+            {generation_key(table): uuid.uuid4().hex for table in tables},
+            None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def tables_in_sql(sql, connection):
+    """
+    Return the tables of installed models that a statement mentions,
+    including those only read by subqueries.
+    """
+    quote = connection.ops.quote_name
+    if not _all_tables:
+        _all_tables.extend(
+            model._meta.db_table
+            for model in apps.get_models(include_auto_created=True))
+    return sorted(table for table in _all_tables if quote(table) in sql)
+
+
+class CachedQuerySet(models.QuerySet):
+    """
+    QuerySet that serves repeated reads from the cache and invalidates
+    its table on set-based writes.
+    """
+
+    def _cache_key(self):
+        """
+        Return the cache key of this query, or None if it must not be
+        cached.
+        """
+        connection = connections[self.db]
+        if (not settings.QUERY_CACHE_ENABLED
+                or connection.in_atomic_block
+                or self._iterable_class not in CACHEABLE_ITERABLES
+                or self._prefetch_related_lookups
+                or self.query.select_for_update):
+            return None
+        try:
+            sql, params = self.query.get_compiler(using=self.db).as_sql()
+        except EmptyResultSet:
+            return None
+        tables = tables_in_sql(sql, connection)
+        if not tables or not _cached_tables.issuperset(tables):
+            return None
+        generations = table_generations(tables)
+        digest = hashlib.sha1(
+            repr((self.db, self._iterable_class.__name__, sql, params,
+                  generations)).encode()).hexdigest()
+        return f"qc:{digest}"
+
+    def _fetch_cached(self, key):
+        results = cache.get(key)
+        record_cache_lookup("queryset", results is not None)
+        if results is None:
+            super()._fetch_all()
+            cache.set(key, self._result_cache, settings.QUERY_CACHE_TIMEOUT)
+        else:
+            self._result_cache = results
+
+    def _fetch_all(self):
+        key = self._cache_key() if self._result_cache is None else None
+        if key is None:
+            super()._fetch_all()
+        else:
+            self._fetch_cached(key)
+
+    def iterator(self, chunk_size=None):
+        """
+        Serve cacheable queries from the cache as well. Form choice fields
+        iterate their queryset this way; opted-in tables are small enough
+        to be read in full.
+        """
+        key = self._cache_key()
+        if key is None:
+            return super().iterator(chunk_size)
+        clone = self._chain()
+        clone._fetch_cached(key)
+        return iter(clone._result_cache)
+
+    def _invalidate(self):
+        invalidate_tables([self.model._meta.db_table])
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        self._invalidate()
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        result = super().delete()
+        self._invalidate()
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, *args, **kwargs):
+        objs = super().bulk_create(*args, **kwargs)
+        self._invalidate()
+        return objs
+
+    def bulk_update(self, *args, **kwargs):
+        rows = super().bulk_update(*args, **kwargs)
+        self._invalidate()
+        return rows
+
+    bulk_update.alters_data = True
+
+
+def _model_changed(sender, **kwargs):
+    invalidate_tables([sender._meta.db_table])
+
+
+def _m2m_changed(sender, action, **kwargs):
+    table = sender._meta.db_table
+    if action.startswith('post_') and table in _cached_tables:
+        invalidate_tables([table])
+
+
+def register_m2m_tables():
+    """
+    Make the through tables of many-to-many relations between two cached
+    models cacheable too. Called once all models are loaded.
+    """
+    for model in apps.get_models():
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if {model._meta.db_table, field.related_model._meta.db_table} \
+                    <= _cached_tables:
+                _cached_tables.add(through._meta.db_table)
+    m2m_changed.connect(_m2m_changed, dispatch_uid='query_cache_m2m')
+
+
+class CachedManager(models.Manager.from_queryset(CachedQuerySet)):
+    """
+    Default manager of a model whose query results may be cached.
+
+    Registers the model's table as cacheable and connects the signals
+    that invalidate it.
+    """
+
+    def contribute_to_class(self, model, name):
+        super().contribute_to_class(model, name)
+        if model._meta.abstract:
+            return
+        _cached_tables.add(model._meta.db_table)
+        post_save.connect(_model_changed, sender=model, weak=False)
+        post_delete.connect(_model_changed, sender=model, weak=False)
@@ -0,0 +1,214 @@
+"""
+Slow-query log with captured EXPLAIN plans.
+
+``SlowQueryMiddleware`` installs a ``connection.execute_wrapper`` for the
+duration of each request and remembers every statement that takes longer
+than ``SLOW_QUERY_THRESHOLD_MS``. Once the response is ready the captured
+statements are stored as :model:`core.SlowQuery` rows, grouped by the
+fingerprint of their normalized SQL, together with an EXPLAIN plan of the
+slowest call. ``EXPLAIN ANALYZE`` is used on PostgreSQL when
+``SLOW_QUERY_EXPLAIN_ANALYZE`` is set.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .metrics import route_name
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_recording = threading.local()
+
+
+def normalize_sql(sql):
+    """
+    Replace literals and parameters so similar statements compare equal.
+
+    ``IN`` lists of any length collapse to ``IN (...)`` so a query does not
+    get a new fingerprint for every page size.
+
+    Args:
+        sql (str): The SQL as sent to the database.
+
+    Returns:
+        str: The normalized statement.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    """
+    Return a stable identifier for a normalized statement.
+    """
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def explain(sql, params):
+    """
+    Run EXPLAIN for a captured SELECT statement.
+
+    Args:
+        sql (str): The statement with its placeholders.
+        params: The parameters it was executed with.
+
+    Returns:
+        str: The plan as text, or an empty string if the statement cannot
+        be explained.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        prefix = ('EXPLAIN (ANALYZE, BUFFERS) '
+                  if settings.SLOW_QUERY_EXPLAIN_ANALYZE else 'EXPLAIN ')
+    elif vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        logger.warning("Could not explain slow query", exc_info=True)
+        return ''
+    return '\n'.join(' | '.join(str(col) for col in row) for row in rows)
+
+
+class SlowQueryRecorder:
+    """
+    Database execute wrapper that keeps statements slower than a threshold.
+
+    Attributes:
+        threshold_ms (float): Minimum duration of a recorded statement.
+        captured (list): ``(sql, params, duration_ms)`` tuples.
+    """
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if (duration_ms >= self.threshold_ms and not many
+                    and not getattr(_recording, 'active', False)):
+                self.captured.append((sql, params, duration_ms))
+
+
+def record_slow_query(sql, params, duration_ms, route=''):
+    """
+    Store a slow statement, explaining it when it is new or slower than
+    any earlier call.
+
+    Args:
+        sql (str): The statement with its placeholders.
+        params: The parameters it was executed with.
+        duration_ms (float): How long the statement took.
+        route (str): URL name of the request that ran it.
+    """
+    from .models import SlowQuery
+
+    normalized = normalize_sql(sql)
+    key = fingerprint(normalized)
+    example = f"{sql} -- params: {params!r}"
+    query, created = SlowQuery.objects.get_or_create(
+        fingerprint=key,
+        defaults={
+            'normalized_sql': normalized,
+            'example_sql': example,
+            'route': route,
+            'calls': 1,
+            'total_ms': duration_ms,
+            'max_ms': duration_ms,
+            'plan': explain(sql, params),
+        },
+    )
+    if created:
+        return
+    changes = {
+        'calls': F('calls') + 1,
+        'total_ms': F('total_ms') + duration_ms,
+        'max_ms': Greatest(F('max_ms'), duration_ms),
+        'last_seen': timezone.now(),
+    }
+    if duration_ms > query.max_ms:
+        changes.update(example_sql=example, route=route,
+                       plan=explain(sql, params))
+    SlowQuery.objects.filter(pk=query.pk).update(**changes)
+
+
+def save_captured(recorder, route=''):
+    """
+    Persist everything a recorder captured, never raising to the caller.
+    """
+    if not recorder.captured:
+        return
+    _recording.active = True
+    try:
+        for sql, params, duration_ms in recorder.captured:
+            record_slow_query(sql, params, duration_ms, route)
+    except DatabaseError:
+        logger.warning("Could not store slow queries", exc_info=True)
+    finally:
+        _recording.active = False
+
+
+@contextmanager
+def capture_slow_queries(threshold_ms=None, route=''):
+    """
+    Record slow statements run inside the block, e.g. in a management
+    command.
+
+    Args:
+        threshold_ms (float): Overrides ``SLOW_QUERY_THRESHOLD_MS``.
+        route (str): Label stored with the captured statements.
+    """
+    if threshold_ms is None:
+        threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    recorder = SlowQueryRecorder(threshold_ms)
+    with connection.execute_wrapper(recorder):
+        yield recorder
+    save_captured(recorder, route)
+
+
+class SlowQueryMiddleware:
+    """
+    Captures slow queries of every request into the slow-query log.
+
+    The middleware removes itself unless ``SLOW_QUERY_LOG_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = SlowQueryRecorder(settings.SLOW_QUERY_THRESHOLD_MS)
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        save_captured(recorder, route_name(request))
+        return response
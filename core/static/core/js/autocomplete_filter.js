@@ -0,0 +1,15 @@
+'use strict';
+{
+    const $ = django.jQuery; /*global django*/
+
+    // Reload the change list when a value is picked in an autocomplete
+    // list filter, or when the filter is cleared.
+    $(function() {
+        $('.autocomplete-filter').on('change', function() {
+            const value = $(this).val();
+            window.location.search = value
+                ? this.dataset.queryTemplate.replace('__value__', encodeURIComponent(value))
+                : this.dataset.clearQuery;
+        });
+    });
+}
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from .counters import BufferedCounter, LocalBuffer, counters, flush_all
+
+
+@override_settings(COUNTER_BACKEND='core.counters.LocalBuffer',
+                   COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_SIZE=3)
+class TestBufferedCounter(SimpleTestCase):
+    """
+    Test case for counting in a buffer and writing in batches.
+    """
+    def setUp(self):
+        self.batches = []
+        self.counter = BufferedCounter('test', self.batches.append)
+        self.addCleanup(counters.remove, self.counter)
+
+    def test_local_buffer_sums_deltas(self):
+        buffer = LocalBuffer('test')
+        self.assertEqual(buffer.add(1, 1), 1)
+        self.assertEqual(buffer.add(1, 2), 1)
+        self.assertEqual(buffer.add(2, 1), 2)
+        self.assertEqual(buffer.drain(), {1: 3, 2: 1})
+        self.assertEqual(buffer.drain(), {})
+
+    def test_flush_when_enough_keys_wait(self):
+        for key in (1, 1, 2):
+            self.counter.increment(key)
+        self.assertEqual(self.batches, [])
+        self.counter.increment(3)
+        self.assertEqual(self.batches, [{1: 2, 2: 1, 3: 1}])
+
+    def test_flush_when_the_interval_passed(self):
+        self.counter.increment(1)
+        with override_settings(COUNTER_FLUSH_INTERVAL=0):
+            self.counter.increment(1)
+        self.assertEqual(self.batches, [{1: 2}])
+
+    def test_failed_flush_keeps_the_deltas(self):
+        self.counter.increment(1)
+        self.counter.flush_deltas = mock.Mock(side_effect=RuntimeError)
+        with self.assertLogs('core.counters', 'ERROR'):
+            self.assertEqual(self.counter.flush(), 0)
+        self.counter.flush_deltas = self.batches.append
+        self.counter.increment(1)
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.batches, [{1: 2}])
+
+    def test_flush_all_on_exit(self):
+        self.counter.increment(5)
+        flush_all()
+        self.assertEqual(self.batches, [{5: 1}])
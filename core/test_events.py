@@ -0,0 +1,75 @@
+import asyncio
+
+from django.test import SimpleTestCase, override_settings
+from .events import Broadcaster, broadcaster, format_event, publish, stream
+
+
+class TestBroadcaster(SimpleTestCase):
+    """
+    Test case for handing events to the streams of this process.
+    """
+    def test_deliver_from_another_thread(self):
+        hub = Broadcaster()
+
+        async def receive():
+            queue = hub.subscribe('post-1')
+            other = hub.subscribe('post-2')
+            await asyncio.to_thread(
+                hub.deliver, 'post-1', {'event': 'counts', 'data': 1})
+            message = await asyncio.wait_for(queue.get(), 1)
+            self.assertTrue(other.empty())
+            hub.unsubscribe('post-1', queue)
+            hub.unsubscribe('post-2', other)
+            return message
+
+        message = asyncio.run(receive())
+        self.assertEqual(message, {'event': 'counts', 'data': 1})
+        self.assertEqual(hub.subscriber_count('post-1'), 0)
+
+    def test_full_queues_drop_events(self):
+        hub = Broadcaster(queue_size=1)
+
+        async def receive():
+            queue = hub.subscribe('post-1')
+            for number in range(3):
+                hub.deliver('post-1', {'event': 'counts', 'data': number})
+            await asyncio.sleep(0)
+            return queue.qsize(), queue.get_nowait()
+
+        self.assertEqual(asyncio.run(receive()),
+                         (1, {'event': 'counts', 'data': 0}))
+
+    def test_closed_loops_are_unsubscribed(self):
+        hub = Broadcaster()
+
+        async def subscribe():
+            hub.subscribe('post-1')
+
+        asyncio.run(subscribe())
+        hub.deliver('post-1', {'event': 'counts', 'data': 1})
+        self.assertEqual(hub.subscriber_count('post-1'), 0)
+
+
+@override_settings(EVENTS_KEEPALIVE=0.01, EVENTS_STREAM_MAX_AGE=0.2)
+class TestStream(SimpleTestCase):
+    """
+    Test case for encoding a channel as a server-sent event stream.
+    """
+    def test_format_event(self):
+        self.assertEqual(
+            format_event({'event': 'counts', 'data': {'likes': 2}}),
+            'event: counts\ndata: {"likes": 2}\n\n')
+
+    def test_stream_yields_events_and_keepalives_until_max_age(self):
+        async def read():
+            chunks = stream('post-1')
+            received = [await anext(chunks)]
+            publish('post-1', 'counts', {'likes': 2})
+            received += [chunk async for chunk in chunks]
+            return received
+
+        received = asyncio.run(read())
+        self.assertTrue(received[0].startswith('retry: '))
+        self.assertIn('event: counts\ndata: {"likes": 2}\n\n', received)
+        self.assertIn(': keepalive\n\n', received)
+        self.assertEqual(broadcaster.subscriber_count('post-1'), 0)
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+from about.models import About, CollaborateRequest
+from blog.models import Category, Post
+
+
+class TestAnonymousPublicCache(TestCase):
+    """
+    Test case for cookie-free, publicly cacheable anonymous pages.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="readerPassword", is_staff=True)
+        self.post = Post.objects.create(
+            title="Post", author=self.user, content="Content", status=1)
+        self.post.categories.add(Category.objects.create(name="Hardware"))
+        About.objects.create(title="About", content="About content")
+        self.urls = [
+            reverse('blog:home'),
+            reverse('blog:post_detail', args=[self.post.slug]),
+            reverse('blog:post_list_by_category', args=["Hardware"]),
+            reverse('about'),
+        ]
+
+    def test_anonymous_pages_are_public(self):
+        """Anonymous GETs set no cookies and do not vary on cookies"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.cookies)
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+                self.assertIn('public', response['Cache-Control'])
+                self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_logged_in_pages_are_private(self):
+        """Pages rendered for a logged-in user stay out of shared caches"""
+        self.client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_anonymous_post_detail_shows_login_prompt(self):
+        """Anonymous visitors get a login link instead of the form"""
+        url = reverse('blog:post_detail', args=[self.post.slug])
+        response = self.client.get(url)
+        self.assertContains(response, "to leave a comment")
+        self.assertNotContains(response, 'id="commentForm"')
+        response = self.client.post(url, {'body': 'Anonymous'})
+        self.assertRedirects(
+            response, f"{reverse('account_login')}?next={url}",
+            fetch_redirect_response=False)
+        self.assertFalse(self.post.comments.exists())
+
+    def test_collaboration_form_fetches_a_token(self):
+        """The about form posts with a token from the csrf endpoint"""
+        client = Client(enforce_csrf_checks=True)
+        form = {'name': 'Name', 'email': 'test@test.com', 'message': 'Hi'}
+        response = client.get(reverse('about'))
+        self.assertContains(
+            response, f'data-csrf-url="{reverse("csrf_token")}"')
+        self.assertEqual(
+            client.post(reverse('about'), form).status_code, 403)
+        response = client.get(reverse('csrf_token'))
+        self.assertIn('csrftoken', response.cookies)
+        self.assertIn('no-cache', response['Cache-Control'])
+        form['csrfmiddlewaretoken'] = response.json()['token']
+        self.assertEqual(
+            client.post(reverse('about'), form).status_code, 200)
+        self.assertTrue(CollaborateRequest.objects.exists())
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class TestMetricsEndpoint(TestCase):
+    """
+    Test case for the Prometheus metrics endpoint.
+    """
+    def setUp(self):
+        """Create a staff user who may read the metrics"""
+        self.staff = User.objects.create_user(
+            username="staff", password="staffPassword", is_staff=True)
+
+    def test_anonymous_user_is_refused(self):
+        """Metrics are not public when no scrape token is configured"""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_requests_are_labelled_by_url_name(self):
+        """A request to the home page is counted under its URL name"""
+        self.client.get(reverse('blog:home'))
+        self.client.login(username="staff", password="staffPassword")
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            'hwblog_http_requests_total{method="GET",'
+            'route="blog:home",status="200"}')
+        self.assertContains(
+            response,
+            'hwblog_db_queries_per_request_count{route="blog:home"}')
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_scraper_token(self):
+        """A scraper presenting the configured token can read metrics"""
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class TestProfilingMiddleware(TestCase):
+    """
+    Test case for on-demand request profiling and the staff profile pages.
+    """
+    def setUp(self):
+        """Enable profiling into a temporary directory"""
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        settings = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_SAMPLE_RATE=0,
+            PROFILING_DIR=self.profile_dir.name,
+            PROFILING_MAX_FILES=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = User.objects.create_user(
+            username="staff", password="staffPassword", is_staff=True)
+        self.reader = User.objects.create_user(
+            username="reader", password="readerPassword")
+
+    def test_staff_can_request_a_profile(self):
+        """A staff request with ?profile=1 is profiled and listed"""
+        self.client.login(username="staff", password="staffPassword")
+        response = self.client.get(reverse('blog:home'), {'profile': '1'})
+        name = response['X-Profile-Id']
+        self.assertIn('blog.home', name)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.profile_dir.name, name)))
+
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, name)
+        response = self.client.get(reverse('profile_detail', args=[name]))
+        self.assertContains(response, 'function calls')
+
+    def test_other_users_are_not_profiled(self):
+        """The profile flag is ignored for users who are not staff"""
+        self.client.login(username="reader", password="readerPassword")
+        response = self.client.get(reverse('blog:home'), {'profile': '1'})
+        self.assertFalse(response.has_header('X-Profile-Id'))
+
+    def test_old_profiles_are_rotated(self):
+        """Only the newest PROFILING_MAX_FILES profiles are kept"""
+        self.client.login(username="staff", password="staffPassword")
+        for _ in range(3):
+            self.client.get(reverse('blog:home'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(os.listdir(self.profile_dir.name)), 2)
@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import TestCase
+from .purge import LocalPurger, add_surrogate_keys, purge
+
+
+class TestPurge(TestCase):
+    """
+    Test case for surrogate key headers and batched purging.
+    """
+    def setUp(self):
+        LocalPurger.reset()
+
+    def test_surrogate_keys_are_sent_for_fastly_and_cloudflare(self):
+        """Keys are merged into both header formats"""
+        response = add_surrogate_keys(HttpResponse(), 'listing', 'post-1')
+        add_surrogate_keys(response, 'post-1', 'category-2')
+        self.assertEqual(response['Surrogate-Key'],
+                         'listing post-1 category-2')
+        self.assertEqual(response['Cache-Tag'], 'listing,post-1,category-2')
+
+    def test_keys_of_a_transaction_are_sent_as_one_batch(self):
+        """Purges wait for the commit and are deduplicated"""
+        with self.captureOnCommitCallbacks(execute=True):
+            purge(['post-1', 'listing'])
+            purge(['post-2', 'listing'])
+            self.assertEqual(LocalPurger.batches, [])
+        self.assertEqual(LocalPurger.batches,
+                         [['listing', 'post-1', 'post-2']])
+
+    def test_rolled_back_keys_are_not_purged(self):
+        """A rolled back block sends no purge, now or with a later one"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    purge(['post-1'])
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(LocalPurger.batches, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            purge(['post-2'])
+        self.assertEqual(LocalPurger.batches, [['post-2']])
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from blog.forms import PostForm
+from blog.models import Category, Post
+from . import query_cache
+
+
+class TestQueryCache(TransactionTestCase):
+    """
+    Test case for the opt-in queryset cache.
+
+    Runs outside a test transaction because the cache is bypassed inside
+    transactions.
+    """
+    def setUp(self):
+        cache.clear()
+        self.hardware = Category.objects.create(name="Hardware")
+
+    def assertCached(self, read):
+        """Assert that a second read is served without a query."""
+        first = read()
+        with self.assertNumQueries(0):
+            self.assertEqual(read(), first)
+
+    def assertRefetched(self, read, write):
+        """Assert that a write makes the next read query again."""
+        read()
+        write()
+        with self.assertNumQueries(1):
+            return read()
+
+    def test_repeated_reads_are_cached(self):
+        self.assertCached(lambda: list(Category.objects.all()))
+        self.assertCached(
+            lambda: list(Category.objects.values_list('name', flat=True)))
+        self.assertCached(
+            lambda: Category.objects.filter(name="Hardware").first())
+
+    def test_writes_invalidate_the_table(self):
+        """Every kind of ORM write gives the table a new generation"""
+        def read():
+            return list(Category.objects.order_by('name'))
+
+        writes = [
+            lambda: Category.objects.create(name="Coding"),
+            lambda: Category.objects.filter(name="Coding").update(
+                name="Code"),
+            lambda: Category.objects.bulk_create(
+                [Category(name="3D printing")]),
+            lambda: Category.objects.filter(name="Code").delete(),
+        ]
+        for write in writes:
+            names = [category.name
+                     for category in self.assertRefetched(read, write)]
+        self.assertEqual(names, ["3D printing", "Hardware"])
+
+    def test_queries_reading_other_tables_are_not_cached(self):
+        def read():
+            return list(Category.objects.filter(posts__status=1))
+
+        read()
+        with self.assertNumQueries(1):
+            read()
+
+    def test_transactions_bypass_the_cache(self):
+        with transaction.atomic():
+            list(Category.objects.all())
+            with self.assertNumQueries(1):
+                list(Category.objects.all())
+
+    def test_form_choices_are_cached(self):
+        """Choice fields iterating the queryset use the cache as well"""
+        def render():
+            return str(PostForm()['categories'])
+
+        self.assertCached(render)
+        self.assertIn("Hardware", render())
+
+    def test_m2m_changes_are_seen(self):
+        """M2M changes invalidate a cached through table"""
+        author = User.objects.create_user(username="author")
+        post = Post.objects.create(title="Post", author=author, status=1)
+        # No two opted-in models are related many-to-many yet, so the
+        # through table is made cacheable as if both ends were.
+        through = Post.categories.through._meta.db_table
+        cached_tables = query_cache._cached_tables | {through}
+
+        def read():
+            return list(Category.objects.filter(posts=post))
+
+        with mock.patch.object(query_cache, '_cached_tables', cached_tables):
+            self.assertCached(read)
+            post.categories.add(self.hardware)
+            with self.assertNumQueries(1):
+                self.assertEqual(read(), [self.hardware])
+            self.assertCached(read)
+            post.categories.remove(self.hardware)
+            with self.assertNumQueries(1):
+                self.assertEqual(read(), [])
+
+    @override_settings(QUERY_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        list(Category.objects.all())
+        with self.assertNumQueries(1):
+            list(Category.objects.all())
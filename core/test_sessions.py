@@ -0,0 +1,75 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from blog.models import Post
+
+
+class TestStatelessSessions(TestCase):
+    """
+    Test case for cache-backed sessions and cookie message storage.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.user, content="Content", status=1)
+        self.client.force_login(self.user)
+
+    def test_logged_in_requests_do_not_read_the_session_table(self):
+        """The session is served from the cache"""
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('blog:home'))
+        tables = ' '.join(query['sql'] for query in captured)
+        self.assertNotIn('django_session', tables)
+
+    def test_flash_messages_use_a_cookie(self):
+        """A redirecting view stores its message without a session write"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(
+                reverse('blog:like_post', args=[self.post.id]))
+        self.assertIn('messages', response.cookies)
+        tables = ' '.join(query['sql'] for query in captured)
+        self.assertNotIn('django_session', tables)
+        response = self.client.get(response.url)
+        self.assertContains(response, "You have liked the post.")
+
+
+class TestPruneSessions(TestCase):
+    """
+    Test case for the prune_sessions management command.
+    """
+    def create_sessions(self, count, expire_date):
+        Session.objects.bulk_create(
+            Session(session_key=f"{int(expire_date.timestamp())}-{number}",
+                    session_data="", expire_date=expire_date)
+            for number in range(count))
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        """Every expired session goes, active sessions stay"""
+        now = timezone.now()
+        self.create_sessions(25, now - timedelta(days=1))
+        self.create_sessions(3, now + timedelta(days=1))
+        out = StringIO()
+        with self.assertNumQueries(7):
+            call_command('prune_sessions', batch_size=10, stdout=out)
+        self.assertIn("Deleted 25 expired sessions.", out.getvalue())
+        self.assertEqual(Session.objects.count(), 3)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_cookie_sessions_have_nothing_to_prune(self):
+        """The command does nothing for sessions kept in the browser"""
+        out = StringIO()
+        with self.assertNumQueries(0):
+            call_command('prune_sessions', stdout=out)
+        self.assertIn("nothing to prune", out.getvalue())
@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from blog.models import Post
+from .models import SlowQuery
+from .slow_queries import capture_slow_queries, fingerprint, normalize_sql
+
+
+class TestNormalizeSql(TestCase):
+    """
+    Test case for SQL normalization and fingerprints.
+    """
+    def test_literals_and_in_lists_are_replaced(self):
+        """Statements differing only in values share a fingerprint"""
+        first = normalize_sql(
+            "SELECT * FROM blog_post WHERE id IN (%s, %s, %s) "
+            "AND title = 'a'  LIMIT 6")
+        second = normalize_sql(
+            "SELECT * FROM blog_post WHERE id IN (%s) "
+            "AND title = 'other' LIMIT 21")
+        self.assertEqual(
+            first,
+            "SELECT * FROM blog_post WHERE id IN (...) AND title = ? LIMIT ?")
+        self.assertEqual(fingerprint(first), fingerprint(second))
+
+
+class TestSlowQueryLog(TestCase):
+    """
+    Test case for capturing slow queries and their EXPLAIN plans.
+    """
+    def test_capture_groups_by_fingerprint(self):
+        """Repeated slow queries are stored once with an EXPLAIN plan"""
+        with capture_slow_queries(threshold_ms=0, route='test'):
+            list(Post.objects.filter(slug='a'))
+            list(Post.objects.filter(slug='b'))
+        query = SlowQuery.objects.get(normalized_sql__contains='blog_post')
+        self.assertEqual(query.calls, 2)
+        self.assertEqual(query.route, 'test')
+        self.assertIn('blog_post', query.plan)
+
+    @override_settings(SLOW_QUERY_LOG_ENABLED=True,
+                       SLOW_QUERY_THRESHOLD_MS=0)
+    def test_middleware_labels_queries_by_route(self):
+        """Slow queries of a request are stored with the URL name"""
+        self.client.get(reverse('blog:home'))
+        self.assertTrue(
+            SlowQuery.objects.filter(route='blog:home').exists())
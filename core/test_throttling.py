@@ -0,0 +1,141 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from blog.models import Post, Like
+from .throttling import CacheTokenBuckets, parse_rate
+
+RATES = {
+    'like': {'user': '2/m', 'ip': '3/m'},
+    'comment': {'user': '1/m'},
+    'collaborate': {'ip': '1/h'},
+}
+
+
+@override_settings(THROTTLE_RATES=RATES)
+class TestThrottling(TestCase):
+    """
+    Test case for the token bucket rate limiter of the write endpoints.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="readerPassword")
+        self.other = User.objects.create_user(
+            username="other", password="otherPassword")
+        self.post = Post.objects.create(
+            title="Post", author=self.user, content="Content", status=1)
+        self.like_url = reverse('blog:like_post', args=[self.post.id])
+        patcher = mock.patch('core.throttling.time')
+        self.clock = patcher.start()
+        self.clock.time.return_value = 30
+        self.addCleanup(patcher.stop)
+
+    def test_parse_rate(self):
+        """A rate is a bucket size and the seconds it takes to refill"""
+        self.assertEqual(parse_rate('30/m'), (30, 60))
+        self.assertEqual(parse_rate('1/s'), (1, 1))
+
+    def test_tokens_refill_at_the_rate(self):
+        """An empty bucket allows another request once a token refilled"""
+        buckets = CacheTokenBuckets()
+        bucket = [('bucket', 2, 60)]
+        self.assertEqual(buckets.take(bucket, 0), 0)
+        self.assertEqual(buckets.take(bucket, 0), 0)
+        self.assertEqual(buckets.take(bucket, 0), 30)
+        self.assertEqual(buckets.take(bucket, 15), 15)
+        self.assertEqual(buckets.take(bucket, 30), 0)
+        self.assertEqual(buckets.take(bucket, 30), 30)
+
+    def test_bursts_do_not_double_across_a_minute(self):
+        """A full bucket spent at :59 is still empty at :00"""
+        buckets = CacheTokenBuckets()
+        bucket = [('bucket', 2, 60)]
+        for _ in range(2):
+            self.assertEqual(buckets.take(bucket, 59), 0)
+        self.assertEqual(buckets.take(bucket, 60), 29)
+
+    def test_tokens_are_only_taken_when_every_bucket_has_one(self):
+        buckets = CacheTokenBuckets()
+        self.assertEqual(buckets.take([('first', 1, 60)], 0), 0)
+        self.assertEqual(
+            buckets.take([('first', 1, 60), ('second', 1, 60)], 0), 60)
+        self.assertEqual(buckets.take([('second', 1, 60)], 0), 0)
+
+    def test_concurrent_requests_do_not_exceed_the_limit(self):
+        """Requests taken at once cannot all see the same tokens"""
+        buckets = CacheTokenBuckets()
+        start = threading.Barrier(20)
+        waits = []
+
+        def request():
+            start.wait()
+            waits.append(buckets.take([('bucket', 5, 60)], 0))
+
+        threads = [threading.Thread(target=request) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(waits.count(0), 5)
+
+    def test_user_over_limit_gets_429_without_queries(self):
+        """The third like of a user is rejected without any query"""
+        self.client.force_login(self.user)
+        self.client.get(self.like_url)
+        self.client.get(self.like_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.like_url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(Like.objects.exists())
+
+    def test_ip_bucket_is_shared_between_users(self):
+        """Users behind one address share the address's bucket"""
+        self.client.force_login(self.user)
+        self.client.get(self.like_url)
+        self.client.get(self.like_url)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.like_url).status_code, 302)
+        self.assertEqual(self.client.get(self.like_url).status_code, 429)
+
+    def test_rejected_request_does_not_use_up_other_buckets(self):
+        """A request rejected by the IP bucket is not counted for the user"""
+        self.client.force_login(self.other)
+        self.client.get(self.like_url)
+        self.client.get(self.like_url)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.like_url).status_code, 302)
+        for _ in range(2):
+            self.assertEqual(
+                self.client.get(self.like_url).status_code, 429)
+        self.assertEqual(self.client.get(
+            self.like_url, REMOTE_ADDR='10.0.0.1').status_code, 302)
+        self.assertEqual(self.client.get(
+            self.like_url, REMOTE_ADDR='10.0.0.1').status_code, 429)
+
+    def test_only_comment_posts_are_throttled(self):
+        """Reading a post is not limited, posting comments is"""
+        self.client.force_login(self.user)
+        url = reverse('blog:post_detail', args=[self.post.slug])
+        self.client.post(url, {'body': 'First'})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(
+            self.client.post(url, {'body': 'Second'}).status_code, 429)
+        self.assertEqual(self.post.comments.count(), 1)
+
+    def test_collaboration_requests_are_limited_by_ip(self):
+        """An anonymous client can send one collaboration request an hour"""
+        form = {'name': 'Name', 'email': 'test@test.com', 'message': 'Hi'}
+        self.clock.time.return_value = 0
+        self.assertEqual(
+            self.client.post(reverse('about'), form).status_code, 200)
+        response = self.client.post(
+            reverse('about'), form, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('about'), form)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3600')
@@ -0,0 +1,232 @@
+import queue
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from .tiered_cache import (
+    Entry, JournalInvalidation, LocalLRU, LocalTier, RedisInvalidation,
+    TieredCache)
+
+
+class FakeRedis:
+    """
+    Just enough of a Redis client for pub/sub between fake workers.
+    """
+    def __init__(self):
+        self.subscribers = []
+
+    def publish(self, channel, message):
+        for subscriber in self.subscribers:
+            subscriber.put({'data': message})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        client = self
+
+        class PubSub:
+            def subscribe(self, channel):
+                self.messages = queue.Queue()
+                client.subscribers.append(self.messages)
+
+            def listen(self):
+                while True:
+                    yield self.messages.get()
+
+        return PubSub()
+
+
+fake_redis = FakeRedis()
+
+
+class FakeRedisInvalidation(RedisInvalidation):
+    def connect(self):
+        return fake_redis
+
+
+def worker(**options):
+    """
+    Return a cache with the in-memory tier of a worker of its own.
+    """
+    options.setdefault('SYNC_INTERVAL', 0)
+    cache = TieredCache('shared', {'OPTIONS': options})
+    cache.tier = LocalTier('shared', options)
+    return cache
+
+
+class TestTieredCache(SimpleTestCase):
+    """
+    Test case for the per-worker cache in front of the shared cache.
+    """
+    def setUp(self):
+        self.shared = caches['shared']
+        self.shared.clear()
+        self.first = worker()
+        self.second = worker()
+
+    def test_reads_are_answered_from_memory(self):
+        self.first.set('key', 'value')
+        self.second.set('other', 'value')
+        with mock.patch.object(self.shared, 'get',
+                               wraps=self.shared.get) as shared_get, \
+                mock.patch.object(self.shared, 'get_many',
+                                  wraps=self.shared.get_many) as get_many:
+            self.assertEqual(self.first.get('key'), 'value')
+            self.assertEqual(self.first.get_many(['key']), {'key': 'value'})
+        self.assertNotIn(mock.call('key', mock.ANY, None),
+                         shared_get.call_args_list)
+        self.assertNotIn(mock.call(['key'], None), get_many.call_args_list)
+        self.assertEqual(self.second.get('key'), 'value')
+
+    def test_returned_values_are_copies(self):
+        self.first.set('key', ['value'])
+        self.first.get('key').append('changed')
+        self.assertEqual(self.first.get('key'), ['value'])
+
+    def test_lru_drops_least_recently_used(self):
+        lru = LocalLRU(max_entries=2, max_bytes=10)
+        lru.set('a', b'1', 60)
+        lru.set('b', b'2', 60)
+        lru.get('a')
+        lru.set('c', b'3', 60)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), b'1')
+        lru.set('d', b'1234567890', 60)
+        self.assertEqual(len(lru), 1)
+        lru.set('e', b'12345678901', 60)
+        self.assertIsNone(lru.get('e'))
+
+    def test_writes_evict_other_workers(self):
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        self.first.set('key', 2)
+        self.assertEqual(self.second.get('key'), 2)
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+        self.second.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.first.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.second.clear()
+        self.assertEqual(self.first.get_many(['a', 'b']), {})
+
+    def in_memory(self, cache, key):
+        return cache.tier.lru.get(cache.make_key(key)) is not None
+
+    def test_writes_evict_only_the_written_keys(self):
+        self.first.set_many({'kept': 1, 'key': 1})
+        self.assertEqual(self.second.get_many(['kept', 'key']),
+                         {'kept': 1, 'key': 1})
+        self.first.set('key', 2)
+        self.assertEqual(self.second.get('key'), 2)
+        self.assertTrue(self.in_memory(self.second, 'kept'))
+        self.assertTrue(self.in_memory(self.first, 'key'))
+
+    @mock.patch.object(JournalInvalidation, 'journal_length', 2)
+    def test_lagging_worker_empties_its_memory(self):
+        self.first.set('kept', 1)
+        self.assertEqual(self.second.get('kept'), 1)
+        for number in range(3):
+            self.first.set(number, number)
+        self.assertEqual(self.second.get(0), 0)
+        self.assertFalse(self.in_memory(self.second, 'kept'))
+
+    def test_expired_workers_leave_the_registry(self):
+        self.first.set('key', 1)
+        self.second.get('key')
+        registry = JournalInvalidation.registry_key
+        self.assertEqual(len(self.shared.get(registry)), 2)
+        self.shared.delete(self.first.tier.invalidation.journal_key(
+            self.first.tier.invalidation.origin))
+        self.shared.set(registry, {self.first.tier.invalidation.origin})
+        worker().get('key')
+        self.assertEqual(len(self.shared.get(registry)), 1)
+        self.second.get('key')
+        self.assertEqual(len(self.shared.get(registry)), 2)
+
+    def test_redis_invalidation_evicts_the_written_keys(self):
+        first = worker(INVALIDATION='core.test_tiered_cache.'
+                                    'FakeRedisInvalidation')
+        second = worker(INVALIDATION='core.test_tiered_cache.'
+                                     'FakeRedisInvalidation')
+        subscribed = len(fake_redis.subscribers)
+        # Reads start the listeners.
+        first.get('key')
+        second.get('key')
+        while len(fake_redis.subscribers) < subscribed + 2:
+            time.sleep(0.01)
+        first.set('kept', 1)
+        second.set('key', 1)
+        self.assertEqual(first.get('key'), 1)
+        second.set('key', 2)
+        deadline = time.monotonic() + 2
+        while (first.tier.lru.get(first.make_key('key')) is not None
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        self.assertEqual(first.get('key'), 2)
+        self.assertIsNotNone(first.tier.lru.get(first.make_key('kept')))
+
+    def test_timeouts_are_jittered(self):
+        cache = worker(JITTER=0.5, STALE_TIMEOUT=0)
+        now = time.time()
+        fresh_for = set()
+        for number in range(20):
+            cache.set(number, 'value', 100)
+            fresh_for.add(round(self.shared.get(number).fresh_until - now))
+        self.assertTrue(all(49 <= seconds <= 100 for seconds in fresh_for))
+        self.assertGreater(len(fresh_for), 1)
+
+    def test_stale_value_is_served_while_one_reader_refreshes(self):
+        self.shared.set('key', Entry('old', time.time() - 1), 60)
+        self.assertIsNone(self.first.get('key'))
+        self.assertEqual(self.second.get('key'), 'old')
+        self.assertEqual(self.first.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.assertIsNone(self.shared.get('key:refresh'))
+
+    def test_get_or_set_computes_once_per_worker(self):
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(self.first.get_or_set('key', load)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_get_or_set_waits_for_another_worker(self):
+        self.shared.add('key:refresh', 1)
+        timer = threading.Timer(0.1, self.first.set, ['key', 'theirs'])
+        timer.start()
+        self.assertEqual(self.second.get_or_set('key', 'ours'), 'theirs')
+        timer.join()
+
+    def test_get_or_set_stops_waiting_when_the_claim_is_released(self):
+        self.shared.add('key:refresh', 1)
+        timer = threading.Timer(0.1, self.shared.delete, ['key:refresh'])
+        timer.start()
+        started = time.monotonic()
+        self.assertIsNone(self.second.get_or_set('key', lambda: None))
+        self.assertLess(time.monotonic() - started, self.second.lock_wait)
+        timer.join()
+
+    def test_get_or_set_does_not_store_none(self):
+        self.assertIsNone(self.first.get_or_set('key', lambda: None))
+        self.assertFalse(self.first.has_key('key'))
+        self.assertIsNone(self.shared.get('key:refresh'))
+        self.assertEqual(self.second.get_or_set('key', 'value'), 'value')
+
+    def test_add_replaces_stale_values_only(self):
+        self.assertTrue(self.first.add('key', 1))
+        self.assertFalse(self.second.add('key', 2))
+        self.shared.set('key', Entry(1, time.time() - 1), 60)
+        self.assertTrue(self.second.add('key', 3))
+        self.assertEqual(self.first.get('key'), 3)
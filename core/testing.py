@@ -0,0 +1,98 @@
+"""
+Test helpers for keeping the number of database queries per view flat.
+
+``QueryBudgetMixin.assertQueryBudget`` requests a view after growing the
+test data to several sizes. It fails when the view runs more queries than
+its budget, or when the number of queries changes with the amount of
+data, which is the signature of an N+1 query. The failure message lists
+the query counts per size and the statements that were repeated, grouped
+by their normalized SQL.
+"""
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .slow_queries import normalize_sql
+
+DEFAULT_SIZES = (1, 3, 6)
+
+
+def duplicate_queries(queries):
+    """
+    Group captured queries by normalized SQL and keep the repeated ones.
+
+    Args:
+        queries (list): ``connection.queries``-style dicts with a ``sql``
+        key.
+
+    Returns:
+        list: ``(count, normalized_sql)`` tuples, most repeated first.
+    """
+    counts = Counter(normalize_sql(query['sql']) for query in queries)
+    return [(count, sql) for sql, count in counts.most_common()
+            if count > 1]
+
+
+def query_budget_report(label, max_queries, runs):
+    """
+    Format the failure message of a query budget check.
+
+    Args:
+        label (str): Name of the checked view.
+        max_queries (int): The declared budget.
+        runs (list): ``(size, captured_queries)`` tuples.
+
+    Returns:
+        str: A report with the query count for every size and the
+        duplicated statements of the largest run.
+    """
+    lines = [f"Query budget for {label} is {max_queries} at every size:"]
+    for size, queries in runs:
+        lines.append(f"  size {size:>4}: {len(queries)} queries")
+    size, queries = runs[-1]
+    duplicates = duplicate_queries(queries)
+    if duplicates:
+        lines.append(f"Repeated queries at size {size}:")
+        for count, sql in duplicates:
+            lines.append(f"  {count:>4} x {sql}")
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin for ``TestCase`` classes that declare query budgets for views.
+
+    Attributes:
+        query_budget_sizes (tuple): Data sizes every view is checked at,
+        smallest first.
+    """
+    query_budget_sizes = DEFAULT_SIZES
+
+    def assertQueryBudget(self, label, max_queries, populate, request,
+                          sizes=None):
+        """
+        Assert that a view stays within ``max_queries`` at every data size
+        and that its query count does not grow with the data.
+
+        Args:
+            label (str): Name used in the failure report.
+            max_queries (int): The most queries the view may run.
+            populate (callable): Called with each size before the request
+                to grow the test data to that size.
+            request (callable): Performs the request and returns the
+                response, e.g. ``lambda: self.client.get(url)``.
+            sizes (tuple): Overrides ``query_budget_sizes``.
+        """
+        runs = []
+        for size in sizes or self.query_budget_sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as captured:
+                response = request()
+            self.assertLess(
+                response.status_code, 400,
+                f"{label} returned {response.status_code} at size {size}")
+            runs.append((size, captured.captured_queries))
+
+        counts = [len(queries) for size, queries in runs]
+        if max(counts) > max_queries or len(set(counts)) > 1:
+            self.fail(query_budget_report(label, max_queries, runs))
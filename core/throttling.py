@@ -0,0 +1,261 @@
+"""
+Token bucket rate limiting for write endpoints.
+
+Each throttled view belongs to a scope with a rate per user and a rate per
+client IP, configured in ``THROTTLE_RATES``::
+
+    THROTTLE_RATES = {
+        'like': {'user': '30/m', 'ip': '120/m'},
+    }
+
+A rate of ``30/m`` gives a bucket of 30 tokens that refills at 30 tokens
+a minute, so a client can burst up to the limit and then continue at the
+rate, with no clock-aligned windows to burst across. A request takes a
+token from each of its buckets, and only when every bucket has one, so a
+request rejected by one bucket uses up none of the others.
+
+The buckets are kept by ``THROTTLE_BACKEND``. ``RedisTokenBuckets`` checks
+and takes the tokens of a request in one Lua script on ``REDIS_URL``, so
+concurrent requests of any worker cannot all see the same tokens and
+pass. ``CacheTokenBuckets`` keeps them in the ``THROTTLE_CACHE`` cache and
+updates them under a lock of the process; the file cache used without
+Redis is shared by the workers of one machine but has no atomic
+operations across processes, so limits there are approximate.
+Over-limit requests get a plain 429 response before the view runs; the
+user id is read from the session, so no user row is loaded to decide.
+"""
+import math
+import threading
+import time
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from .metrics import THROTTLED
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as ``"30/m"``.
+
+    Args:
+        rate (str): Number of requests, a slash, and a period of ``s``,
+        ``m``, ``h`` or ``d``.
+
+    Returns:
+        tuple: The size of the bucket and the seconds it takes to refill
+        it from empty.
+    """
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period[0]]
+
+
+def refill(state, limit, period, now):
+    """
+    Return the tokens in a bucket, from its stored ``(tokens, at)`` state
+    or None for a full bucket.
+    """
+    if state is None:
+        return limit
+    tokens, at = state
+    return min(limit, tokens + max(0, now - at) * limit / period)
+
+
+class CacheTokenBuckets:
+    """
+    Keeps token buckets in the ``THROTTLE_CACHE`` cache as ``(tokens,
+    at)`` pairs, read and written under a lock of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        """
+        Take a token from every bucket, if each has one.
+
+        Args:
+            buckets (list): ``(key, limit, period)`` of each bucket.
+            now (float): The current time.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until
+            every bucket has a token again.
+        """
+        cache = caches[settings.THROTTLE_CACHE]
+        with self._lock:
+            states = cache.get_many([key for key, _, _ in buckets])
+            tokens = [refill(states.get(key), limit, period, now)
+                      for key, limit, period in buckets]
+            wait = max(((1 - available) * period / limit
+                        for available, (_, limit, period)
+                        in zip(tokens, buckets) if available < 1),
+                       default=0)
+            if not wait:
+                for available, (key, _, period) in zip(tokens, buckets):
+                    # A bucket left alone for a period is full again.
+                    cache.set(key, (available - 1, now), math.ceil(period))
+            return wait
+
+
+class RedisTokenBuckets:
+    """
+    Keeps token buckets in Redis hashes on ``REDIS_URL``, checked and
+    taken atomically by a Lua script.
+    """
+    prefix = 'hwblog:'
+    # KEYS are the buckets, ARGV the time, then the limit and period of
+    # each bucket. Returns the wait as a string, Lua numbers would be
+    # truncated to integers.
+    script = """
+        local now = tonumber(ARGV[1])
+        local tokens = {}
+        local wait = 0
+        for i, key in ipairs(KEYS) do
+            local limit = tonumber(ARGV[2 * i])
+            local period = tonumber(ARGV[2 * i + 1])
+            local state = redis.call('HMGET', key, 'tokens', 'at')
+            local available = limit
+            if state[1] then
+                available = math.min(limit, tonumber(state[1])
+                    + math.max(0, now - tonumber(state[2])) * limit / period)
+            end
+            if available < 1 then
+                wait = math.max(wait, (1 - available) * period / limit)
+            end
+            tokens[i] = available
+        end
+        if wait == 0 then
+            for i, key in ipairs(KEYS) do
+                redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1),
+                           'at', tostring(now))
+                redis.call('EXPIRE', key, math.ceil(tonumber(ARGV[2 * i + 1])))
+            end
+        end
+        return tostring(wait)
+    """
+
+    def __init__(self):
+        import redis
+        client = redis.Redis.from_url(settings.REDIS_URL)
+        self.run = client.register_script(self.script)
+
+    def take(self, buckets, now):
+        """
+        Take a token from every bucket, if each has one; see
+        ``CacheTokenBuckets.take``.
+        """
+        args = [now]
+        for _, limit, period in buckets:
+            args += [limit, period]
+        return float(self.run(
+            keys=[self.prefix + key for key, _, _ in buckets], args=args))
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    """
+    Return the buckets named in ``THROTTLE_BACKEND``, one per process.
+    """
+    return _load_backend(settings.THROTTLE_BACKEND)
+
+
+def client_ip(request):
+    """
+    Return the client address, taken from the last ``X-Forwarded-For``
+    entry when ``THROTTLE_TRUST_X_FORWARDED_FOR`` is set (the address the
+    platform's router saw), otherwise from ``REMOTE_ADDR``.
+    """
+    if settings.THROTTLE_TRUST_X_FORWARDED_FOR:
+        forwarded = request.headers.get('X-Forwarded-For')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_throttle(request, scope):
+    """
+    Take a token from the user and IP buckets of a scope.
+
+    Args:
+        request (HttpRequest): The incoming request.
+        scope (str): A key of ``THROTTLE_RATES``.
+
+    Returns:
+        float: 0 if the request may proceed, otherwise the seconds until
+        it may be retried.
+    """
+    rates = settings.THROTTLE_RATES.get(scope, {})
+    buckets = []
+    user_id = request.session.get(SESSION_KEY)
+    if user_id and 'user' in rates:
+        buckets.append((f'throttle:{scope}:user:{user_id}', rates['user']))
+    if 'ip' in rates:
+        buckets.append(
+            (f'throttle:{scope}:ip:{client_ip(request)}', rates['ip']))
+    if not buckets:
+        return 0
+    return get_backend().take(
+        [(key, *parse_rate(rate)) for key, rate in buckets], time.time())
+
+
+def too_many_requests(retry_after):
+    """
+    Build the cheap response sent to throttled clients.
+    """
+    response = HttpResponse(
+        "Too many requests, please slow down.",
+        status=429, content_type="text/plain")
+    response['Retry-After'] = str(max(1, round(retry_after)))
+    return response
+
+
+def throttle(scope, methods=None):
+    """
+    Rate limit a view with the buckets of ``scope``.
+
+    Apply it above ``login_required`` so throttled requests are rejected
+    before the user is loaded.
+
+    Args:
+        scope (str): A key of ``THROTTLE_RATES``.
+        methods (tuple): Only throttle these HTTP methods, e.g.
+            ``("POST",)`` for views that also render pages. All methods
+            are throttled when omitted.
+    """
+    def rejected(request):
+        if methods is None or request.method in methods:
+            retry_after = check_throttle(request, scope)
+            if retry_after:
+                THROTTLED.labels(scope).inc()
+                return too_many_requests(retry_after)
+        return None
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                # The session may be loaded from the database.
+                response = await sync_to_async(rejected)(request)
+                if response is not None:
+                    return response
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapped(request, *args, **kwargs):
+                response = rejected(request)
+                if response is not None:
+                    return response
+                return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
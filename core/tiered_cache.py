@@ -0,0 +1,552 @@
+"""
+A two-tier cache backend: a small LRU cache in the memory of each worker
+in front of the shared cache.
+
+``TieredCache`` is the ``default`` cache. Its ``LOCATION`` names the
+shared cache alias (the file or Redis cache every worker reads). Reads
+are answered from the worker's LRU while an entry is fresh and at most
+``L1_TIMEOUT`` seconds old, so hot keys such as published posts and page
+shells cost no round trip to the shared cache. The LRU keeps at most
+``L1_MAX_ENTRIES`` pickled values of at most ``L1_MAX_BYTES`` bytes in
+total.
+
+Hot entries are kept from expiring for everyone at once:
+
+* Timeouts are shortened by up to ``JITTER`` (a fraction) at random, so
+  entries written together do not expire together.
+* An entry stays in the shared cache ``STALE_TIMEOUT`` seconds longer
+  than its timeout. While stale, the first reader to see it gets a miss
+  and refreshes it; everyone else keeps getting the stale value until
+  the new one is stored or ``REFRESH_TIMEOUT`` seconds have passed.
+* ``get_or_set`` computes a missing value once: other threads of the
+  worker wait for it, and other workers wait up to ``LOCK_WAIT`` seconds
+  for it to appear in the shared cache.
+
+Every write is announced by the class named in ``INVALIDATION`` so the
+other workers drop their copies of the written keys.
+``JournalInvalidation`` keeps a journal of each worker's recent writes in
+the shared cache, which the other workers read at most every
+``SYNC_INTERVAL`` seconds. ``RedisInvalidation`` publishes the written
+keys on Redis pub/sub, and a listener thread in every worker evicts them
+as they arrive.
+
+Caches that have to be exact across workers, such as sessions and rate
+limits, use the shared alias directly.
+"""
+import json
+import logging
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+LOCK_STRIPES = 64
+POLL_INTERVAL = 0.05
+
+
+class Entry(NamedTuple):
+    """
+    A value in the shared cache with the time it turns stale, None for
+    never.
+    """
+    value: object
+    fresh_until: float = None
+
+    def is_fresh(self):
+        return self.fresh_until is None or time.time() < self.fresh_until
+
+
+class LocalLRU:
+    """
+    Pickled values in the memory of this process, the least recently used
+    dropped first once ``max_entries`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        """
+        Return the pickled value of a key, or None when it is missing or
+        expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, timeout):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, time.monotonic() + timeout)
+            self._bytes += len(data)
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def pop(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+
+class JournalInvalidation:
+    """
+    Announces writes in a journal of the keys this worker wrote recently,
+    kept in the shared cache next to a registry of the workers. Every
+    ``SYNC_INTERVAL`` seconds a worker reads the journals of the others
+    and evicts the keys written since its last look, or empties its LRU
+    if a journal no longer reaches back that far.
+
+    Each journal has a single writer and a write costs one shared set,
+    so no atomic operations are needed. A registration lost to a
+    concurrent one is repeated at the worker's next look.
+    """
+    registry_key = 'tiered:workers'
+    journal_length = 200
+    journal_timeout = 86400
+
+    def __init__(self, tier):
+        self.tier = tier
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._journal = []
+        self._sequence = 0
+        self._seen = {}
+        self._checked = None
+        self._registered = False
+
+    def journal_key(self, origin):
+        return f'tiered:journal:{origin}'
+
+    def sync(self):
+        now = time.monotonic()
+        if (self._checked is not None
+                and now - self._checked < self.tier.sync_interval):
+            return
+        self._checked = now
+        shared = self.tier.shared
+        workers = shared.get(self.registry_key) or set()
+        others = workers - {self.origin}
+        journals = shared.get_many(
+            [self.journal_key(origin) for origin in others]) if others else {}
+        for origin in others:
+            entries = journals.get(self.journal_key(origin))
+            if entries:
+                self._replay(origin, entries)
+        if self.origin not in workers:
+            # Workers whose journal expired are gone.
+            self._register({origin for origin in others
+                            if self.journal_key(origin) in journals})
+
+    def _register(self, workers):
+        with self._lock:
+            self.tier.shared.set(self.journal_key(self.origin),
+                                 self._journal, self.journal_timeout)
+        self.tier.shared.set(self.registry_key, workers | {self.origin},
+                             None)
+        self._registered = True
+
+    def _replay(self, origin, entries):
+        seen = self._seen.get(origin, 0)
+        if entries[-1][0] <= seen:
+            return
+        if entries[0][0] > seen + 1:
+            # Writes since the last look fell out of the journal.
+            self.tier.lru.clear()
+        else:
+            for sequence, keys in entries:
+                if sequence <= seen:
+                    continue
+                if keys is None:
+                    self.tier.lru.clear()
+                else:
+                    for key in keys:
+                        self.tier.lru.pop(key)
+        self._seen[origin] = entries[-1][0]
+
+    def publish(self, keys):
+        with self._lock:
+            self._sequence += 1
+            self._journal.append((self._sequence, keys))
+            del self._journal[:-self.journal_length]
+            self.tier.shared.set(self.journal_key(self.origin),
+                                 self._journal, self.journal_timeout)
+        # Clearing the shared cache also drops the registry.
+        if keys is None or not self._registered:
+            self._register(self.tier.shared.get(self.registry_key) or set())
+
+
+class RedisInvalidation:
+    """
+    Announces the written keys on a Redis channel on ``REDIS_URL``. A
+    listener thread in every worker evicts them from its LRU.
+    """
+    channel = 'hwblog:cache-invalidation'
+
+    def __init__(self, tier):
+        self.tier = tier
+        self.origin = uuid.uuid4().hex
+        self.client = self.connect()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def connect(self):
+        import redis
+        return redis.Redis.from_url(settings.REDIS_URL)
+
+    def sync(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                # Announcements may have been missed while no listener ran.
+                self.tier.lru.clear()
+                self._listener = threading.Thread(
+                    target=self._relay, name='cache-invalidation',
+                    daemon=True)
+                self._listener.start()
+
+    def publish(self, keys):
+        try:
+            self.client.publish(self.channel, json.dumps(
+                {'origin': self.origin, 'keys': keys}))
+        except Exception:
+            logger.warning("Could not announce a cache write",
+                           exc_info=True)
+
+    def _relay(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for item in pubsub.listen():
+            message = json.loads(item['data'])
+            if message['origin'] == self.origin:
+                continue
+            if message['keys'] is None:
+                self.tier.lru.clear()
+            else:
+                for key in message['keys']:
+                    self.tier.lru.pop(key)
+
+
+class LocalTier:
+    """
+    The state of a ``TieredCache`` in this process, shared by the cache
+    instances Django creates per thread.
+    """
+
+    def __init__(self, shared_alias, options):
+        self.shared_alias = shared_alias
+        self.lru = LocalLRU(options.get('L1_MAX_ENTRIES', 1000),
+                            options.get('L1_MAX_BYTES', 16 * 1024 * 1024))
+        self.sync_interval = options.get('SYNC_INTERVAL', 1)
+        self.refreshing = set()
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.invalidation = import_string(options.get(
+            'INVALIDATION', 'core.tiered_cache.JournalInvalidation'))(self)
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def lock_for(self, key):
+        return self._locks[hash(key) % LOCK_STRIPES]
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def get_tier(shared_alias, options):
+    with _tiers_lock:
+        if shared_alias not in _tiers:
+            _tiers[shared_alias] = LocalTier(shared_alias, options)
+        return _tiers[shared_alias]
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend with a per-worker LRU in front of a shared cache, see
+    the module docstring for its options.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_timeout = options.get('L1_TIMEOUT', 5)
+        self.stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self.refresh_timeout = options.get('REFRESH_TIMEOUT', 10)
+        self.lock_wait = options.get('LOCK_WAIT', 2)
+        self.jitter = options.get('JITTER', 0.1)
+        self.tier = get_tier(location, options)
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _entry(self, value, timeout):
+        """
+        Return the entry of a value and its timeout in the shared cache.
+        """
+        if timeout is None:
+            return Entry(value), None
+        fresh_for = timeout * random.uniform(1 - self.jitter, 1)
+        return (Entry(value, time.time() + fresh_for),
+                fresh_for + self.stale_timeout)
+
+    def _remember(self, made_key, entry):
+        timeout = self.local_timeout
+        if entry.fresh_until is not None:
+            timeout = min(timeout, entry.fresh_until - time.time())
+        if timeout > 0:
+            self.tier.lru.set(made_key, pickle.dumps(
+                entry.value, pickle.HIGHEST_PROTOCOL), timeout)
+
+    def _local_get(self, made_key):
+        self.tier.invalidation.sync()
+        data = self.tier.lru.get(made_key)
+        return MISSING if data is None else pickle.loads(data)
+
+    def _refresh_key(self, key):
+        return f'{key}:refresh'
+
+    def _claim_refresh(self, key, made_key, version):
+        """
+        Return True if this caller is the one to store a new value.
+        """
+        if self.shared.add(self._refresh_key(key), 1, self.refresh_timeout,
+                           version):
+            self.tier.refreshing.add(made_key)
+            return True
+        return False
+
+    def _read(self, key, made_key, entry, default, version):
+        """
+        Return the value of an entry read from the shared cache, or
+        ``default`` for the reader that has to refresh a stale one.
+        """
+        if not isinstance(entry, Entry):
+            # Written to the shared cache by something else.
+            return entry
+        if entry.is_fresh():
+            self._remember(made_key, entry)
+            return entry.value
+        if self._claim_refresh(key, made_key, version):
+            return default
+        return entry.value
+
+    def _release_refresh(self, key, made_key, version):
+        if made_key in self.tier.refreshing:
+            self.tier.refreshing.discard(made_key)
+            self.shared.delete(self._refresh_key(key), version)
+
+    def _written(self, keys, made_keys, version):
+        """
+        Release the refresh claims of written keys and announce them.
+        """
+        for key, made_key in zip(keys, made_keys):
+            self._release_refresh(key, made_key, version)
+        self.tier.invalidation.publish(made_keys)
+
+    def get(self, key, default=None, version=None):
+        made_key = self.make_and_validate_key(key, version)
+        value = self._local_get(made_key)
+        if value is not MISSING:
+            return value
+        entry = self.shared.get(key, MISSING, version)
+        if entry is MISSING:
+            return default
+        return self._read(key, made_key, entry, default, version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = {}
+        for key in keys:
+            made_key = self.make_and_validate_key(key, version)
+            value = self._local_get(made_key)
+            if value is MISSING:
+                remaining[key] = made_key
+            else:
+                found[key] = value
+        if remaining:
+            entries = self.shared.get_many(list(remaining), version)
+            for key, entry in entries.items():
+                value = self._read(key, remaining[key], entry, MISSING,
+                                   version)
+                if value is not MISSING:
+                    found[key] = value
+        return found
+
+    def has_key(self, key, version=None):
+        made_key = self.make_and_validate_key(key, version)
+        return (self._local_get(made_key) is not MISSING
+                or self.shared.has_key(key, version))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self.delete(key, version)
+            return
+        entry, shared_timeout = self._entry(value, timeout)
+        self.shared.set(key, entry, shared_timeout, version)
+        self._remember(made_key, entry)
+        self._written([key], [made_key], version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self.delete_many(data, version)
+            return []
+        made_keys = [self.make_and_validate_key(key, version)
+                     for key in data]
+        _, shared_timeout = self._entry(None, timeout)
+        fresh_until = (None if timeout is None
+                       else time.time() + shared_timeout - self.stale_timeout)
+        entries = {key: Entry(value, fresh_until)
+                   for key, value in data.items()}
+        failed = self.shared.set_many(entries, shared_timeout, version)
+        for made_key, entry in zip(made_keys, entries.values()):
+            self._remember(made_key, entry)
+        self._written(list(data), made_keys, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version)
+        entry, shared_timeout = self._entry(value, self._timeout(timeout))
+        if not self.shared.add(key, entry, shared_timeout, version):
+            existing = self.shared.get(key, MISSING, version)
+            if not isinstance(existing, Entry) or existing.is_fresh():
+                return False
+            # A stale entry counts as expired.
+            self.shared.set(key, entry, shared_timeout, version)
+        self._remember(made_key, entry)
+        self._written([key], [made_key], version)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        entry = self.shared.get(key, MISSING, version)
+        if not isinstance(entry, Entry) or not entry.is_fresh():
+            return False
+        self.set(key, entry.value, timeout, version)
+        return True
+
+    def delete(self, key, version=None):
+        made_key = self.make_and_validate_key(key, version)
+        self.tier.lru.pop(made_key)
+        deleted = self.shared.delete(key, version)
+        self.tier.invalidation.publish([made_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        made_keys = [self.make_and_validate_key(key, version)
+                     for key in keys]
+        for made_key in made_keys:
+            self.tier.lru.pop(made_key)
+        self.shared.delete_many(keys, version)
+        self.tier.invalidation.publish(made_keys)
+
+    def clear(self):
+        self.tier.lru.clear()
+        self.shared.clear()
+        self.tier.invalidation.publish(None)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Return the value of a key, computing and storing ``default`` (a
+        value or a callable) once when it is missing or stale. A value of
+        None is returned but not stored.
+        """
+        value = self.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+        made_key = self.make_and_validate_key(key, version)
+        with self.tier.lock_for(made_key):
+            # Another thread of this worker may have just stored it.
+            value = self._fresh_value(key, made_key, version)
+            if value is MISSING and made_key not in self.tier.refreshing:
+                value = self._wait_for_value(key, made_key, version)
+            if value is not MISSING:
+                return value
+            if callable(default):
+                try:
+                    default = default()
+                except Exception:
+                    self._release_refresh(key, made_key, version)
+                    raise
+            if default is None:
+                self._release_refresh(key, made_key, version)
+            else:
+                self.set(key, default, timeout, version)
+            return default
+
+    def _wait_for_value(self, key, made_key, version):
+        """
+        Claim a missing key, or wait for the worker that claimed it to
+        store its value or give up its claim.
+        """
+        if self._claim_refresh(key, made_key, version):
+            return MISSING
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = self._fresh_value(key, made_key, version)
+            if value is not MISSING:
+                return value
+            # Released without a value, e.g. a None that is not stored.
+            if self._claim_refresh(key, made_key, version):
+                return MISSING
+        return MISSING
+
+    def _fresh_value(self, key, made_key, version):
+        """
+        Return the value of a key if it is fresh, without claiming it.
+        """
+        value = self._local_get(made_key)
+        if value is not MISSING:
+            return value
+        entry = self.shared.get(key, MISSING, version)
+        if not isinstance(entry, Entry) or not entry.is_fresh():
+            return MISSING
+        self._remember(made_key, entry)
+        return entry.value
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+
+urlpatterns = [
+    path('metrics', views.metrics, name='metrics'),
+    path('csrf/', views.csrf_token, name='csrf_token'),
+    path('admin/profiles/', views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>/', views.profile_detail,
+         name='profile_detail'),
+]
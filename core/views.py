@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from .metrics import render_latest
+from .profiling import list_profiles, profile_path, top_functions
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def can_scrape_metrics(request):
+    """
+    Check whether the request may read the metrics endpoint.
+
+    When ``METRICS_TOKEN`` is configured a scraper authenticates with an
+    ``Authorization: Bearer <token>`` header. Without a token only logged
+    in staff members can see the metrics.
+
+    Args:
+        request (HttpRequest): The request instance.
+
+    Returns:
+        bool: True if the metrics may be returned, False otherwise.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        header = request.headers.get('Authorization', '')
+        return constant_time_compare(header, f'Bearer {token}')
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@never_cache
+def metrics(request):
+    """
+    Export request, database and cache metrics in Prometheus text format.
+
+    Aggregates the samples of every gunicorn worker when running in
+    multiprocess mode.
+
+    Returns:
+        HttpResponse: The metrics, or 403 if the caller is not allowed to
+        scrape them.
+    """
+    if not can_scrape_metrics(request):
+        return HttpResponse(status=403)
+    body, content_type = render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
+@never_cache
+def csrf_token(request):
+    """
+    Issue a CSRF token, and the CSRF cookie, to a form on a cached page.
+
+    Pages served to anonymous visitors carry no token so shared caches can
+    store them; ``static/js/csrf.js`` calls this view when such a form is
+    submitted.
+
+    Returns:
+        JsonResponse: ``{"token": "..."}``.
+    """
+    return JsonResponse({'token': get_token(request)})
+
+
+@staff_member_required
+def profile_list(request):
+    """
+    List the request profiles captured by the profiling middleware.
+
+    **Context**
+    ``profiles``
+        Name, size and creation time of every stored profile.
+
+    **Template**
+    :template:`core/profile_list.html`
+    """
+    return render(request, 'core/profile_list.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'profiling_enabled': settings.PROFILING_ENABLED,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    })
+
+
+@staff_member_required
+def profile_detail(request, name):
+    """
+    Show the most expensive functions of a single stored profile.
+
+    The report can be sorted by cumulative or own time with the ``sort``
+    query parameter.
+
+    **Template**
+    :template:`core/profile_detail.html`
+    """
+    path = profile_path(name)
+    if path is None:
+        raise Http404("Profile not found")
+    sort = request.GET.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        sort = 'cumulative'
+    return render(request, 'core/profile_detail.html', {
+        **admin.site.each_context(request),
+        'title': name,
+        'name': name,
+        'sort': sort,
+        'sort_keys': PROFILE_SORT_KEYS,
+        'report': top_functions(path, sort),
+    })
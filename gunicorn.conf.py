@@ -0,0 +1,41 @@
+"""
+Gunicorn configuration for hwblog.
+
+Gunicorn loads this file automatically from the working directory, so the
+Procfile command does not need to reference it. Setting ``ASGI`` serves
+the ASGI application with uvicorn workers instead of sync WSGI workers.
+"""
+import os
+import shutil
+import tempfile
+
+if 'ASGI' in os.environ:
+    wsgi_app = 'hwblog.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'hwblog.wsgi:application'
+
+# Must be set before prometheus_client is imported by the workers so that
+# every worker writes its samples to a shared directory.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'hwblog-metrics'),
+)
+
+
+def on_starting(server):
+    """Start each master process with an empty metrics directory."""
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live samples of a worker that has exited."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Write the counts a worker buffered before it exits."""
+    from core.counters import flush_all
+    flush_all()
@@ -1,6 +1,7 @@
 from pathlib import Path
 import os
 import sys
+import tempfile
 import cloudinary
 from django.contrib.messages import constants as messages
 import dj_database_url
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     'cloudinary',
     'blog',
     'about',
+    'core',
 ]
 
 SITE_ID = 1
@@ -58,12 +60,16 @@ cloudinary.config(
 )
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.http_cache.AnonymousCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -71,6 +77,44 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'hwblog.urls'
 
+# Bearer token a Prometheus scraper sends to read /metrics. When unset,
+# only logged in staff members can view the metrics.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Request profiling (see core/profiling.py). Staff can profile a single
+# request with ?profile=1 once PROFILING is set in the environment.
+PROFILING_ENABLED = 'PROFILING' in os.environ
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.environ.get(
+    "PROFILING_DIR", os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", 200))
+
+# Slow-query log (see core/slow_queries.py), stored in the admin under
+# Core > Slow queries.
+SLOW_QUERY_LOG_ENABLED = 'SLOW_QUERY_LOG' in os.environ
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_EXPLAIN_ANALYZE = 'SLOW_QUERY_EXPLAIN_ANALYZE' in os.environ
+
+# Rate limits of the write endpoints (see core/throttling.py). "30/m" is
+# a bucket of 30 tokens that refills at 30 tokens a minute. With REDIS_URL
+# the buckets are taken atomically in Redis, otherwise they are kept in
+# the shared cache, skipping the per-worker memory cache so every worker
+# sees the same tokens. Heroku's router appends the client address to
+# X-Forwarded-For.
+THROTTLE_BACKEND = os.environ.get(
+    "THROTTLE_BACKEND",
+    "core.throttling.RedisTokenBuckets" if os.environ.get("REDIS_URL")
+    else "core.throttling.CacheTokenBuckets")
+THROTTLE_CACHE = 'shared'
+THROTTLE_TRUST_X_FORWARDED_FOR = 'DYNO' in os.environ
+THROTTLE_RATES = {
+    'like': {'user': '30/m', 'ip': '120/m'},
+    'favorite': {'user': '30/m', 'ip': '120/m'},
+    'comment': {'user': '5/m', 'ip': '20/m'},
+    'collaborate': {'ip': '5/h'},
+    'view': {'ip': '60/m'},
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -89,6 +133,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'hwblog.wsgi.application'
 
+# ASGI=1 runs gunicorn with uvicorn workers (see gunicorn.conf.py) and
+# serves the listings, post pages and toggles from blog/async_views.py.
+ASYNC_VIEWS = 'ASGI' in os.environ
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -108,6 +156,126 @@ DATABASES = {
 if 'test' in sys.argv:
     DATABASES['default']['ENGINE'] = 'django.db.backends.sqlite3'
 
+# Shared cache for sessions, rate limits and page fragments. Use Redis when
+# REDIS_URL is set (e.g. the Heroku Data for Redis add-on), otherwise a file
+# cache that the gunicorn workers of one machine share.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                "CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), 'hwblog-cache')),
+        }
+    }
+
+# The default cache keeps recently used entries in the memory of each
+# worker in front of the shared cache (see core/tiered_cache.py). Written
+# keys are announced over Redis pub/sub with REDIS_URL, otherwise through
+# journals in the shared cache read every CACHE_SYNC_INTERVAL seconds.
+CACHES['default'] = {
+    'BACKEND': 'core.tiered_cache.TieredCache',
+    'LOCATION': 'shared',
+    'OPTIONS': {
+        'L1_MAX_ENTRIES': int(os.environ.get("CACHE_L1_MAX_ENTRIES", 1000)),
+        'L1_MAX_BYTES': int(os.environ.get(
+            "CACHE_L1_MAX_BYTES", 16 * 1024 * 1024)),
+        'L1_TIMEOUT': int(os.environ.get("CACHE_L1_TIMEOUT", 5)),
+        'STALE_TIMEOUT': int(os.environ.get("CACHE_STALE_TIMEOUT", 60)),
+        'JITTER': float(os.environ.get("CACHE_JITTER", 0.1)),
+        'SYNC_INTERVAL': float(os.environ.get("CACHE_SYNC_INTERVAL", 1)),
+        'INVALIDATION': (
+            "core.tiered_cache.RedisInvalidation"
+            if os.environ.get("REDIS_URL")
+            else "core.tiered_cache.JournalInvalidation"),
+    },
+}
+
+if 'test' in sys.argv:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+    CACHES['default']['OPTIONS']['INVALIDATION'] = (
+        'core.tiered_cache.JournalInvalidation')
+
+# With REDIS_URL, sessions are read from the cache and written through to
+# the database ("cached_db"). The file cache is only shared by the workers
+# of one machine, where a logout on another machine would leave a stale
+# copy, so without Redis they are read from the database ("db"). Set
+# SESSION_BACKEND=signed_cookies to keep them in the browser instead;
+# expired database sessions are removed by `python manage.py
+# prune_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    "SESSION_BACKEND", "cached_db" if os.environ.get("REDIS_URL") else "db")
+SESSION_CACHE_ALIAS = 'shared'
+
+if 'test' in sys.argv:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Query results of models with a CachedManager (see core/query_cache.py).
+QUERY_CACHE_ENABLED = 'QUERY_CACHE_DISABLED' not in os.environ
+QUERY_CACHE_TIMEOUT = int(os.environ.get("QUERY_CACHE_TIMEOUT", 3600))
+
+# Flash messages travel in a signed cookie instead of the session.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# How long shared caches may keep the anonymous version of public pages
+# (see core/http_cache.py).
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get("PUBLIC_CACHE_MAX_AGE", 300))
+
+# Purges CDN caches by surrogate key when content changes (see
+# core/purge.py). Set CACHE_PURGER=core.purge.FastlyPurger together with
+# FASTLY_SERVICE_ID and FASTLY_API_TOKEN to purge a Fastly service.
+CACHE_PURGER = os.environ.get("CACHE_PURGER", "core.purge.LoggingPurger")
+FASTLY_SERVICE_ID = os.environ.get("FASTLY_SERVICE_ID")
+FASTLY_API_TOKEN = os.environ.get("FASTLY_API_TOKEN")
+
+if 'test' in sys.argv:
+    CACHE_PURGER = 'core.purge.LocalPurger'
+
+# Live updates of open post pages (see core/events.py). With REDIS_URL the
+# events reach the streams of every worker through Redis pub/sub.
+REDIS_URL = os.environ.get("REDIS_URL")
+EVENTS_BACKEND = os.environ.get(
+    "EVENTS_BACKEND",
+    "core.events.RedisBackend" if REDIS_URL else "core.events.LocalBackend")
+EVENTS_KEEPALIVE = int(os.environ.get("EVENTS_KEEPALIVE", 15))
+EVENTS_STREAM_MAX_AGE = int(os.environ.get("EVENTS_STREAM_MAX_AGE", 300))
+
+if 'test' in sys.argv:
+    EVENTS_BACKEND = 'core.events.LocalBackend'
+    THROTTLE_BACKEND = 'core.throttling.CacheTokenBuckets'
+
+# Trending posts (see blog/trending.py). Engagement counts half as much
+# for every half-life that passed since it was made. `python manage.py
+# rescale_trending` should run hourly from the Heroku Scheduler.
+TRENDING_HALF_LIFE_HOURS = float(
+    os.environ.get("TRENDING_HALF_LIFE_HOURS", 48))
+TRENDING_WEIGHTS = {'like': 1, 'favorite': 2, 'comment': 3}
+
+# Buffered counters such as the post view counts (see core/counters.py)
+# are written every COUNTER_FLUSH_INTERVAL seconds or once
+# COUNTER_FLUSH_SIZE keys are waiting. With REDIS_URL the buffer is shared
+# by every worker.
+COUNTER_BACKEND = os.environ.get(
+    "COUNTER_BACKEND",
+    "core.counters.RedisBuffer" if REDIS_URL else "core.counters.LocalBuffer")
+COUNTER_FLUSH_INTERVAL = int(os.environ.get("COUNTER_FLUSH_INTERVAL", 30))
+COUNTER_FLUSH_SIZE = int(os.environ.get("COUNTER_FLUSH_SIZE", 500))
+COUNTER_FLUSH_AT_EXIT = True
+
+if 'test' in sys.argv:
+    COUNTER_BACKEND = 'core.counters.LocalBuffer'
+    COUNTER_FLUSH_INTERVAL = 3600
+    COUNTER_FLUSH_AT_EXIT = False
+
 CSRF_TRUSTED_ORIGINS = [
     "https://*.localhost",
     "https://*.herokuapp.com"
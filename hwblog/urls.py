@@ -4,6 +4,7 @@ from django.urls import path, include
 urlpatterns = [
     path("about/", include("about.urls"), name="about-urls"),
     path("accounts/", include("allauth.urls")),
+    path('', include('core.urls')),
     path('admin/', admin.site.urls),
     path('summernote/', include('django_summernote.urls')),
     path('', include(('blog.urls', 'blog'), namespace='blog')),
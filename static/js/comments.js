@@ -35,7 +35,8 @@ document.addEventListener('DOMContentLoaded', function() {
         // Populate the form with the comment content and change the submit button text
         commentText.value = commentContent;
         submitButton.innerText = "Update";
-        // Update the form's action URL to target the edit_comment endpoint
+        commentForm.setAttribute("data-comment_id", commentId);
+        // Without the fragment endpoints the form still posts to edit_comment
         commentForm.setAttribute("action", `edit_comment/${commentId}`);
     }
 
@@ -44,7 +45,133 @@ document.addEventListener('DOMContentLoaded', function() {
         // Retrieve the comment ID and set the confirmation link href
         const commentId = e.target.getAttribute("data-comment_id");
         deleteConfirm.href = `delete_comment/${commentId}`;
+        deleteConfirm.setAttribute("data-comment_id", commentId);
         // Show the delete confirmation modal
         deleteModal.show();
     }
+
+    // Post form data to a comment endpoint and return the JSON reply.
+    // Failed requests reject, so callers can fall back to a page load.
+    function postComment(url, data) {
+        return fetch(url, {method: 'POST', body: data, credentials: 'same-origin'})
+            .then(function(response) {
+                return response.json().then(function(json) {
+                    if (!response.ok && response.status !== 400) {
+                        throw new Error(json.error || response.statusText);
+                    }
+                    return json;
+                });
+            });
+    }
+
+    function setCommentCount(count) {
+        document.querySelectorAll('.comment-count').forEach(function(element) {
+            element.textContent = count;
+        });
+    }
+
+    function resetForm() {
+        commentForm.reset();
+        commentForm.removeAttribute("data-comment_id");
+        commentForm.removeAttribute("action");
+        submitButton.innerText = "Submit";
+    }
+
+    // Create and edit comments in place instead of reloading the page
+    if (commentForm) {
+        commentForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const commentId = commentForm.getAttribute("data-comment_id");
+            const url = commentId ? `comments/${commentId}/edit/` : 'comments/';
+            postComment(url, new FormData(commentForm))
+                .then(function(reply) {
+                    if (reply.errors) {
+                        commentText.setCustomValidity(Object.values(reply.errors).flat().join(' '));
+                        commentText.reportValidity();
+                        return;
+                    }
+                    const existing = document.getElementById(`comment-block${reply.id}`);
+                    if (existing) {
+                        existing.outerHTML = reply.html;
+                    } else {
+                        document.getElementById('pendingComments').insertAdjacentHTML('afterbegin', reply.html);
+                    }
+                    if (reply.comment_count !== undefined) {
+                        setCommentCount(reply.comment_count);
+                    }
+                    resetForm();
+                })
+                .catch(function() {
+                    commentForm.submit();
+                });
+        });
+        commentText.addEventListener('input', function() {
+            commentText.setCustomValidity('');
+        });
+    }
+
+    // Delete comments in place once confirmed
+    deleteConfirm.addEventListener('click', function(e) {
+        if (!commentForm) {
+            return;
+        }
+        e.preventDefault();
+        const commentId = deleteConfirm.getAttribute("data-comment_id");
+        const data = new FormData();
+        data.append('csrfmiddlewaretoken', commentForm.querySelector('[name=csrfmiddlewaretoken]').value);
+        postComment(`comments/${commentId}/delete/`, data)
+            .then(function(reply) {
+                const block = document.getElementById(`comment-block${reply.id}`);
+                if (block) {
+                    block.remove();
+                }
+                setCommentCount(reply.comment_count);
+                deleteModal.hide();
+            })
+            .catch(function() {
+                window.location.href = deleteConfirm.href;
+            });
+    });
+});
+
+// On ASGI the page listens for live updates of the post: newly approved
+// comments and changed like and favorite counts. One long-lived
+// connection replaces reloading the page to see them.
+document.addEventListener('DOMContentLoaded', function() {
+    const stateElement = document.getElementById('postState');
+    const eventsUrl = stateElement && stateElement.getAttribute('data-events-url');
+    if (!eventsUrl || !window.EventSource) {
+        return;
+    }
+    const source = new EventSource(eventsUrl);
+
+    function setText(selector, value) {
+        document.querySelectorAll(selector).forEach(function(element) {
+            element.textContent = value;
+        });
+    }
+
+    source.addEventListener('comment', function(e) {
+        const comment = JSON.parse(e.data);
+        // Drops the pending copy the author or staff may be looking at
+        const existing = document.getElementById(`comment-block${comment.id}`);
+        if (existing) {
+            existing.remove();
+        }
+        const pending = document.getElementById('pendingComments');
+        pending.insertAdjacentHTML('afterend', comment.html);
+        // Shows the buttons the way js/post_state.js does for the rest
+        const buttons = pending.nextElementSibling.querySelector('.comment-buttons[data-author-id]');
+        if (buttons && (stateElement.getAttribute('data-is-staff') === 'true' ||
+                buttons.getAttribute('data-author-id') === stateElement.getAttribute('data-user-id'))) {
+            buttons.hidden = false;
+        }
+        setText('.comment-count', comment.comment_count);
+    });
+
+    source.addEventListener('counts', function(e) {
+        const counts = JSON.parse(e.data);
+        setText('.like-count', counts.likes);
+        setText('.favorite-count', counts.favorites);
+    });
 });
@@ -0,0 +1,23 @@
+// Forms on pages that shared caches may store carry no CSRF token.
+// Forms marked with data-csrf-url fetch one when they are submitted.
+document.addEventListener('submit', function(e) {
+    const form = e.target;
+    const url = form.getAttribute('data-csrf-url');
+    if (!url || form.querySelector('input[name="csrfmiddlewaretoken"]')) {
+        return;
+    }
+    e.preventDefault();
+    fetch(url, {credentials: 'same-origin'})
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(data) {
+            // Add the token as the hidden field {% csrf_token %} renders
+            const input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = 'csrfmiddlewaretoken';
+            input.value = data.token;
+            form.appendChild(input);
+            form.submit();
+        });
+});
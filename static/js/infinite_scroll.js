@@ -0,0 +1,106 @@
+// Optional infinite scroll for the post listing. When the reader turns it
+// on, the next batch of cards is fetched from the post_cards endpoint
+// while the browser is idle, and appended once the end of the list comes
+// into view. The choice is remembered in localStorage.
+document.addEventListener('DOMContentLoaded', function() {
+    const sentinel = document.getElementById('cardsSentinel');
+    const toggle = document.getElementById('infiniteScroll');
+    const cards = document.getElementById('postCards');
+    const pageNavigation = document.getElementById('pageNavigation');
+    if (!sentinel || !toggle || !window.IntersectionObserver) {
+        return;
+    }
+    const storageKey = 'hwblog.infiniteScroll';
+    const whenIdle = window.requestIdleCallback || function(callback) {
+        return setTimeout(callback, 200);
+    };
+    let cursor = sentinel.getAttribute('data-cursor');
+    let prefetched = null;
+    let loading = false;
+    let observer = null;
+
+    // Fetch the batch after the current cursor, at most once
+    function prefetch() {
+        if (!prefetched && cursor) {
+            const url = `${sentinel.getAttribute('data-cards-url')}?cursor=${encodeURIComponent(cursor)}`;
+            prefetched = fetch(url, {credentials: 'same-origin'}).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            });
+        }
+        return prefetched;
+    }
+
+    // Append the next batch, one at a time: the sentinel can come into
+    // view again while a batch is still loading
+    function appendBatch() {
+        if (!cursor || loading) {
+            return;
+        }
+        loading = true;
+        prefetch()
+            .then(function(batch) {
+                cards.insertAdjacentHTML('beforeend', batch.html);
+                cursor = batch.next;
+                prefetched = null;
+                loading = false;
+                if (cursor) {
+                    whenIdle(prefetch);
+                    if (observer) {
+                        // Reports the sentinel again if it is still in view
+                        observer.unobserve(sentinel);
+                        observer.observe(sentinel);
+                    }
+                } else {
+                    stop();
+                }
+            })
+            .catch(function() {
+                // Fall back to the page links
+                stop();
+                prefetched = null;
+                loading = false;
+                if (pageNavigation) {
+                    pageNavigation.hidden = false;
+                }
+            });
+    }
+
+    function start() {
+        if (pageNavigation) {
+            pageNavigation.hidden = true;
+        }
+        whenIdle(prefetch);
+        observer = new IntersectionObserver(function(entries) {
+            if (entries.some(function(entry) { return entry.isIntersecting; })) {
+                appendBatch();
+            }
+        }, {rootMargin: '600px'});
+        observer.observe(sentinel);
+    }
+
+    function stop() {
+        if (observer) {
+            observer.disconnect();
+            observer = null;
+        }
+    }
+
+    toggle.checked = localStorage.getItem(storageKey) === 'on';
+    if (toggle.checked) {
+        start();
+    }
+    toggle.addEventListener('change', function() {
+        localStorage.setItem(storageKey, toggle.checked ? 'on' : 'off');
+        if (toggle.checked) {
+            start();
+        } else {
+            stop();
+            if (pageNavigation) {
+                pageNavigation.hidden = false;
+            }
+        }
+    });
+});
@@ -0,0 +1,42 @@
+// The post page shell is cached and the same for every reader. Once it
+// has loaded, count the view and fetch the reader's own state and fill in
+// the personal parts.
+document.addEventListener('DOMContentLoaded', function() {
+    const stateElement = document.getElementById('postState');
+    if (!stateElement) {
+        return;
+    }
+    // Counted here, as cached pages never reach the server
+    const viewUrl = stateElement.getAttribute('data-view-url');
+    if (!navigator.sendBeacon || !navigator.sendBeacon(viewUrl)) {
+        fetch(viewUrl, {method: 'POST', keepalive: true});
+    }
+    if (document.body.getAttribute('data-user-authenticated') !== 'true') {
+        return;
+    }
+    fetch(stateElement.getAttribute('data-state-url'), {credentials: 'same-origin'})
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(state) {
+            if (!state.authenticated) {
+                return;
+            }
+            // Kept for comments that arrive later through the live updates
+            stateElement.setAttribute('data-user-id', state.user_id);
+            stateElement.setAttribute('data-is-staff', state.is_staff);
+            // Swap the login links for the reader's like and favorite toggles
+            document.querySelector('[data-state="anonymous"]').hidden = true;
+            document.querySelector('[data-state="user"]').hidden = false;
+            document.querySelector(state.liked ? '[data-state="liked"]' : '[data-state="not-liked"]').hidden = false;
+            document.querySelector(state.favorited ? '[data-state="favorited"]' : '[data-state="not-favorited"]').hidden = false;
+            // Show edit and delete buttons on the reader's comments, or on all for staff
+            document.querySelectorAll('.comment-buttons[data-author-id]').forEach(function(buttons) {
+                if (state.is_staff || Number(buttons.getAttribute('data-author-id')) === state.user_id) {
+                    buttons.hidden = false;
+                }
+            });
+            // Comments awaiting approval are only shown to their author and staff
+            document.getElementById('pendingComments').innerHTML = state.pending_html;
+        });
+});